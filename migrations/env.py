@@ -90,11 +90,28 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    connectable = get_engine()
+
+    # skip indexes limited to another backend with `Index(...).ddl_if(dialect=...)`
+    # and the SQLite full text index of users, created by its own DDL with the table
+    def include_object(object, name, type_, reflected, compare_to):
+        if type_ == 'table' and reflected and compare_to is None and (
+            name == 'user_search' or name.startswith('user_search_')
+        ):
+            return False
+        ddl_if = getattr(object, '_ddl_if', None)
+        if ddl_if is None or ddl_if.dialect is None:
+            return True
+        dialects = ddl_if.dialect
+        if isinstance(dialects, str):
+            dialects = (dialects,)
+        return connectable.dialect.name in dialects
+
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
-
-    connectable = get_engine()
+    if conf_args.get("include_object") is None:
+        conf_args["include_object"] = include_object
 
     with connectable.connect() as connection:
         context.configure(
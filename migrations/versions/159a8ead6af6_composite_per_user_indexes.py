@@ -0,0 +1,61 @@
+"""Composite per-user indexes
+
+Revision ID: 159a8ead6af6
+Revises: bf717024cfab
+Create Date: 2026-10-18 13:21:37.045612
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "159a8ead6af6"
+down_revision = "bf717024cfab"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_exercise_user_created_at", "exercise", ["user_id", "created_at"]),
+    (
+        "ix_exercise_user_type_created_at",
+        "exercise",
+        ["user_id", "type", "created_at"],
+    ),
+    ("ix_achievement_user_created_at", "achievement", ["user_id", "created_at"]),
+    (
+        "ix_body_measurement_user_created_at",
+        "body_measurement",
+        ["user_id", "created_at"],
+    ),
+    (
+        "ix_body_measurement_user_type_created_at",
+        "body_measurement",
+        ["user_id", "type", "created_at"],
+    ),
+    (
+        "ix_calorie_intake_user_created_at",
+        "calorie_intake",
+        ["user_id", "created_at"],
+    ),
+    ("ix_water_intake_user_created_at", "water_intake", ["user_id", "created_at"]),
+    (
+        "ix_scheduled_exercise_user_time",
+        "scheduled_exercise",
+        ["user_id", "scheduled_time"],
+    ),
+    ("ix_goal_user_created_at", "goal", ["user_id", "created_at"]),
+    ("ix_share_sender_created_at", "share", ["sender_id", "created_at"]),
+    ("ix_share_receiver_created_at", "share", ["receiver_id", "created_at"]),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, _columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,27 @@
+"""Add a lower(username) index to user
+
+Revision ID: 5c1e0d7b8a42
+Revises: 9a6335892290
+Create Date: 2026-10-18 19:42:37.206114
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "5c1e0d7b8a42"
+down_revision = "9a6335892290"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_user_username_lower", "user", [sa.text("lower(username)")], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index("ix_user_username_lower", table_name="user")
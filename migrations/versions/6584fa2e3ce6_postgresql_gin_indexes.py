@@ -0,0 +1,42 @@
+"""PostgreSQL GIN indexes on exercise metrics and share scope
+
+Revision ID: 6584fa2e3ce6
+Revises: 159a8ead6af6
+Create Date: 2026-10-18 14:05:41.203577
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "6584fa2e3ce6"
+down_revision = "159a8ead6af6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # GIN only exists on PostgreSQL, where both columns are JSONB. `share.scope`
+    # has always been JSONB there, as `json` cannot back uq_share_relationship.
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.create_index(
+        "ix_exercise_metrics",
+        "exercise",
+        ["metrics"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"metrics": "jsonb_path_ops"},
+    )
+    op.create_index(
+        "ix_share_scope", "share", ["scope"], unique=False, postgresql_using="gin"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.drop_index("ix_share_scope", table_name="share")
+    op.drop_index("ix_exercise_metrics", table_name="exercise")
@@ -0,0 +1,27 @@
+"""add user city
+
+Revision ID: 85ef5f83cb96
+Revises: 6584fa2e3ce6
+Create Date: 2026-10-18 15:12:08.531964
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "85ef5f83cb96"
+down_revision = "6584fa2e3ce6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("user", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("city", sa.String(length=100), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("user", schema=None) as batch_op:
+        batch_op.drop_column("city")
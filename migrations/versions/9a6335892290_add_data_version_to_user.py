@@ -0,0 +1,29 @@
+"""Add data_version to user
+
+Revision ID: 9a6335892290
+Revises: 96e07c6f45ee
+Create Date: 2026-10-18 17:05:12.418530
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "9a6335892290"
+down_revision = "96e07c6f45ee"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Not batched, recreating `user` on SQLite would drop the user_search triggers
+    op.add_column(
+        "user",
+        sa.Column("data_version", sa.Integer(), server_default="0", nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_column("user", "data_version")
@@ -0,0 +1,62 @@
+"""User search trigram index
+
+Revision ID: a3c9e1f04b27
+Revises: 85ef5f83cb96
+Create Date: 2026-10-18 16:02:47.119835
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "a3c9e1f04b27"
+down_revision = "85ef5f83cb96"
+branch_labels = None
+depends_on = None
+
+TRIGGERS = ["user_search_insert", "user_search_delete", "user_search_update"]
+
+
+def upgrade():
+    # FTS5 only exists on SQLite, other databases search with ILIKE. Note that a
+    # batch_alter_table on `user` recreates the table on SQLite, dropping the
+    # triggers, so such a migration has to create them again.
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    op.execute(
+        "CREATE VIRTUAL TABLE user_search USING fts5("
+        "username, nickname, content='user', content_rowid='id', tokenize='trigram')"
+    )
+    op.execute(
+        """CREATE TRIGGER user_search_insert AFTER INSERT ON user BEGIN
+            INSERT INTO user_search(rowid, username, nickname)
+            VALUES (new.id, new.username, new.nickname);
+        END"""
+    )
+    op.execute(
+        """CREATE TRIGGER user_search_delete AFTER DELETE ON user BEGIN
+            INSERT INTO user_search(user_search, rowid, username, nickname)
+            VALUES ('delete', old.id, old.username, old.nickname);
+        END"""
+    )
+    op.execute(
+        """CREATE TRIGGER user_search_update
+        AFTER UPDATE OF username, nickname ON user BEGIN
+            INSERT INTO user_search(user_search, rowid, username, nickname)
+            VALUES ('delete', old.id, old.username, old.nickname);
+            INSERT INTO user_search(rowid, username, nickname)
+            VALUES (new.id, new.username, new.nickname);
+        END"""
+    )
+    # Index the existing users
+    op.execute("INSERT INTO user_search(user_search) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for trigger in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS user_search")
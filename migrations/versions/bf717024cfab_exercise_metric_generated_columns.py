@@ -0,0 +1,70 @@
+"""Exercise metric generated columns
+
+Revision ID: bf717024cfab
+Revises: 013a90a54ca9
+Create Date: 2026-10-18 12:40:05.618290
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "bf717024cfab"
+down_revision = "013a90a54ca9"
+branch_labels = None
+depends_on = None
+
+METRICS = ["distance", "duration", "weight", "sets", "reps"]
+INDEXED_METRICS = ["distance", "duration", "weight"]
+
+
+def metric_expression(metric):
+    if op.get_bind().dialect.name == "postgresql":
+        return f"((metrics ->> '{metric}')::double precision)"
+    return f"json_extract(metrics, '$.{metric}')"
+
+
+def upgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        # The generated columns pin the type of `metrics`, so move to JSONB first
+        op.alter_column(
+            "exercise",
+            "metrics",
+            type_=postgresql.JSONB(),
+            postgresql_using="metrics::jsonb",
+        )
+    # SQLite can only add VIRTUAL generated columns, which is what we want anyway.
+    # PostgreSQL only has STORED ones.
+    for metric in METRICS:
+        op.add_column(
+            "exercise",
+            sa.Column(
+                metric,
+                sa.Float(),
+                sa.Computed(metric_expression(metric)),
+                nullable=True,
+            ),
+        )
+    for metric in INDEXED_METRICS:
+        op.create_index(
+            f"ix_exercise_user_type_{metric}",
+            "exercise",
+            ["user_id", "type", metric],
+            unique=False,
+        )
+
+
+def downgrade():
+    for metric in INDEXED_METRICS:
+        op.drop_index(f"ix_exercise_user_type_{metric}", table_name="exercise")
+    # Generated columns cannot be dropped with ALTER TABLE on SQLite
+    with op.batch_alter_table("exercise", schema=None) as batch_op:
+        for metric in reversed(METRICS):
+            batch_op.drop_column(metric)
+    if op.get_bind().dialect.name == "postgresql":
+        op.alter_column(
+            "exercise", "metrics", type_=sa.JSON(), postgresql_using="metrics::json"
+        )
@@ -0,0 +1,45 @@
+"""Store created_at with microseconds on SQLite
+
+Revision ID: e7b4c2a91d05
+Revises: 5c1e0d7b8a42
+Create Date: 2026-10-18 21:14:09.583121
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "e7b4c2a91d05"
+down_revision = "5c1e0d7b8a42"
+branch_labels = None
+depends_on = None
+
+TABLES = [
+    "user",
+    "exercise",
+    "achievement",
+    "body_measurement",
+    "calorie_intake",
+    "water_intake",
+    "goal",
+    "share",
+]
+
+
+def upgrade():
+    # CURRENT_TIMESTAMP stored "YYYY-MM-DD HH:MM:SS", which SQLite compares as
+    # text below the "YYYY-MM-DD HH:MM:SS.ffffff" of the datetimes bound in
+    # queries. Other databases store real timestamps.
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for name in TABLES:
+        op.execute(
+            f"UPDATE \"{name}\" SET created_at = created_at || '.000000' "
+            "WHERE length(created_at) = 19"
+        )
+
+
+def downgrade():
+    # The padded timestamps are the same times, there is nothing to undo
+    pass
@@ -1,13 +1,28 @@
 import os
+import re
+import time
 
+import click
 import wtforms_json
 from flask import Flask
 
 from server.models import db, migrate
-from server.utils.context_processors import inject_pytz
+from server.utils.assets import assets, build_assets
+from server.utils.aggregates import rebuild_exercise_totals, rebuild_daily_summaries
+from server.utils.compression import init_compression
+from server.utils.context_processors import inject_avatar_url, inject_pytz
+from server.utils.database import resolve_database_url
+from server.utils.fragments import fragment_cache
 from server.utils.json_provider import JSONProvider
-from server.utils.login_manager import login_manager
-from server.utils.mail import mail
+from server.utils.login_manager import init_login_manager
+from server.utils.mail import mail, run_mail_worker
+from server.utils.metrics import init_metrics
+from server.utils.replica import init_replica, sync_replica
+from server.utils.security import calibrate_rounds, password_hasher
+from server.utils.sqlite import init_sqlite
+from server.utils.throttle import login_throttle
+from server.utils.transaction import init_transaction
+from server.utils.weather import init_weather
 
 
 def init_config(app, config_class):
@@ -35,28 +50,77 @@ def init_config(app, config_class):
     except OSError:
         pass
     app.config.from_pyfile("config.py", silent=True)
+    if app.config.get("DATABASE_URL"):
+        uri = resolve_database_url(app.config["DATABASE_URL"])
+        app.config["SQLALCHEMY_DATABASE_URI"] = uri
+        if uri.startswith("postgresql"):
+            app.config["SQLALCHEMY_ENGINE_OPTIONS"] = app.config[
+                "POSTGRES_ENGINE_OPTIONS"
+            ]
+    app.logger.setLevel(app.config["LOG_LEVEL"])
+
+
+def set_instance_config(app, name, value):
+    # Sets a setting in the instance config file, replacing its previous value
+    path = os.path.join(app.instance_path, "config.py")
+    lines = []
+    if os.path.exists(path):
+        with open(path) as f:
+            lines = f.read().splitlines()
+    setting = f"{name} = {value!r}"
+    pattern = re.compile(rf"^{name}\s*=")
+    if any(pattern.match(line) for line in lines):
+        lines = [setting if pattern.match(line) else line for line in lines]
+    else:
+        lines.append(setting)
+    os.makedirs(app.instance_path, exist_ok=True)
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
 
 
 def init_extensions(app):
+    # Compress responses. Registered first, as after_request handlers run in
+    # reverse order, so it sees the final response
+    init_compression(app)
+
     # Initialize the context processors
     app.context_processor(inject_pytz)
+    app.context_processor(inject_avatar_url)
+
+    # Fingerprint the static files
+    assets.init_app(app)
 
     # Set the JSON provider to use the custom JSONProvider
     app.json = JSONProvider(app)
 
+    # Cache rendered template fragments, `{% cache %}` in the templates. After
+    # the JSON provider, the Jinja environment is created here and keeps it
+    fragment_cache.init_app(app)
+
     # Initialize WTForms JSON support
     wtforms_json.init()
 
     # Initialize the database
+    init_replica(app)
     db.init_app(app)
     migrate.init_app(app, db)
+    init_sqlite(app, db)
+    init_transaction(app)
 
     # Initialize the login manager
-    login_manager.init_app(app)
+    init_login_manager(app)
 
     # Initialize Flask-Mail
     mail.init_app(app)
 
+    # Initialize the weather forecast cache
+    init_weather(app)
+
+    # Initialize the password hashing pool, the login throttle and /metrics
+    password_hasher.init_app(app)
+    login_throttle.init_app(app)
+    init_metrics(app)
+
 
 def init_blueprints(app):
     # Register the blueprints
@@ -65,12 +129,14 @@ def init_blueprints(app):
     from server.blueprints.user.routes import user_bp
     from server.blueprints.browse.routes import browse_bp
     from server.blueprints.share.routes import share_bp
+    from server.blueprints.analytics.routes import analytics_bp
 
     app.register_blueprint(index_bp)
     app.register_blueprint(dashboard_bp, url_prefix="/dashboard")
     app.register_blueprint(user_bp, url_prefix="/user")
     app.register_blueprint(browse_bp, url_prefix="/browse")
     app.register_blueprint(share_bp, url_prefix="/share")
+    app.register_blueprint(analytics_bp, url_prefix="/api/analytics")
 
 
 def register_commands(app):
@@ -79,6 +145,65 @@ def register_commands(app):
         with app.app_context():
             db.create_all()
 
+    @app.cli.command("rebuild-exercise-totals")
+    def rebuild_exercise_totals_command():
+        with app.app_context():
+            count = rebuild_exercise_totals()
+            click.echo(f"Rebuilt {count} exercise totals.")
+
+    @app.cli.command("rebuild-daily-summaries")
+    def rebuild_daily_summaries_command():
+        with app.app_context():
+            count = rebuild_daily_summaries()
+            click.echo(f"Rebuilt {count} daily summaries.")
+
+    @app.cli.command("sync-replica")
+    @click.option("--interval", type=float, help="Keep syncing every N seconds.")
+    def sync_replica_command(interval):
+        with app.app_context():
+            while True:
+                sync_replica()
+                click.echo("Replica synced.")
+                if not interval:
+                    break
+                time.sleep(interval)
+
+    @app.cli.command("build-assets")
+    def build_assets_command():
+        count = build_assets(app.static_folder)
+        click.echo(f"Built {count} precompressed static files.")
+
+    @app.cli.command("mail-worker")
+    @click.option(
+        "--interval",
+        type=float,
+        default=5,
+        show_default=True,
+        help="Seconds between two polls of an empty outbox.",
+    )
+    @click.option("--once", is_flag=True, help="Stop once the outbox is empty.")
+    def mail_worker_command(interval, once):
+        with app.app_context():
+            run_mail_worker(interval, once)
+
+    @app.cli.command("calibrate-bcrypt")
+    @click.option(
+        "--target-ms",
+        type=float,
+        default=250,
+        show_default=True,
+        help="Longest acceptable time to hash or verify a password.",
+    )
+    @click.option("--save/--no-save", default=True, help="Record it in config.py.")
+    def calibrate_bcrypt_command(target_ms, save):
+        rounds, timings = calibrate_rounds(target_ms / 1000)
+        for cost, seconds in timings.items():
+            click.echo(f"Cost {cost}: {seconds * 1000:.1f} ms")
+        click.echo(f"Cost {rounds} fits {target_ms:g} ms on this host.")
+        if save:
+            set_instance_config(app, "BCRYPT_ROUNDS", rounds)
+            click.echo(f"Recorded BCRYPT_ROUNDS = {rounds} in the instance config.")
+
 
 def create_app(config_class=None):
     # Create and configure the app
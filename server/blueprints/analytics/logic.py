@@ -0,0 +1,121 @@
+from datetime import date, datetime, timedelta, timezone
+
+from flask_login import current_user
+from sqlalchemy import func
+
+from server.blueprints.dashboard.logic import get_weight
+from server.models import db, Exercise, BodyMeasurement, DailySummary
+from server.utils.aggregates import created_date
+from server.utils.constants import BodyMeasurementType, ExerciseType, EXERCISE_METRICS
+from server.utils.exercise_stats import METRICS, summarise_exercises
+from server.utils.pagination import filter_date_range
+from server.utils.replica import use_replica
+
+# How a metric is combined over a day, the others are summed
+DAILY_AGGREGATES = {"weight": func.max}
+
+
+def last_days(days: int) -> tuple[date, date]:
+    """Returns the first and last UTC date of a window ending today."""
+    end_date = datetime.now(timezone.utc).date()
+    return end_date - timedelta(days=days - 1), end_date
+
+
+def parse_type(enum, name: str | None):
+    """Returns the member of a type enum named by a query argument."""
+    if name not in enum.__members__:
+        raise ValueError(f"Unknown type: {name}")
+    return enum[name]
+
+
+def exercise_query(*columns, start_date=None, end_date=None):
+    query = db.session.query(*columns).filter(Exercise.user_id == current_user.id)
+    return filter_date_range(query, Exercise.created_at, start_date, end_date)
+
+
+@use_replica()
+def get_exercise_summary(start_date=None, end_date=None) -> dict:
+    rows = exercise_query(
+        Exercise.type,
+        Exercise.created_at,
+        *(getattr(Exercise, metric) for metric in METRICS),
+        start_date=start_date,
+        end_date=end_date,
+    ).order_by(Exercise.created_at.desc())
+    return summarise_exercises(rows)
+
+
+@use_replica()
+def get_exercise_daily(exercise_type: str, days: int) -> dict:
+    """Totals of the metrics of one exercise type on each day it was done."""
+    exercise_type = parse_type(ExerciseType, exercise_type)
+    metrics = EXERCISE_METRICS[exercise_type]
+    start_date, end_date = last_days(days)
+    day = created_date(Exercise.created_at)
+    rows = (
+        exercise_query(
+            day,
+            *(
+                DAILY_AGGREGATES.get(metric, func.sum)(getattr(Exercise, metric))
+                for metric in metrics
+            ),
+            start_date=start_date,
+            end_date=end_date,
+        )
+        .filter(Exercise.type == exercise_type)
+        .group_by(day)
+        .order_by(day)
+    )
+    return {str(date): dict(zip(metrics, totals)) for date, *totals in rows}
+
+
+def measurement_trend(measurement_type: BodyMeasurementType, days: int) -> dict:
+    start_date, end_date = last_days(days)
+    trend = {str(start_date + timedelta(days=n)): None for n in range(days)}
+    # Oldest first, so the latest measurement of each day wins
+    measurements = (
+        filter_date_range(
+            BodyMeasurement.get_by_user(current_user.id, type=measurement_type),
+            BodyMeasurement.created_at,
+            start_date,
+            end_date,
+        )
+        .order_by(None)
+        .order_by(BodyMeasurement.created_at)
+    )
+    for measurement in measurements:
+        trend[str(measurement.created_at.date())] = measurement.value
+    return trend
+
+
+@use_replica()
+def get_weight_trend(days: int) -> dict:
+    return measurement_trend(BodyMeasurementType.WEIGHT, days)
+
+
+@use_replica()
+def get_body_measurement_trend(measurement_type: str, days: int) -> dict:
+    return measurement_trend(parse_type(BodyMeasurementType, measurement_type), days)
+
+
+@use_replica()
+def get_calorie_intake(days: int) -> dict:
+    start_date, end_date = last_days(days)
+    summaries = DailySummary.get_range(current_user.id, start_date, end_date)
+    return {
+        str(summary.date): summary.calorie_intake
+        for summary in summaries
+        if summary.calorie_intake > 0
+    }
+
+
+@use_replica()
+def get_burned_calories(days: int) -> dict:
+    weight_kg = get_weight() or 70
+    start_date, end_date = last_days(days)
+    summaries = DailySummary.get_range(current_user.id, start_date, end_date)
+    return {
+        str(summary.date): round(0.0175 * weight_kg * summary.met_minutes, 2)
+        for summary in summaries
+        if summary.exercise_count > 0
+    }
@@ -0,0 +1,73 @@
+from datetime import date
+
+from flask import Blueprint, request
+from flask_login import login_required
+
+from server.blueprints.analytics import logic
+from server.blueprints.user.logic import get_data_version
+from server.utils.decorators import api_response, conditional
+
+analytics_bp = Blueprint("analytics", __name__)
+
+# Longest window of the daily series, in days
+MAX_DAYS = 366
+
+
+def date_range_args() -> dict:
+    # Malformed dates are ignored, as if the range were open on that side
+    return {
+        "start_date": request.args.get("start_date", type=date.fromisoformat),
+        "end_date": request.args.get("end_date", type=date.fromisoformat),
+    }
+
+
+def days_arg() -> int:
+    return min(max(request.args.get("days", 14, type=int), 1), MAX_DAYS)
+
+
+@analytics_bp.route("/exercises", methods=["GET"])
+@login_required
+@conditional(get_data_version)
+@api_response
+def exercises():
+    return logic.get_exercise_summary(**date_range_args())
+
+
+@analytics_bp.route("/exercise_daily", methods=["GET"])
+@login_required
+@conditional(get_data_version)
+@api_response
+def exercise_daily():
+    return logic.get_exercise_daily(request.args.get("type"), days_arg())
+
+
+@analytics_bp.route("/weight", methods=["GET"])
+@login_required
+@conditional(get_data_version)
+@api_response
+def weight():
+    return logic.get_weight_trend(days_arg())
+
+
+@analytics_bp.route("/body_measurement", methods=["GET"])
+@login_required
+@conditional(get_data_version)
+@api_response
+def body_measurement():
+    return logic.get_body_measurement_trend(request.args.get("type"), days_arg())
+
+
+@analytics_bp.route("/calorie_intake", methods=["GET"])
+@login_required
+@conditional(get_data_version)
+@api_response
+def calorie_intake():
+    return logic.get_calorie_intake(days_arg())
+
+
+@analytics_bp.route("/calories_burned", methods=["GET"])
+@login_required
+@conditional(get_data_version)
+@api_response
+def calories_burned():
+    return logic.get_burned_calories(days_arg())
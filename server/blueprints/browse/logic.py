@@ -1,3 +1,4 @@
+from flask import current_app
 from flask_login import current_user
 from sqlalchemy.exc import SQLAlchemyError
 
@@ -9,7 +10,11 @@ from server.models import (
     Achievement,
     CalorieIntake,
 )
-from server.utils.constants import ExerciseType, EXERCISE_METRICS, ACHIEVEMENTS
+from server.utils.achievements import check_achievements
+from server.utils.constants import ExerciseType, EXERCISE_METRICS
+from server.utils.pagination import filter_date_range, keyset_page
+from server.utils.replica import use_replica
+from server.utils.transaction import retry_on_lock
 
 
 def get_exercise_types() -> dict:
@@ -20,6 +25,34 @@ def get_exercises_metrics() -> dict:
     return {e.name: EXERCISE_METRICS[e] for e in ExerciseType}
 
 
+def page_size(limit: int | None) -> int:
+    if not limit or limit < 1:
+        return current_app.config["BROWSE_PAGE_SIZE"]
+    return min(limit, current_app.config["BROWSE_MAX_PAGE_SIZE"])
+
+
+def type_filter(enum, type: str | None) -> dict:
+    if type is None:
+        return {}
+    if type not in enum.__members__:
+        raise ValueError(f"Unknown type: {type}")
+    return {"type": enum[type]}
+
+
+@use_replica()
+def get_exercise_page(
+    cursor=None, start_date=None, end_date=None, limit=None, type=None
+) -> dict:
+    query = filter_date_range(
+        Exercise.get_by_user(current_user.id, **type_filter(ExerciseType, type)),
+        Exercise.created_at,
+        start_date,
+        end_date,
+    )
+    return keyset_page(query, Exercise, cursor, page_size(limit))
+
+
+@retry_on_lock
 def add_exercise_data(
     exercise_type: ExerciseType,
     metrics,
@@ -33,28 +66,11 @@ def add_exercise_data(
             created_at=created_at,
         )
         db.session.add(new_exercise)
-        # Check achievements
-        exercises = current_user.exercises.filter_by(type=exercise_type).all()
-        total = sum(
-            float(ex.metrics.get(EXERCISE_METRICS[exercise_type][0], 0))
-            for ex in exercises
-        )
-        achievements = current_user.achievements.filter_by(
-            exercise_type=exercise_type
-        ).all()
-        new_achievement = None
-        for milestone in ACHIEVEMENTS[exercise_type]:
-            if total >= milestone and not any(
-                a.milestone == milestone for a in achievements
-            ):
-                new_achievement = Achievement(
-                    user_id=current_user.id,
-                    exercise_type=exercise_type,
-                    milestone=milestone,
-                )
-                db.session.add(new_achievement)
+        # Flush first so the running totals include the new exercise
+        db.session.flush()
+        achievements = check_achievements(current_user.id, exercise_type, metrics)
         db.session.commit()
-        return new_achievement
+        return achievements[-1] if achievements else None
     except SQLAlchemyError as e:
         db.session.rollback()
         raise RuntimeError(f"Error adding exercise data: {str(e)}")
@@ -64,6 +80,22 @@ def get_body_measurement_types() -> dict:
     return {e.name: str(e) for e in BodyMeasurementType}
 
 
+@use_replica()
+def get_body_measurement_page(
+    cursor=None, start_date=None, end_date=None, limit=None, type=None
+) -> dict:
+    query = filter_date_range(
+        BodyMeasurement.get_by_user(
+            current_user.id, **type_filter(BodyMeasurementType, type)
+        ),
+        BodyMeasurement.created_at,
+        start_date,
+        end_date,
+    )
+    return keyset_page(query, BodyMeasurement, cursor, page_size(limit))
+
+
+@retry_on_lock
 def add_body_measurement_data(
     bm_type: BodyMeasurementType,
     value,
@@ -83,6 +115,21 @@ def add_body_measurement_data(
         raise RuntimeError(f"Error adding body measurement data: {str(e)}")
 
 
+@use_replica()
+def get_calorie_intake_page(
+    cursor=None, start_date=None, end_date=None, limit=None, type=None
+) -> dict:
+    # Calorie intakes have no type, the argument is accepted to share page_args
+    query = filter_date_range(
+        CalorieIntake.get_by_user(current_user.id),
+        CalorieIntake.created_at,
+        start_date,
+        end_date,
+    )
+    return keyset_page(query, CalorieIntake, cursor, page_size(limit))
+
+
+@retry_on_lock
 def add_calorie_intake_data(calories, description, created_at):
     try:
         new_calorie_intake = CalorieIntake(
@@ -1,5 +1,7 @@
+from datetime import date
+
 from flask import Blueprint, render_template, flash, redirect, url_for, request
-from flask_login import login_required, current_user
+from flask_login import login_required
 
 from server.blueprints.browse import logic
 from server.blueprints.browse.forms import (
@@ -7,13 +9,16 @@ from server.blueprints.browse.forms import (
     BodyMeasurementForm,
     CalorieIntakeForm,
 )
+from server.blueprints.user.logic import get_data_version
 from server.utils.constants import ExerciseType, BodyMeasurementType
+from server.utils.decorators import api_response, conditional
 
 browse_bp = Blueprint("browse", __name__, template_folder="templates")
 
 
 @browse_bp.route("/", methods=["GET"])
 @login_required
+@conditional(get_data_version)
 def index():
     exercise_form = ExerciseForm()
     body_measurement_form = BodyMeasurementForm()
@@ -29,18 +34,48 @@ def index():
     )
 
 
+def page_args() -> dict:
+    # Malformed dates and limits are ignored, a malformed cursor or an unknown
+    # type raises ValueError
+    return {
+        "cursor": request.args.get("cursor"),
+        "type": request.args.get("type"),
+        "start_date": request.args.get("start_date", type=date.fromisoformat),
+        "end_date": request.args.get("end_date", type=date.fromisoformat),
+        "limit": request.args.get("limit", type=int),
+    }
+
+
+def render_analytic(data_type: str, get_page=None):
+    # Without get_page the charts fetch their series from /api/analytics instead
+    args = page_args()
+    page = {"items": [], "next_cursor": None}
+    try:
+        if get_page is not None:
+            page = get_page(**args)
+    except ValueError as e:
+        flash(str(e), "danger")
+        return redirect(url_for(request.endpoint))
+    return render_template(
+        "browse/analytic.html",
+        data_type=data_type,
+        items=page["items"],
+        next_cursor=page["next_cursor"],
+        cursor=args["cursor"],
+        start_date=args["start_date"],
+        end_date=args["end_date"],
+        exercise_metrics=logic.get_exercises_metrics(),
+        exercise_types=logic.get_exercise_types(),
+        body_measurement_types=logic.get_body_measurement_types(),
+    )
+
+
 @browse_bp.route("/exercise", methods=["GET", "POST"])
 @login_required
+@conditional(get_data_version)
 def exercise():
     if request.method == "GET":
-        return render_template(
-            "browse/analytic.html",
-            exercises=current_user.exercises.all(),
-            body_measurements=[],
-            exercise_metrics=logic.get_exercises_metrics(),
-            exercise_types=logic.get_exercise_types(),
-            body_measurement_types=logic.get_body_measurement_types(),
-        )
+        return render_analytic("exercises")
 
     form = ExerciseForm()
     if form.validate_on_submit():
@@ -63,18 +98,20 @@ def exercise():
     return redirect(url_for("browse.index"))
 
 
+@browse_bp.route("/exercise/data", methods=["GET"])
+@login_required
+@conditional(get_data_version)
+@api_response
+def exercise_data():
+    return logic.get_exercise_page(**page_args())
+
+
 @browse_bp.route("/body_measurement", methods=["GET", "POST"])
 @login_required
+@conditional(get_data_version)
 def body_measurement():
     if request.method == "GET":
-        return render_template(
-            "browse/analytic.html",
-            exercises=[],
-            body_measurements=current_user.body_measurements.all(),
-            exercise_metrics=logic.get_exercises_metrics(),
-            exercise_types=logic.get_exercise_types(),
-            body_measurement_types=logic.get_body_measurement_types(),
-        )
+        return render_analytic("body_measurements", logic.get_body_measurement_page)
 
     form = BodyMeasurementForm()
     if form.validate_on_submit():
@@ -92,6 +129,14 @@ def body_measurement():
     return redirect(request.form.get("referrer", url_for("browse.index")))
 
 
+@browse_bp.route("/body_measurement/data", methods=["GET"])
+@login_required
+@conditional(get_data_version)
+@api_response
+def body_measurement_data():
+    return logic.get_body_measurement_page(**page_args())
+
+
 @browse_bp.route("/calorie_intake", methods=["POST"])
 @login_required
 def calorie_intake():
@@ -109,3 +154,11 @@ def calorie_intake():
     else:
         flash(str(form.errors), "danger")
     return redirect(url_for("browse.index"))
+
+
+@browse_bp.route("/calorie_intake/data", methods=["GET"])
+@login_required
+@conditional(get_data_version)
+@api_response
+def calorie_intake_data():
+    return logic.get_calorie_intake_page(**page_args())
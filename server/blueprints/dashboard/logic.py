@@ -1,41 +1,35 @@
-import requests
-from datetime import datetime, timezone
+from datetime import datetime
 from sqlalchemy.exc import SQLAlchemyError
+from flask import current_app
 from flask_login import current_user
-from collections import defaultdict
 
-from server.models import ScheduledExercise, Goal, db, BodyMeasurementType, WaterIntake
+from server.models import (
+    ScheduledExercise,
+    Goal,
+    db,
+    BodyMeasurementType,
+    WaterIntake,
+    DailySummary,
+)
 from server.utils.constants import ExerciseType, ACHIEVEMENTS
+from server.utils.replica import use_replica
+from server.utils.transaction import retry_on_lock
+from server.utils.weather import get_forecast
 
 
-def fetch_weather_forecast(city, days=5):
-    api_key = "5118a8c67aec70333dac3704a6b65bb6"
-    url = "https://api.openweathermap.org/data/2.5/forecast"
-    params = {"q": city, "units": "metric", "appid": api_key}
-    resp = requests.get(url, params=params, timeout=5)
-    data = resp.json()
-
-    weather_forecast = []
-    seen_dates = set()
-    for item in data.get("list", []):
-        date_str = datetime.fromtimestamp(item["dt"], tz=timezone.utc).strftime("%a %d")
-        if date_str not in seen_dates and len(weather_forecast) < days:
-            weather_forecast.append(
-                {
-                    "date": date_str,
-                    "icon_url": f"https://openweathermap.org/img/wn/{item['weather'][0]['icon']}@2x.png",
-                    "temp": round(item["main"]["temp"]),
-                    "description": item["weather"][0]["main"],
-                }
-            )
-            seen_dates.add(date_str)
-    return weather_forecast
+def get_weather_city() -> str:
+    return current_user.city or current_app.config["WEATHER_CITY"]
+
+
+def get_weather_forecast(days=5):
+    return get_forecast(get_weather_city(), days)
 
 
 def get_all_achievements() -> dict:
     return ACHIEVEMENTS
 
 
+@use_replica()
 def get_achievements_by_type() -> dict:
     achievements = {}
     for achievement in current_user.achievements:
@@ -45,6 +39,13 @@ def get_achievements_by_type() -> dict:
     return achievements
 
 
+@use_replica()
+def get_achievements_version() -> int:
+    # Achievements are only ever added, so their count versions them
+    return current_user.achievements.order_by(None).count()
+
+
+@use_replica()
 def get_weight():
     latest_weight = current_user.body_measurements.filter_by(
         type=BodyMeasurementType.WEIGHT
@@ -52,6 +53,7 @@ def get_weight():
     return latest_weight.value if latest_weight else None
 
 
+@use_replica()
 def get_height():
     latest_height = current_user.body_measurements.filter_by(
         type=BodyMeasurementType.HEIGHT
@@ -59,6 +61,7 @@ def get_height():
     return latest_height.value if latest_height else None
 
 
+@use_replica()
 def get_bmi():
     weight_kg = get_weight()
     height_cm = get_height()
@@ -80,34 +83,7 @@ def get_bmi():
     return bmi, bmi_category
 
 
-def get_burned_calories():
-    weight_kg = get_weight()
-    if not weight_kg:
-        weight_kg = 70
-
-    met_values = {
-        ExerciseType.RUNNING: 9.8,
-        ExerciseType.CYCLING: 7.5,
-        ExerciseType.SWIMMING: 8.0,
-        ExerciseType.WEIGHTLIFTING: 6.0,
-        ExerciseType.YOGA: 3.0,
-    }
-
-    burned_by_date = defaultdict(float)
-    for ex in current_user.exercises.all():
-        if ex.type == ExerciseType.WEIGHTLIFTING:
-            # Estimate duration: assume 4 seconds per rep
-            sets = int(ex.metrics.get("sets"))
-            reps = int(ex.metrics.get("reps"))
-            duration = (sets * reps * 4) / 60  # duration in minutes
-        else:
-            duration = float(ex.metrics.get("duration"))
-        met = met_values.get(ex.type, 6.0)  # default MET if not found
-        burned = round(0.0175 * met * weight_kg * duration, 2)
-        burned_by_date[str(ex.created_at.date())] += burned
-    return burned_by_date
-
-
+@retry_on_lock
 def add_schedule(exercise_type: ExerciseType, scheduled_time, day_of_week, note):
     try:
         new_se = ScheduledExercise(
@@ -124,6 +100,7 @@ def add_schedule(exercise_type: ExerciseType, scheduled_time, day_of_week, note)
         raise RuntimeError(f"Error adding scheduled exercise: {str(e)}")
 
 
+@retry_on_lock
 def delete_schedule(schedule_id: int):
     try:
         schedule = db.session.get(ScheduledExercise, schedule_id)
@@ -135,6 +112,7 @@ def delete_schedule(schedule_id: int):
         raise RuntimeError(f"Error deleting schedule: {str(e)}")
 
 
+@retry_on_lock
 def edit_schedule(
     schedule_id: int,
     exercise_type: ExerciseType,
@@ -154,6 +132,7 @@ def edit_schedule(
         raise RuntimeError(f"Error editing schedule: {str(e)}")
 
 
+@retry_on_lock
 def add_goal(exercise_type: ExerciseType, metric, target_value, description):
     try:
         new_goal = Goal(
@@ -170,6 +149,7 @@ def add_goal(exercise_type: ExerciseType, metric, target_value, description):
         raise RuntimeError(f"Error adding goal: {str(e)}")
 
 
+@retry_on_lock
 def delete_goal(goal_id: int):
     try:
         goal = db.session.get(Goal, goal_id)
@@ -181,6 +161,7 @@ def delete_goal(goal_id: int):
         raise RuntimeError(f"Error deleting goal: {str(e)}")
 
 
+@retry_on_lock
 def edit_goal(
     goal_id: int,
     exercise_type: ExerciseType,
@@ -200,6 +181,7 @@ def edit_goal(
         raise RuntimeError(f"Error editing goal: {str(e)}")
 
 
+@retry_on_lock
 def add_water_intake(amount: float):
     try:
         new_water_intake = WaterIntake(
@@ -213,15 +195,13 @@ def add_water_intake(amount: float):
         raise RuntimeError(f"Error adding water intake: {str(e)}")
 
 
+@use_replica()
 def get_water_intake(target_date: datetime) -> float:
-    water_intakes = current_user.water_intakes.all()
-    water_today = 0
-    for intake in water_intakes:
-        if intake.created_at.date() == target_date.date():
-            water_today += intake.amount
-    return water_today
+    summary = DailySummary.get_by_user(current_user.id, date=target_date.date()).first()
+    return summary.water_intake if summary else 0
 
 
+@retry_on_lock
 def delete_latest_water_intake():
     try:
         water_intake = current_user.water_intakes.order_by(
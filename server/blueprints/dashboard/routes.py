@@ -6,20 +6,22 @@ from flask_login import login_required
 from server.blueprints.browse.forms import BodyMeasurementForm
 from server.blueprints.dashboard import logic
 from server.blueprints.dashboard.forms import ScheduleExerciseForm, GoalForm
+from server.blueprints.user.logic import get_data_version
 from server.utils.constants import ExerciseType, EXERCISE_METRICS
-from server.utils.decorators import api_response
+from server.utils.decorators import api_response, conditional
 
 dashboard_bp = Blueprint("dashboard", __name__, template_folder="templates")
 
 
 @dashboard_bp.route("/", methods=["GET", "POST"])
 @login_required
+@conditional(get_data_version)
 def index():
     body_measurement_form = BodyMeasurementForm()
     schedule_form = ScheduleExerciseForm()
     goal_form = GoalForm()
 
-    weather_forecast = logic.fetch_weather_forecast("Perth", days=5)
+    weather_forecast = logic.get_weather_forecast(days=5)
     bmi, bmi_category = logic.get_bmi()
     return render_template(
         "dashboard/index.html",
@@ -27,12 +29,15 @@ def index():
         schedule_form=schedule_form,
         goal_form=goal_form,
         weather_forecast=weather_forecast,
+        weather_city=logic.get_weather_city(),
         bmi=bmi,
         bmi_category=bmi_category,
         metrics_by_type={e.name: EXERCISE_METRICS[e] for e in ExerciseType},
-        achievements_by_type=logic.get_achievements_by_type(),
+        # Called by the cached fragments on a miss only
+        get_achievements_by_type=logic.get_achievements_by_type,
         all_achievements=logic.get_all_achievements(),
-        burned_by_date=logic.get_burned_calories(),
+        achievements_version=logic.get_achievements_version(),
+        data_version=get_data_version(),
     )
 
 
@@ -140,6 +145,7 @@ def edit_goal(goal_id):
 
 
 @dashboard_bp.route("/water", methods=["GET", "POST", "DELETE"])
+@conditional(get_data_version)
 @api_response
 @login_required
 def water():
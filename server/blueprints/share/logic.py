@@ -3,10 +3,13 @@ import uuid
 from flask_login import current_user
 from sqlalchemy.exc import SQLAlchemyError
 
-from server.models import db, Share, Exercise, BodyMeasurement, Achievement
+from server.models import db, Share, Exercise, BodyMeasurement, Achievement, User
 from server.utils.constants import ExerciseType, BodyMeasurementType
+from server.utils.replica import use_replica
+from server.utils.transaction import retry_on_lock
 
 
+@use_replica()
 def get_shared_data(
     sender_id: int,
     scope: dict,
@@ -92,6 +95,25 @@ def get_shared(share_id: uuid.UUID) -> dict[str, list]:
         raise RuntimeError(f"Error retrieving share: {str(e)}")
 
 
+def get_share_version(share_id: uuid.UUID) -> int | None:
+    """
+    The data version of the sender of a share, None if the current user cannot
+    see it.
+    """
+    return (
+        db.session.query(User.data_version)
+        .join(Share, Share.sender_id == User.id)
+        .filter(
+            Share.id == share_id,
+            Share.deleted.is_(False),
+            (Share.sender_id == current_user.id)
+            | (Share.receiver_id == current_user.id),
+        )
+        .scalar()
+    )
+
+
+@retry_on_lock
 def create_share(
     sender_id: int,
     receiver_id: int,
@@ -126,6 +148,7 @@ def create_share(
         raise RuntimeError(f"Error creating share: {str(e)}")
 
 
+@retry_on_lock
 def delete_share(share_id: uuid.UUID):
     """
     Delete a share record from the database.
@@ -4,13 +4,15 @@ from flask_login import login_required, current_user
 import server.blueprints.browse.logic as browse_logic
 import server.blueprints.share.logic as share_logic
 from server.blueprints.share.forms import ShareForm, PreviewForm
-from server.utils.decorators import api_response
+from server.blueprints.user.logic import get_data_version
+from server.utils.decorators import api_response, conditional
 
 share_bp = Blueprint("share", __name__, template_folder="templates")
 
 
 @share_bp.route("/", methods=["GET"])
 @login_required
+@conditional(get_data_version)
 def index():
     form = ShareForm()
     return render_template(
@@ -39,6 +41,7 @@ def preview():
 
 @share_bp.route("/<uuid:share_id>", methods=["GET"])
 @login_required
+@conditional(share_logic.get_share_version)
 def view(share_id):
     if not share_id:
         raise ValueError("Share ID is required.")
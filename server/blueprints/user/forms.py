@@ -43,6 +43,11 @@ class UserInfoForm(EmailForm):
         ],
         validators=[Optional()],
     )
+    city = StringField(
+        "City",
+        filters=[lambda city: city.strip() if city else city],
+        validators=[Optional(), Length(max=100)],
+    )
 
 
 class LoginForm(PasswordForm, EmailForm):
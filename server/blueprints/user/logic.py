@@ -1,18 +1,29 @@
 import datetime
 import os
-import uuid
 
 from flask import current_app, url_for
 from flask_login import login_user, current_user, logout_user
-from flask_mail import Message
 from itsdangerous import URLSafeTimedSerializer
+from sqlalchemy import func
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from werkzeug.datastructures import FileStorage
 
-from server.models import db, User
-from server.utils.login_manager import login_manager
-from server.utils.mail import mail
-from server.utils.security import hash_password, check_password
+from server.models import db, User, user_search
+from server.utils.avatars import (
+    delete_avatar,
+    is_legacy_avatar,
+    is_stored,
+    store_avatar,
+)
+from server.utils.login_manager import (
+    CachedUser,
+    invalidate_user,
+    login_manager,
+    user_cache,
+)
+from server.utils.mail import queue_mail
+from server.utils.security import password_hasher
+from server.utils.transaction import retry_on_lock
 
 
 class UserConflictError(Exception):
@@ -28,12 +39,18 @@ class UserNotFoundError(Exception):
 
 
 @login_manager.user_loader
-def get_user_by_id(user_id: int) -> User | None:
-    """Finds a user by their ID."""
+def get_user_by_id(user_id: int) -> CachedUser | None:
+    """Finds a user by their ID, from the identity cache when possible."""
     if not user_id:
         return None
-    user = db.session.get(User, int(user_id))
-    return user
+    fields = user_cache.get(int(user_id))
+    if fields is None:
+        user = db.session.get(User, int(user_id))
+        if user is None:
+            return None
+        fields = CachedUser.fields_of(user)
+        user_cache.set(user.id, fields)
+    return CachedUser(fields)
 
 
 def get_user_by_email(email: str) -> User | None:
@@ -46,31 +63,97 @@ def get_user_by_email(email: str) -> User | None:
     return user
 
 
-def search_user(username: str) -> list[dict]:
-    """Fuzzy search for a user by username."""
-    if not username:
-        raise ValueError("Username cannot be empty")
-    users = (
-        db.session.query(User)
-        .filter(
-            User.username.ilike(f"%{username}%"),
-            User.id != current_user.id,  # Exclude the current user
+def get_data_version() -> int | None:
+    """The version of the current user's data, bumped by every write of it."""
+    if not current_user.is_authenticated:
+        return None
+    # Read from the primary, a lagging replica would hand out a stale version
+    return db.session.query(User.data_version).filter_by(id=current_user.id).scalar()
+
+
+# The trigram index cannot match anything shorter
+MIN_SUBSTRING_LENGTH = 3
+
+SEARCH_COLUMNS = (User.id, User.username, User.nickname, User.avatar)
+
+
+def username_prefix(query: str, dialect: str):
+    """
+    Usernames starting with the query, ignoring case, as a range the lower
+    username index can seek.
+    """
+    username = func.lower(User.username)
+    if dialect == "sqlite":
+        # LIKE cannot use an index on SQLite, and the database lowers the query
+        # as it lowers the usernames, which only folds ASCII
+        return (username >= func.lower(query)) & (
+            username < func.lower(query + "\U0010ffff")
+        )
+    return username.startswith(query.lower(), autoescape=True)
+
+
+def substring_matches(query: str, dialect: str, *filters, limit: int) -> list:
+    """Users whose username or nickname contains the query, best matches first."""
+    if dialect != "sqlite":
+        return (
+            db.session.query(*SEARCH_COLUMNS)
+            .filter(
+                User.username.icontains(query, autoescape=True)
+                | User.nickname.icontains(query, autoescape=True),
+                *filters,
+            )
+            .order_by(User.username)
+            .limit(limit)
+            .all()
         )
+    if len(query) < MIN_SUBSTRING_LENGTH:
+        return []
+    phrase = '"' + query.replace('"', '""') + '"'
+    return (
+        db.session.query(*SEARCH_COLUMNS)
+        .join(user_search, user_search.c.rowid == User.id)
+        .filter(user_search.c.user_search.match(phrase), *filters)
+        .order_by(user_search.c.rank)
+        .limit(limit)
         .all()
     )
-    user_list = []
-    for user in users:
-        user_list.append(
-            {
-                "id": user.id,
-                "username": user.username,
-                "nickname": user.nickname,
-                "avatar": user.avatar,
-            }
+
+
+def search_user(query: str, page: int = 1) -> list[dict]:
+    """
+    Typeahead search of the other users, by username or nickname.
+
+    Usernames starting with the query in any case come first, read from the
+    lower username index.
+    Only if they do not fill the page, users containing the query follow,
+    ranked by the SQLite trigram index, or by ILIKE on other databases.
+    Pages hold USER_SEARCH_PAGE_SIZE users, and past USER_SEARCH_MAX_RESULTS
+    users they are empty, so the cost of a search does not grow with the table.
+    """
+    query = (query or "").strip()
+    if not query:
+        raise ValueError("Search query cannot be empty")
+    page_size = current_app.config["USER_SEARCH_PAGE_SIZE"]
+    start = (max(page, 1) - 1) * page_size
+    end = min(start + page_size, current_app.config["USER_SEARCH_MAX_RESULTS"])
+    if start >= end:
+        return []
+
+    dialect = db.session.connection().dialect.name
+    prefix = username_prefix(query, dialect)
+    others = User.id != current_user.id  # Exclude the current user
+    users = (
+        db.session.query(*SEARCH_COLUMNS)
+        .filter(prefix, others)
+        .order_by(func.lower(User.username), User.username)
+        .limit(end)
+        .all()
+    )
+    if len(users) < end:
+        users += substring_matches(
+            query, dialect, ~prefix, others, limit=end - len(users)
         )
-    if not user_list:
-        raise UserNotFoundError(username)
-    return user_list
+    return [user._asdict() for user in users[start:end]]
 
 
 def check_user_integrity(e, username, email):
@@ -82,12 +165,16 @@ def check_user_integrity(e, username, email):
     raise RuntimeError("Failed to create user.") from e
 
 
+@retry_on_lock
 def login(email: str, plain_password: str, remember_me: bool) -> User:
     user = get_user_by_email(email)
-    if user and check_password(plain_password, user.password):
+    if user and password_hasher.check(plain_password, user.password):
         try:
             # Update the last login time
             user.last_login = datetime.datetime.now(datetime.UTC)
+            # Bring the hash to the configured cost while the password is known
+            if password_hasher.needs_rehash(user.password):
+                user.password = password_hasher.hash(plain_password)
             db.session.commit()
             login_user(user, remember=remember_me)
         except SQLAlchemyError as e:
@@ -101,6 +188,7 @@ def logout():
     logout_user()
 
 
+@retry_on_lock
 def create_user(
     username: str,
     password: str,
@@ -113,7 +201,7 @@ def create_user(
         new_user = User(
             username=username,
             nickname=nickname,
-            password=hash_password(password),  # Hash the password
+            password=password_hasher.hash(password),  # Hash the password
             email=email,
             date_of_birth=date_of_birth,
             sex=sex,
@@ -128,6 +216,7 @@ def create_user(
         raise RuntimeError("Failed to register user.") from e
 
 
+@retry_on_lock
 def update_user(
     username: str | None = None,
     email: str | None = None,
@@ -136,6 +225,7 @@ def update_user(
     sex: str | None = None,
     new_password: str | None = None,
     user: User | None = None,
+    city: str | None = None,
 ):
     if not any(
         [
@@ -145,6 +235,7 @@ def update_user(
             date_of_birth,
             sex,
             new_password,
+            city,
         ]
     ):
         return
@@ -166,8 +257,11 @@ def update_user(
         if sex is not None:
             user.sex = sex
         if new_password is not None:
-            user.password = hash_password(new_password)
+            user.password = password_hasher.hash(new_password)
+        if city is not None:
+            user.city = city or None
         db.session.commit()
+        invalidate_user(user.id)
     except IntegrityError as e:
         db.session.rollback()
         check_user_integrity(e, username, email)
@@ -176,38 +270,40 @@ def update_user(
         raise RuntimeError("Failed to update user.") from e
 
 
-def update_avatar(file: FileStorage):
-    ext = os.path.splitext(file.filename)[1]
-    filename = f"{uuid.uuid4()}{ext}"
-    avatar_folder = os.path.join(current_app.static_folder, "avatars")
-    os.makedirs(avatar_folder, exist_ok=True)
-    file_path = os.path.join(avatar_folder, filename)
-
-    old_avatar_path = (
-        os.path.join(avatar_folder, current_user.avatar.split("/")[-1])
-        if current_user.avatar
-        else None
-    )
+def remove_unused_avatar(avatar: str | None):
+    """Deletes the files of an avatar once no user has it anymore."""
+    if not avatar or db.session.query(User.id).filter_by(avatar=avatar).first():
+        return
+    if not is_legacy_avatar(avatar):
+        delete_avatar(avatar)
+        return
+    path = os.path.join(current_app.static_folder, avatar)
     try:
-        if old_avatar_path and os.path.exists(old_avatar_path):
-            os.remove(old_avatar_path)
+        if os.path.exists(path):
+            os.remove(path)
     except OSError as e:
         raise RuntimeError(f"Failed to delete old avatar: {e}") from e
 
+
+def update_avatar(file: FileStorage):
+    old_avatar = current_user.avatar
+    avatar = store_avatar(file.stream)  # Raises ValueError if it is not an image
+    if avatar == old_avatar:
+        return
     try:
-        file.save(file_path)
-        current_user.avatar = f"avatars/{filename}"
+        current_user.avatar = avatar
         db.session.commit()
+        invalidate_user(current_user.id)
     except SQLAlchemyError as e:
         db.session.rollback()
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        remove_unused_avatar(avatar)
         raise RuntimeError("Failed to upload avatar.") from e
-    except Exception as e:
-        # Handle any other exceptions that may occur
-        if os.path.exists(file_path):
-            os.remove(file_path)
-        raise RuntimeError(f"Failed to save avatar: {e}") from e
+    # The variants of an image uploaded before may have been deleted by another
+    # request before the commit, as no user had them yet
+    if not is_stored(avatar):
+        file.stream.seek(0)
+        store_avatar(file.stream)
+    remove_unused_avatar(old_avatar)
 
 
 def reset_password(token: str, new_password: str):
@@ -230,12 +326,17 @@ def send_reset_email(email: str) -> str:
     serializer = URLSafeTimedSerializer(current_app.config["SECRET_KEY"])
     token = serializer.dumps(email, salt=current_app.config["EMAIL_VERIFY_SALT"])
     reset_url = url_for("user.reset_password", token=token, _external=True)
-    msg = Message(
+    # Sent by the mail worker, the request does not wait for the SMTP server
+    queue_mail(
         subject="Password Reset Request",
         sender=current_app.config["MAIL_USERNAME"],
         recipients=[email],
         body=f"To reset your password, click the following link:\n{reset_url}\n\nIf you did not request this, ignore this email.",
     )
-    mail.send(msg)
+    try:
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        raise RuntimeError("Failed to queue the reset email.") from e
 
     return token
@@ -1,4 +1,13 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import (
+    Blueprint,
+    render_template,
+    request,
+    redirect,
+    url_for,
+    flash,
+    current_app,
+    send_from_directory,
+)
 from flask_login import login_required
 
 from server.utils.decorators import api_response
@@ -10,6 +19,9 @@ from server.blueprints.user.forms import (
     ForgotPasswordForm,
 )
 from server.blueprints.user import logic
+from server.utils.avatars import avatar_folder
+from server.utils.security import PasswordHasherBusy
+from server.utils.throttle import login_throttle
 
 user_bp = Blueprint("user", __name__, template_folder="templates")
 
@@ -30,6 +42,7 @@ def index():
             form.username.data,
             form.email.data,
             form.nickname.data,
+            city=form.city.data,
         )
         flash("User information updated successfully!", "success")
         return redirect(url_for("user.index"))
@@ -45,6 +58,8 @@ def login():
         flash(str(form.errors), "danger")
         return redirect(url_for("index.index"))
 
+    # Over-limit attempts get a 429 before the user lookup and bcrypt
+    login_throttle.check(form.email.data, request.remote_addr)
     try:
         logic.login(
             form.email.data,
@@ -53,6 +68,8 @@ def login():
         )
         flash("Login successful!", "success")
         return redirect(url_for("dashboard.index"))
+    except PasswordHasherBusy:
+        raise
     except Exception as e:
         flash(str(e), "danger")
         return redirect(url_for("index.index"))
@@ -87,6 +104,8 @@ def register():
         )
         flash(f"Registration successful {form.nickname.data}!", "success")
         return redirect(url_for("index.index"))
+    except PasswordHasherBusy:
+        raise
     except Exception as e:
         flash(str(e), "danger")
         return redirect(url_for("user.register"))
@@ -109,6 +128,8 @@ def reset_password(token):
             "success",
         )
         return logout()
+    except PasswordHasherBusy:
+        raise
     except Exception as e:
         flash(str(e), "danger")
         return redirect(url_for("user.reset_password"))
@@ -130,11 +151,13 @@ def forgot_password():
     return render_template("user/forgot_password.html", form=form)
 
 
-@user_bp.route("/<string:username>")
+@user_bp.route("/search")
 @login_required
 @api_response
-def search_user(username):
-    return logic.search_user(username)
+def search_user():
+    return logic.search_user(
+        request.args.get("q", ""), page=request.args.get("page", 1, type=int)
+    )
 
 
 @user_bp.route("/upload_avatar", methods=["POST"])
@@ -151,3 +174,14 @@ def upload_avatar():
     else:
         flash("No file selected.", "danger")
     return redirect(url_for("dashboard.index"))
+
+
+@user_bp.route("/avatar/<string:filename>")
+def avatar(filename):
+    # Named by content hash, so a URL always serves the same bytes
+    response = send_from_directory(
+        avatar_folder(), filename, max_age=current_app.config["AVATAR_MAX_AGE"]
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
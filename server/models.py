@@ -1,12 +1,25 @@
+import datetime
 import uuid
 
 from flask_login import UserMixin
 from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import DDL, column, event, table
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import validates
 
-from server.utils.constants import ExerciseType, BodyMeasurementType
+from server.utils.constants import (
+    ExerciseType,
+    BodyMeasurementType,
+    EXERCISE_METRICS,
+    EXERCISE_MET_VALUES,
+)
+from server.utils.database import (
+    JSON_DOCUMENT,
+    RoutingSession,
+    dialect_insert,
+    json_number,
+)
 from server.utils.validators import (
     validate_metrics,
     validate_share_scope,
@@ -15,10 +28,17 @@ from server.utils.validators import (
     validate_int,
 )
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
 
 
+# The default of the timestamps, set in Python rather than by CURRENT_TIMESTAMP
+# so that SQLite stores them in the format of the datetimes bound in queries,
+# as it compares them as text
+def utcnow() -> datetime.datetime:
+    return datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
+
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     username = db.Column(db.Text, nullable=False, unique=True)
@@ -30,14 +50,18 @@ class User(UserMixin, db.Model):
     )  # Stores the relative path to the avatar image
     date_of_birth = db.Column(db.Date, nullable=True)
     sex = db.Column(db.String(10), nullable=True)  # e.g. 'Male', 'Female', 'Other'
+    city = db.Column(db.String(100), nullable=True)  # Of the weather forecast
+    # Bumped by every flush writing the user's data, see bump_data_versions
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
-    created_at = db.Column(
-        db.DateTime, nullable=False, default=db.func.current_timestamp()
-    )
+    created_at = db.Column(db.DateTime, nullable=False, default=utcnow)
     last_login = db.Column(
         db.DateTime, nullable=True, default=db.func.current_timestamp()
     )
 
+    # Seeked by the case insensitive username prefixes of the user search
+    __table_args__ = (db.Index("ix_user_username_lower", db.func.lower(username)),)
+
     exercises = db.relationship(
         "Exercise",
         lazy="dynamic",
@@ -74,6 +98,17 @@ class User(UserMixin, db.Model):
         cascade="all, delete-orphan",
         order_by="ScheduledExercise.scheduled_time.desc()",
     )
+    exercise_totals = db.relationship(
+        "ExerciseTotal",
+        lazy="dynamic",
+        cascade="all, delete-orphan",
+    )
+    daily_summaries = db.relationship(
+        "DailySummary",
+        lazy="dynamic",
+        cascade="all, delete-orphan",
+        order_by="DailySummary.date.desc()",
+    )
     goals = db.relationship(
         "Goal",
         lazy="dynamic",
@@ -100,19 +135,78 @@ class User(UserMixin, db.Model):
     )
 
 
+# SQLite full text index of usernames and nicknames, searched by trigrams so any
+# substring of 3 characters or more matches. It only stores the index, reading
+# the text from `user`, and the triggers keep it in sync.
+USER_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS user_search USING fts5("
+    "username, nickname, content='user', content_rowid='id', tokenize='trigram')",
+    """CREATE TRIGGER IF NOT EXISTS user_search_insert AFTER INSERT ON user BEGIN
+        INSERT INTO user_search(rowid, username, nickname)
+        VALUES (new.id, new.username, new.nickname);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS user_search_delete AFTER DELETE ON user BEGIN
+        INSERT INTO user_search(user_search, rowid, username, nickname)
+        VALUES ('delete', old.id, old.username, old.nickname);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS user_search_update
+    AFTER UPDATE OF username, nickname ON user BEGIN
+        INSERT INTO user_search(user_search, rowid, username, nickname)
+        VALUES ('delete', old.id, old.username, old.nickname);
+        INSERT INTO user_search(rowid, username, nickname)
+        VALUES (new.id, new.username, new.nickname);
+    END""",
+]
+
+# Queried as `user_search MATCH ...`, ordered by `rank`, joined on `rowid`
+user_search = table(
+    "user_search", column("rowid"), column("user_search"), column("rank")
+)
+
+for statement in USER_SEARCH_DDL:
+    event.listen(
+        User.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite")
+    )
+# The triggers go with the table, the index would be left behind
+event.listen(
+    User.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS user_search").execute_if(dialect="sqlite"),
+)
+
+
 class Exercise(db.Model):
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(
         db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False
     )
     type = db.Column(db.Enum(ExerciseType), nullable=False)
-    metrics = db.Column(db.JSON, nullable=False, default=dict)
+    metrics = db.Column(JSON_DOCUMENT, nullable=False, default=dict)
     created_at = db.Column(
         db.DateTime,
         nullable=False,
-        default=db.func.current_timestamp(),
+        default=utcnow,
         index=True,
     )
+    # Read-only copies of the values in `metrics`, so they can be aggregated in SQL
+    distance = db.Column(db.Float, db.Computed(json_number("metrics", "distance")))
+    duration = db.Column(db.Float, db.Computed(json_number("metrics", "duration")))
+    weight = db.Column(db.Float, db.Computed(json_number("metrics", "weight")))
+    sets = db.Column(db.Float, db.Computed(json_number("metrics", "sets")))
+    reps = db.Column(db.Float, db.Computed(json_number("metrics", "reps")))
+    __table_args__ = (
+        db.Index("ix_exercise_user_created_at", "user_id", "created_at"),
+        db.Index("ix_exercise_user_type_created_at", "user_id", "type", "created_at"),
+        db.Index("ix_exercise_user_type_distance", "user_id", "type", "distance"),
+        db.Index("ix_exercise_user_type_duration", "user_id", "type", "duration"),
+        db.Index("ix_exercise_user_type_weight", "user_id", "type", "weight"),
+        db.Index(
+            "ix_exercise_metrics",
+            "metrics",
+            postgresql_using="gin",
+            postgresql_ops={"metrics": "jsonb_path_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
 
     @validates("metrics")
     def validate_metrics(self, _key, metrics: dict):
@@ -129,6 +223,55 @@ class Exercise(db.Model):
         )
 
 
+class ExerciseTotal(db.Model):
+    """Running total of one metric for a user's exercises of a given type."""
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(
+        db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False
+    )
+    exercise_type = db.Column(db.Enum(ExerciseType), nullable=False)
+    metric = db.Column(db.String(64), nullable=False)
+    total = db.Column(db.Float, nullable=False, default=0.0)
+    __table_args__ = (
+        db.UniqueConstraint(
+            "user_id", "exercise_type", "metric", name="uq_exercise_total"
+        ),
+    )
+
+    @staticmethod
+    def get_total(user_id: int, exercise_type: ExerciseType, metric: str) -> float:
+        total = (
+            db.session.query(ExerciseTotal.total)
+            .filter_by(user_id=user_id, exercise_type=exercise_type, metric=metric)
+            .scalar()
+        )
+        return total or 0.0
+
+    @staticmethod
+    def apply(connection, user_id: int, exercise_type: ExerciseType, metrics, sign=1):
+        """Adds (or with sign=-1 removes) one exercise's metrics to the totals."""
+        rows = [
+            {
+                "user_id": user_id,
+                "exercise_type": exercise_type,
+                "metric": metric,
+                "total": sign * float(metrics[metric]),
+            }
+            for metric in EXERCISE_METRICS.get(exercise_type, [])
+            if metrics and metrics.get(metric) is not None
+        ]
+        if not rows:
+            return
+        table = ExerciseTotal.__table__
+        stmt = dialect_insert(connection, table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "exercise_type", "metric"],
+            set_={"total": table.c.total + stmt.excluded.total},
+        )
+        connection.execute(stmt, rows)
+
+
 class Achievement(db.Model):
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(
@@ -139,7 +282,13 @@ class Achievement(db.Model):
     created_at = db.Column(
         db.DateTime,
         nullable=False,
-        default=db.func.current_timestamp(),
+        default=utcnow,
+    )
+    __table_args__ = (
+        db.UniqueConstraint(
+            "user_id", "exercise_type", "milestone", name="uq_achievement_milestone"
+        ),
+        db.Index("ix_achievement_user_created_at", "user_id", "created_at"),
     )
 
     @validates("milestone")
@@ -167,10 +316,17 @@ class BodyMeasurement(db.Model):
     created_at = db.Column(
         db.DateTime,
         nullable=False,
-        default=db.func.current_timestamp(),
+        default=utcnow,
         index=True,
     )
 
+    __table_args__ = (
+        db.Index("ix_body_measurement_user_created_at", "user_id", "created_at"),
+        db.Index(
+            "ix_body_measurement_user_type_created_at", "user_id", "type", "created_at"
+        ),
+    )
+
     @validates("value")
     def validate_value(self, _key, value: float):
         return validate_body_measurement_value(self.type, value)
@@ -196,10 +352,24 @@ class CalorieIntake(db.Model):
     created_at = db.Column(
         db.DateTime,
         nullable=False,
-        default=db.func.current_timestamp(),
+        default=utcnow,
         index=True,
     )
 
+    __table_args__ = (
+        db.Index("ix_calorie_intake_user_created_at", "user_id", "created_at"),
+    )
+
+    @staticmethod
+    def get_by_user(user_id: int, **kwargs):
+        if not user_id:
+            raise ValueError("User ID cannot be empty")
+        return (
+            db.session.query(CalorieIntake)
+            .filter_by(user_id=user_id, **kwargs)
+            .order_by(CalorieIntake.created_at.desc())
+        )
+
     @validates("calories")
     def validate_calories(self, _key, calories: float):
         return validate_float(calories)
@@ -214,15 +384,81 @@ class WaterIntake(db.Model):
     created_at = db.Column(
         db.DateTime,
         nullable=False,
-        default=db.func.current_timestamp(),
+        default=utcnow,
         index=True,
     )
 
+    __table_args__ = (
+        db.Index("ix_water_intake_user_created_at", "user_id", "created_at"),
+    )
+
     @validates("amount")
     def validate_amount(self, _key, amount: float):
         return validate_float(amount)
 
 
+class DailySummary(db.Model):
+    """Per-day rollup of a user's exercises, calorie intake and water intake."""
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(
+        db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False
+    )
+    date = db.Column(db.Date, nullable=False)
+    exercise_count = db.Column(db.Integer, nullable=False, default=0)
+    # MET x minutes, multiplied by the body weight when burned calories are read
+    met_minutes = db.Column(db.Float, nullable=False, default=0.0)
+    calorie_intake = db.Column(db.Float, nullable=False, default=0.0)  # in kcal
+    water_intake = db.Column(db.Float, nullable=False, default=0.0)  # in liters
+    __table_args__ = (db.UniqueConstraint("user_id", "date", name="uq_daily_summary"),)
+
+    @staticmethod
+    def get_by_user(user_id: int, **kwargs):
+        if not user_id:
+            raise ValueError("User ID cannot be empty")
+        return (
+            db.session.query(DailySummary)
+            .filter_by(user_id=user_id, **kwargs)
+            .order_by(DailySummary.date.desc())
+        )
+
+    @staticmethod
+    def get_range(user_id: int, start_date, end_date):
+        return DailySummary.get_by_user(user_id).filter(
+            DailySummary.date >= start_date,
+            DailySummary.date <= end_date,
+        )
+
+    @staticmethod
+    def met_minutes_of(exercise_type: ExerciseType, metrics: dict) -> float:
+        if exercise_type == ExerciseType.WEIGHTLIFTING:
+            # Estimate duration: assume 4 seconds per rep
+            sets = int(metrics.get("sets"))
+            reps = int(metrics.get("reps"))
+            duration = (sets * reps * 4) / 60  # duration in minutes
+        else:
+            duration = float(metrics.get("duration"))
+        return EXERCISE_MET_VALUES.get(exercise_type, 6.0) * duration
+
+    @staticmethod
+    def apply(connection, user_id: int, date, **deltas):
+        """Adds the deltas to the user's summary of that date."""
+        table = DailySummary.__table__
+        stmt = dialect_insert(connection, table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "date"],
+            set_={key: table.c[key] + stmt.excluded[key] for key in deltas},
+        )
+        row = {
+            "exercise_count": 0,
+            "met_minutes": 0.0,
+            "calorie_intake": 0.0,
+            "water_intake": 0.0,
+        }
+        row.update(deltas, user_id=user_id, date=date)
+        connection.execute(stmt, row)
+
+
 class ScheduledExercise(db.Model):
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(
@@ -232,6 +468,9 @@ class ScheduledExercise(db.Model):
     scheduled_time = db.Column(db.Time, nullable=False)
     note = db.Column(db.Text, nullable=True)
     day_of_week = db.Column(db.String(10), nullable=False)  # "Monday", "Tuesday" etc.
+    __table_args__ = (
+        db.Index("ix_scheduled_exercise_user_time", "user_id", "scheduled_time"),
+    )
 
 
 class Goal(db.Model):
@@ -244,24 +483,14 @@ class Goal(db.Model):
     metric = db.Column(db.String(64), nullable=False)
     target_value = db.Column(db.Float, nullable=False)
     achieved = db.Column(db.Boolean, nullable=False, default=False)
-    created_at = db.Column(
-        db.DateTime, nullable=False, default=db.func.current_timestamp()
-    )
+    created_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+    __table_args__ = (db.Index("ix_goal_user_created_at", "user_id", "created_at"),)
 
     @hybrid_property
     def current_value(self):
         if self.achieved:
             return self.target_value
-        # Calculate the current value based on the user's exercises
-        exercises = (
-            db.session.query(Exercise)
-            .filter_by(user_id=self.user_id, type=self.exercise_type)
-            .all()
-        )
-        total = 0.0
-        for ex in exercises:
-            value = float(ex.metrics.get(self.metric, 0))
-            total += value
+        total = ExerciseTotal.get_total(self.user_id, self.exercise_type, self.metric)
         if total >= self.target_value:
             self.achieved = True
         return total
@@ -279,13 +508,13 @@ class Share(db.Model):
     receiver_id = db.Column(
         db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False
     )
-    scope = db.Column(db.JSON, nullable=False)
+    scope = db.Column(JSON_DOCUMENT, nullable=False)
     start_date = db.Column(db.DateTime, nullable=False)
     end_date = db.Column(db.DateTime, nullable=False)
     created_at = db.Column(
         db.DateTime,
         nullable=False,
-        default=db.func.current_timestamp(),
+        default=utcnow,
         index=True,
     )
     deleted = db.Column(db.Boolean, nullable=False, default=False)
@@ -293,8 +522,138 @@ class Share(db.Model):
         db.UniqueConstraint(
             "sender_id", "receiver_id", "scope", name="uq_share_relationship"
         ),
+        db.Index("ix_share_sender_created_at", "sender_id", "created_at"),
+        db.Index("ix_share_receiver_created_at", "receiver_id", "created_at"),
+        db.Index("ix_share_scope", "scope", postgresql_using="gin").ddl_if(
+            dialect="postgresql"
+        ),
     )
 
     @validates("scope")
     def validate_scope(self, _key, scope: dict):
         return validate_share_scope(scope)
+
+
+class MailOutbox(db.Model):
+    """An email waiting to be sent by the mail worker, or its outcome."""
+
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"  # Given up after MAIL_OUTBOX_MAX_ATTEMPTS
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    sender = db.Column(db.Text, nullable=True)
+    recipients = db.Column(JSON_DOCUMENT, nullable=False)
+    subject = db.Column(db.Text, nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(10), nullable=False, default=PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+    # Times in UTC, set by the app so they compare with the worker's clock
+    created_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    __table_args__ = (
+        db.Index("ix_mail_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+
+@event.listens_for(Exercise, "after_insert")
+def add_exercise_to_totals(_mapper, connection, target: Exercise):
+    ExerciseTotal.apply(connection, target.user_id, target.type, target.metrics)
+
+
+@event.listens_for(Exercise, "after_delete")
+def remove_exercise_from_totals(_mapper, connection, target: Exercise):
+    ExerciseTotal.apply(
+        connection, target.user_id, target.type, target.metrics, sign=-1
+    )
+
+
+@event.listens_for(Exercise, "after_insert")
+def add_exercise_to_daily_summary(_mapper, connection, target: Exercise):
+    DailySummary.apply(
+        connection,
+        target.user_id,
+        target.created_at.date(),
+        exercise_count=1,
+        met_minutes=DailySummary.met_minutes_of(target.type, target.metrics),
+    )
+
+
+@event.listens_for(Exercise, "after_delete")
+def remove_exercise_from_daily_summary(_mapper, connection, target: Exercise):
+    DailySummary.apply(
+        connection,
+        target.user_id,
+        target.created_at.date(),
+        exercise_count=-1,
+        met_minutes=-DailySummary.met_minutes_of(target.type, target.metrics),
+    )
+
+
+@event.listens_for(CalorieIntake, "after_insert")
+def add_calorie_intake_to_daily_summary(_mapper, connection, target: CalorieIntake):
+    DailySummary.apply(
+        connection,
+        target.user_id,
+        target.created_at.date(),
+        calorie_intake=target.calories,
+    )
+
+
+@event.listens_for(CalorieIntake, "after_delete")
+def remove_calorie_intake_from_daily_summary(
+    _mapper, connection, target: CalorieIntake
+):
+    DailySummary.apply(
+        connection,
+        target.user_id,
+        target.created_at.date(),
+        calorie_intake=-target.calories,
+    )
+
+
+@event.listens_for(WaterIntake, "after_insert")
+def add_water_intake_to_daily_summary(_mapper, connection, target: WaterIntake):
+    DailySummary.apply(
+        connection,
+        target.user_id,
+        target.created_at.date(),
+        water_intake=target.amount,
+    )
+
+
+@event.listens_for(WaterIntake, "after_delete")
+def remove_water_intake_from_daily_summary(_mapper, connection, target: WaterIntake):
+    DailySummary.apply(
+        connection,
+        target.user_id,
+        target.created_at.date(),
+        water_intake=-target.amount,
+    )
+
+
+# Columns naming the users whose pages show a row
+OWNER_COLUMNS = ("user_id", "sender_id", "receiver_id")
+
+
+def owners_of(obj) -> set[int]:
+    if isinstance(obj, User):
+        return {obj.id}
+    return {getattr(obj, name, None) for name in OWNER_COLUMNS} - {None}
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def bump_data_versions(session, _flush_context):
+    # Still the pre-flush lists, the version tells clients their pages changed
+    owners = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        owners |= owners_of(obj)
+    if owners:
+        table = User.__table__
+        session.connection().execute(
+            table.update()
+            .where(table.c.id.in_(owners))
+            .values(data_version=table.c.data_version + 1)
+        )
@@ -1,45 +1,19 @@
-function processExerciseData(exercises) {
-    const typeStats = {}
-    const dailyStats = {}
-    const strengthData = []
-
-    exercises.forEach(ex => {
-        const date = new Date(ex.created_at).toISOString().split("T")[0]
-        const type = ex.type
-
-        // Statistics by exercise type
-        if (!typeStats[type]) {
-            typeStats[type] = {
-                distance: 0, duration: 0, totalWeight: 0, sets: 0, reps: 0
+function loadExerciseData(range) {
+    const params = new URLSearchParams()
+    if (range.start_date) params.set("start_date", range.start_date)
+    if (range.end_date) params.set("end_date", range.end_date)
+    return fetch(`/api/analytics/exercises?${params}`)
+        .then(res => {
+            if (!res.ok) {
+                throw new Error("Network response was not ok")
             }
-        }
-
-        // General metrics processing
-        if (ex.metrics.distance) typeStats[type].distance += ex.metrics.distance / 1000 // Convert to km
-        if (ex.metrics.duration) typeStats[type].duration += ex.metrics.duration
-
-        // Strength training specific statistics
-        if (type === "WEIGHTLIFTING") {
-            const volume = ex.metrics.sets * ex.metrics.reps * ex.metrics.weight
-            strengthData.push({
-                date, volume, weight: ex.metrics.weight, sets: ex.metrics.sets, reps: ex.metrics.reps
-            })
-            typeStats[type].totalWeight += ex.metrics.weight
-            typeStats[type].sets += ex.metrics.sets
-            typeStats[type].reps += ex.metrics.reps
-        }
-
-        // Daily activity statistics
-        if (!dailyStats[date]) dailyStats[date] = {count: 0, duration: 0}
-        dailyStats[date].count++
-        dailyStats[date].duration += ex.metrics.duration || 0
-    })
-
-    return {
-        typeStats: Object.entries(typeStats).map(([type, metrics]) => ({type, ...metrics})),
-        dailyStats: Object.entries(dailyStats).map(([date, stats]) => ({date, ...stats})),
-        strengthData
-    }
+            return res.json()
+        })
+        .then(({data}) => ({
+            typeStats: data.type_distribution.map(({total_weight, ...stats}) => ({...stats, totalWeight: total_weight})),
+            dailyStats: data.daily_stats,
+            strengthData: data.strength_volume
+        }))
 }
 
 function createTypeDistributionChart(processedData) {
@@ -236,13 +210,15 @@ function createDailyTrendChart(processedData) {
     })
 }
 
-function visualizeExerciseData(rawData) {
-    const processed = processExerciseData(rawData)
-
-    createTypeDistributionChart(processed)
-    createCardioChart(processed)
-    createStrengthRadar(processed)
-    createDailyTrendChart(processed)
+function visualizeExerciseData(range) {
+    loadExerciseData(range)
+        .then(processed => {
+            createTypeDistributionChart(processed)
+            createCardioChart(processed)
+            createStrengthRadar(processed)
+            createDailyTrendChart(processed)
+        })
+        .catch(err => console.error("Error fetching exercise analytics:", err))
 }
 
-visualizeExerciseData(RawData)
\ No newline at end of file
+visualizeExerciseData(AnalyticsRange)
\ No newline at end of file
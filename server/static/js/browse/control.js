@@ -1,78 +1,82 @@
-function createDataset(datasetType, visualType) {
+// Days covered by the charts, which are drawn from daily aggregates
+const BROWSE_CHART_DAYS = 90
+
+// What the table shows and the cursor of its next page, replaced by renderDataView
+let browseView = null
+
+function fetchData(url, params) {
+    return fetch(`${url}?${params}`)
+        .then(res => {
+            if (!res.ok) {
+                throw new Error("Network response was not ok")
+            }
+            return res.json()
+        })
+        .then(data => data.data)
+}
+
+/**
+ * Fetch one page of records, newest first, from a browse data endpoint.
+ */
+function fetchPage(url, type, cursor) {
+    const params = new URLSearchParams()
+    if (type) params.set("type", type)
+    if (cursor) params.set("cursor", cursor)
+    return fetchData(url, params)
+}
+
+/**
+ * Fetch a daily series of the last BROWSE_CHART_DAYS days from an analytics
+ * endpoint, as a row of values by date.
+ */
+function fetchSeries(series, type, toRow) {
+    const params = new URLSearchParams({days: BROWSE_CHART_DAYS})
+    if (type) params.set("type", type)
+    return fetchData(`/api/analytics/${series}`, params)
+        .then(byDate => Object.fromEntries(
+            Object.entries(byDate).map(([date, value]) => [date, toRow(value)])
+        ))
+}
+
+function createDataset(datasetType) {
     const dataset = {}
     if (datasetType === "browseExercise") {
-        if (visualType === "tableButton") {
-            dataset.headers = type => (ExercisesMetrics[type] || []).concat(["created_at"])
-        } else {
-            dataset.headers = type => ExercisesMetrics[type]
-        }
-        dataset.data = type => UserExercises
-            .filter(exercise => exercise.type === type)
-            .sort((a, b) => new Date(a.created_at) - new Date(b.created_at))
-            .map(
-                exercise => ({
-                    ...exercise.metrics,
-                    created_at: new Date(exercise.created_at).toLocaleString()
-                })
-            )
+        dataset.metrics = type => ExercisesMetrics[type] || []
+        dataset.headers = type => dataset.metrics(type).concat(["created_at"])
+        dataset.page = (type, cursor) => fetchPage("/browse/exercise/data", type, cursor)
+        dataset.row = exercise => ({
+            ...exercise.metrics,
+            created_at: new Date(exercise.created_at).toLocaleString()
+        })
+        dataset.series = type => fetchSeries("exercise_daily", type, metrics => metrics)
 
     } else if (datasetType === "browseCalorieIntake") {
-        if (visualType === "tableButton") {
-            dataset.headers = type => ["calories", "description", "created_at"]
-        } else {
-            dataset.headers = type => ["calories"]
-        }
-        dataset.data = () => UserCalorieIntakes
-            .sort((a, b) => new Date(a.created_at) - new Date(b.created_at))
-            .map(exercise => {
-                return {
-                    calories: exercise.calories,
-                    description: exercise.description,
-                    created_at: new Date(exercise.created_at).toLocaleString()
-                }
-            })
+        dataset.metrics = type => ["calories"]
+        dataset.headers = type => ["calories", "description", "created_at"]
+        dataset.page = (type, cursor) => fetchPage("/browse/calorie_intake/data", null, cursor)
+        dataset.row = calorieIntake => ({
+            calories: calorieIntake.calories,
+            description: calorieIntake.description,
+            created_at: new Date(calorieIntake.created_at).toLocaleString()
+        })
+        dataset.series = () => fetchSeries("calorie_intake", null, calories => ({calories}))
 
     } else if (datasetType === "browseBodyMeasurement") {
-        if (visualType === "tableButton") {
-            dataset.headers = type => ["value", "created_at"]
-        } else {
-            dataset.headers = type => ["value"]
-        }
-        dataset.data = type => UserBodyMeasurements.filter(bodyMeasurement => bodyMeasurement.type === type)
-            .sort((a, b) => new Date(a.created_at) - new Date(b.created_at))
-            .map(bodyMeasurement => {
-                return {
-                    value: bodyMeasurement.value,
-                    created_at: new Date(bodyMeasurement.created_at).toLocaleString()
-                }
-            })
+        dataset.metrics = type => ["value"]
+        dataset.headers = type => ["value", "created_at"]
+        dataset.page = (type, cursor) => fetchPage("/browse/body_measurement/data", type, cursor)
+        dataset.row = bodyMeasurement => ({
+            value: bodyMeasurement.value,
+            created_at: new Date(bodyMeasurement.created_at).toLocaleString()
+        })
+        dataset.series = type => fetchSeries("body_measurement", type, value => ({value}))
     }
     return dataset
 }
 
-function updateBrowseTable(headers, data) {
+function updateBrowseTableHeader(headers) {
     const tableHeaderDom = document.querySelector("#browseTableHeader")
-    const tableBodyDom = document.querySelector("#browseTableBody")
-    // Clear existing content
     tableHeaderDom.innerHTML = ""
-    tableBodyDom.innerHTML = ""
-    if (data.length === 0 || headers.length === 0) {
-        return
-    }
-    // Create table body
-    for (let i = 0; i < data.length; i++) {
-        const trDom = document.createElement("tr")
-        const idDom = document.createElement("td")
-        idDom.innerText = String(i + 1)
-        trDom.appendChild(idDom)
-        for (let k of headers) {
-            const tdDom = document.createElement("td")
-            tdDom.innerText = data[i][k]
-            trDom.appendChild(tdDom)
-        }
-        tableBodyDom.appendChild(trDom)
-    }
-    // Create table header
     const tableHeaderRowDom = document.createElement("tr")
     const headersWithID = ["#"].concat(headers)
     for (let i = 0; i < headersWithID.length; i++) {
@@ -90,12 +94,57 @@ function updateBrowseTable(headers, data) {
 }
 
 /**
- * Update the charts based on the selected type.
+ * Append rows to the table, numbered after the rows already shown.
  */
-function updateBrowseChart(headers, data) {
+function appendBrowseRows(headers, data) {
+    const tableBodyDom = document.querySelector("#browseTableBody")
+    if (data.length === 0 || headers.length === 0) {
+        return
+    }
+    if (tableBodyDom.rows.length === 0) {
+        updateBrowseTableHeader(headers)
+    }
+    for (let i = 0; i < data.length; i++) {
+        const trDom = document.createElement("tr")
+        const idDom = document.createElement("td")
+        idDom.innerText = String(tableBodyDom.rows.length + 1)
+        trDom.appendChild(idDom)
+        for (let k of headers) {
+            const tdDom = document.createElement("td")
+            tdDom.innerText = data[i][k]
+            trDom.appendChild(tdDom)
+        }
+        tableBodyDom.appendChild(trDom)
+    }
+}
+
+/**
+ * Load the next page of the table, the button is only shown while there is one.
+ */
+function loadBrowsePage(view = browseView) {
+    const button = document.querySelector("#loadMoreButton")
+    button.disabled = true
+    view.dataset.page(view.dataType, view.nextCursor)
+        .then(page => {
+            if (view !== browseView) {
+                return // Another view was picked meanwhile
+            }
+            view.nextCursor = page.next_cursor
+            appendBrowseRows(view.dataset.headers(view.dataType), page.items.map(view.dataset.row))
+            button.classList.toggle("d-none", !page.next_cursor)
+        })
+        .catch(error => console.error("Error loading records:", error))
+        .finally(() => button.disabled = false)
+}
+
+/**
+ * Update the charts based on the daily rows of the selected type.
+ */
+function updateBrowseChart(headers, byDate) {
     const chartContainer = document.querySelector("#chartCard")
     chartContainer.innerHTML = ""
-    if (data.length === 0 || headers.length === 0) {
+    const rows = Object.values(byDate)
+    if (headers.length === 0 || rows.every(row => headers.every(h => row[h] == null))) {
         return
     }
     for (let i = 0; i < headers.length; i++) {
@@ -107,13 +156,14 @@ function updateBrowseChart(headers, data) {
         new Chart(canvas, {
             type: "line",
             data: {
-                labels: data.map(item => item.created_at),
+                labels: Object.keys(byDate).map(date => new Date(date).toLocaleDateString()),
                 datasets: [{
                     label: headers[i],
-                    data: data.map(item => item[headers[i]]),
+                    data: rows.map(row => row[headers[i]] ?? null),
                     borderColor: "rgba(75, 192, 192, 1)",
                     backgroundColor: "rgba(75, 192, 192, 0.2)",
-                    borderWidth: 1
+                    borderWidth: 1,
+                    spanGaps: true
                 }]
             }
         })
@@ -145,13 +195,21 @@ function renderDataView() {
     const dataType = document.querySelector("#dataTypeSelect").value
     const datasetType = document.querySelector("input[name='dataset']:checked").id
     const visualType = document.querySelector("input[name=\"visualType\"]:checked").id
-    const dataset = createDataset(datasetType, visualType)
+    const dataset = createDataset(datasetType)
+    const view = browseView = {dataset, dataType, nextCursor: null}
 
-    const headers = dataset.headers(dataType)
-    const data = dataset.data(dataType)
+    document.querySelector("#browseTableHeader").innerHTML = ""
+    document.querySelector("#browseTableBody").innerHTML = ""
+    document.querySelector("#loadMoreButton").classList.add("d-none")
     if (visualType === "tableButton") {
-        updateBrowseTable(headers, data)
+        loadBrowsePage(view)
     } else {
-        updateBrowseChart(headers, data)
+        dataset.series(dataType)
+            .then(byDate => {
+                if (view === browseView) {
+                    updateBrowseChart(dataset.metrics(dataType), byDate)
+                }
+            })
+            .catch(error => console.error("Error loading the chart:", error))
     }
 }
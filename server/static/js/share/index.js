@@ -71,12 +71,17 @@ function restoreFilterState() {
     }
 }
 
+let searchFriendController = null
+
 function searchFriend() {
     const username = document.getElementById("searchFriend").value.trim()
     const friendSelect = document.getElementById("friendacSelect")
     friendSelect.innerHTML = ""
+    // Only the latest keystroke's results are shown
+    if (searchFriendController) searchFriendController.abort()
     if (!username) return
-    fetch(`/user/${encodeURIComponent(username)}`)
+    searchFriendController = new AbortController()
+    fetch(`/user/search?q=${encodeURIComponent(username)}`, {signal: searchFriendController.signal})
         .then(res => res.json())
         .then(res => {
             if (res.code === 1 && Array.isArray(res.data)) {
@@ -88,6 +93,9 @@ function searchFriend() {
                 })
             }
         })
+        .catch(e => {
+            if (e.name !== "AbortError") console.error("Failed to search friends:", e)
+        })
 }
 
 async function fetchSharedRecords(scope) {
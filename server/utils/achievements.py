@@ -0,0 +1,65 @@
+from bisect import bisect_right
+
+from server.models import db, Achievement, ExerciseTotal
+from server.utils.constants import ExerciseType, ACHIEVEMENTS, EXERCISE_METRICS
+from server.utils.database import dialect_insert
+
+
+def crossed_milestones(
+    exercise_type: ExerciseType, old_total: float, new_total: float
+) -> list[int]:
+    """Returns the milestones reached when going from old_total to new_total."""
+    milestones = ACHIEVEMENTS[exercise_type]
+    return milestones[
+        bisect_right(milestones, old_total) : bisect_right(milestones, new_total)
+    ]
+
+
+def award_milestones(
+    user_id: int, exercise_type: ExerciseType, milestones: list[int]
+) -> list[Achievement]:
+    """
+    Awards the milestones to the user, skipping those already awarded.
+
+    Returns:
+        list[Achievement]: The achievements inserted by this call, by milestone.
+    """
+    if not milestones:
+        return []
+    stmt = dialect_insert(db.session.connection(), Achievement)
+    stmt = stmt.on_conflict_do_nothing(
+        index_elements=["user_id", "exercise_type", "milestone"]
+    ).returning(Achievement)
+    # RETURNING gives no guarantee on the order of the rows
+    return sorted(
+        db.session.scalars(
+            stmt,
+            [
+                {
+                    "user_id": user_id,
+                    "exercise_type": exercise_type,
+                    "milestone": milestone,
+                }
+                for milestone in milestones
+            ],
+        ),
+        key=lambda achievement: achievement.milestone,
+    )
+
+
+def check_achievements(
+    user_id: int, exercise_type: ExerciseType, metrics: dict
+) -> list[Achievement]:
+    """
+    Awards the milestones crossed by a newly flushed exercise.
+
+    The exercise must already be flushed so that the running total includes it.
+    """
+    metric = EXERCISE_METRICS[exercise_type][0]
+    new_total = ExerciseTotal.get_total(user_id, exercise_type, metric)
+    old_total = new_total - float(metrics.get(metric, 0))
+    return award_milestones(
+        user_id,
+        exercise_type,
+        crossed_milestones(exercise_type, old_total, new_total),
+    )
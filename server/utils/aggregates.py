@@ -0,0 +1,111 @@
+from collections import defaultdict
+
+from sqlalchemy import case, func
+
+from server.models import (
+    db,
+    Exercise,
+    ExerciseTotal,
+    DailySummary,
+    CalorieIntake,
+    WaterIntake,
+)
+from server.utils.constants import ExerciseType, EXERCISE_METRICS, EXERCISE_MET_VALUES
+
+
+def metric_column(metric: str):
+    """Returns the generated column of an exercise metric, e.g. Exercise.distance."""
+    return getattr(Exercise, metric)
+
+
+def created_date(column):
+    """Returns the date part of a DateTime column as a Date."""
+    return func.date(column, type_=db.Date)
+
+
+def met_minutes():
+    """SQL version of DailySummary.met_minutes_of for one exercise row."""
+    met = case(
+        *((Exercise.type == t, value) for t, value in EXERCISE_MET_VALUES.items()),
+        else_=6.0,
+    )
+    # Estimate weightlifting duration: assume 4 seconds per rep
+    minutes = case(
+        (
+            Exercise.type == ExerciseType.WEIGHTLIFTING,
+            Exercise.sets * Exercise.reps * 4 / 60.0,
+        ),
+        else_=Exercise.duration,
+    )
+    return met * minutes
+
+
+def rebuild_exercise_totals() -> int:
+    """Recomputes every running total from the exercise table."""
+    metrics = sorted({m for metrics in EXERCISE_METRICS.values() for m in metrics})
+    rows = db.session.query(
+        Exercise.user_id,
+        Exercise.type,
+        *(func.sum(metric_column(metric)) for metric in metrics),
+    ).group_by(Exercise.user_id, Exercise.type)
+
+    totals = []
+    for user_id, exercise_type, *sums in rows:
+        for metric, total in zip(metrics, sums):
+            if metric in EXERCISE_METRICS[exercise_type]:
+                totals.append(
+                    {
+                        "user_id": user_id,
+                        "exercise_type": exercise_type,
+                        "metric": metric,
+                        "total": total or 0.0,
+                    }
+                )
+    db.session.query(ExerciseTotal).delete()
+    if totals:
+        db.session.execute(db.insert(ExerciseTotal), totals)
+    db.session.commit()
+    return len(totals)
+
+
+def rebuild_daily_summaries() -> int:
+    """Recomputes every daily summary from the source tables."""
+    summaries = defaultdict(
+        lambda: {
+            "exercise_count": 0,
+            "met_minutes": 0.0,
+            "calorie_intake": 0.0,
+            "water_intake": 0.0,
+        }
+    )
+
+    day = created_date(Exercise.created_at)
+    for user_id, date, count, minutes in db.session.query(
+        Exercise.user_id, day, func.count(Exercise.id), func.sum(met_minutes())
+    ).group_by(Exercise.user_id, day):
+        summaries[(user_id, date)]["exercise_count"] = count
+        summaries[(user_id, date)]["met_minutes"] = minutes or 0.0
+
+    day = created_date(CalorieIntake.created_at)
+    for user_id, date, calories in db.session.query(
+        CalorieIntake.user_id, day, func.sum(CalorieIntake.calories)
+    ).group_by(CalorieIntake.user_id, day):
+        summaries[(user_id, date)]["calorie_intake"] = calories
+
+    day = created_date(WaterIntake.created_at)
+    for user_id, date, amount in db.session.query(
+        WaterIntake.user_id, day, func.sum(WaterIntake.amount)
+    ).group_by(WaterIntake.user_id, day):
+        summaries[(user_id, date)]["water_intake"] = amount
+
+    db.session.query(DailySummary).delete()
+    if summaries:
+        db.session.execute(
+            db.insert(DailySummary),
+            [
+                {"user_id": user_id, "date": date, **summary}
+                for (user_id, date), summary in summaries.items()
+            ],
+        )
+    db.session.commit()
+    return len(summaries)
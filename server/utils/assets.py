@@ -0,0 +1,134 @@
+import gzip
+import hashlib
+import os
+
+import brotli
+from flask import current_app, request, send_from_directory
+
+# Precompressed variants, named after the fingerprinted files
+BUILD_FOLDER = "build"
+# Folders of static/ which are not fingerprinted, user content is served on its own
+SKIP_FOLDERS = {BUILD_FOLDER, "avatars"}
+COMPRESSIBLE = {".css", ".js", ".json", ".map", ".svg", ".txt", ".html"}
+# Content-Encoding of each variant suffix, most preferred first
+ENCODINGS = ((".br", "br"), (".gz", "gzip"))
+
+
+def fingerprint(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+def hashed_name(filename: str, digest: str) -> str:
+    root, ext = os.path.splitext(filename)
+    return f"{root}.{digest}{ext}"
+
+
+def build_manifest(static_folder: str) -> dict:
+    """Maps the path of every static file to its content addressed name."""
+    manifest = {}
+    for root, dirs, files in os.walk(static_folder):
+        if root == static_folder:
+            dirs[:] = [d for d in dirs if d not in SKIP_FOLDERS]
+        for name in files:
+            path = os.path.join(root, name)
+            filename = os.path.relpath(path, static_folder).replace(os.sep, "/")
+            manifest[filename] = hashed_name(filename, fingerprint(path))
+    return manifest
+
+
+class Assets:
+    """
+    Fingerprinted URLs for the static files, which browsers may cache forever.
+
+    The manifest is built from the files at startup, and `url_for("static")`
+    returns the hashed names, served from the original files with an immutable
+    Cache-Control. Variants precompressed by `flask build-assets` are served
+    instead to clients accepting them.
+    """
+
+    def __init__(self):
+        self.manifest = {}
+        self.sources = {}
+        self.max_age = 0
+
+    def init_app(self, app):
+        if not app.config["ASSET_FINGERPRINTS"] or app.debug:
+            return
+        self.manifest = build_manifest(app.static_folder)
+        self.sources = {hashed: name for name, hashed in self.manifest.items()}
+        self.max_age = app.config["ASSET_MAX_AGE"]
+        app.url_defaults(self.hash_url)
+        app.view_functions["static"] = self.send_static_file
+
+    def hash_url(self, endpoint, values):
+        if endpoint == "static" and values.get("filename") in self.manifest:
+            values["filename"] = self.manifest[values["filename"]]
+
+    def send_static_file(self, filename):
+        source = self.sources.get(filename)
+        if source is None:
+            return current_app.send_static_file(filename)
+        static_folder = current_app.static_folder
+        response = None
+        for suffix, encoding in ENCODINGS:
+            variant = os.path.join(static_folder, BUILD_FOLDER, filename + suffix)
+            if request.accept_encodings[encoding] and os.path.exists(variant):
+                # The suffix makes send_file set Content-Encoding
+                response = send_from_directory(
+                    os.path.join(static_folder, BUILD_FOLDER), filename + suffix
+                )
+                break
+        if response is None:
+            response = send_from_directory(static_folder, source)
+        response.vary.add("Accept-Encoding")
+        response.cache_control.public = True
+        response.cache_control.max_age = self.max_age
+        response.cache_control.immutable = True
+        return response
+
+
+assets = Assets()
+
+
+def build_assets(static_folder: str) -> int:
+    """
+    Writes gzip and brotli variants of the compressible static files.
+
+    Variants of files which changed since are deleted.
+
+    Returns:
+        int: The number of variants written.
+    """
+    build_folder = os.path.join(static_folder, BUILD_FOLDER)
+    wanted = set()
+    written = 0
+    for filename, hashed in build_manifest(static_folder).items():
+        if os.path.splitext(filename)[1] not in COMPRESSIBLE:
+            continue
+        with open(os.path.join(static_folder, filename), "rb") as f:
+            content = f.read()
+        variants = {
+            ".gz": gzip.compress(content, compresslevel=9, mtime=0),
+            ".br": brotli.compress(content, quality=11),
+        }
+        for suffix, compressed in variants.items():
+            wanted.add(hashed + suffix)
+            path = os.path.join(build_folder, hashed + suffix)
+            # Named by content, so an existing variant is already up to date
+            if os.path.exists(path):
+                continue
+            # Not worth it, the plain file is served instead
+            if len(compressed) >= len(content):
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(compressed)
+            written += 1
+    for root, _, files in os.walk(build_folder):
+        for name in files:
+            path = os.path.join(root, name)
+            filename = os.path.relpath(path, build_folder).replace(os.sep, "/")
+            if filename not in wanted:
+                os.remove(path)
+    return written
@@ -0,0 +1,123 @@
+import hashlib
+import os
+import tempfile
+
+from flask import current_app, url_for
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+CHUNK_SIZE = 64 * 1024
+
+
+def avatar_folder() -> str:
+    return os.path.join(current_app.instance_path, current_app.config["AVATAR_FOLDER"])
+
+
+def variant_name(key: str, size: int) -> str:
+    return f"{key}-{size}.webp"
+
+
+def is_stored(key: str) -> bool:
+    folder = avatar_folder()
+    return all(
+        os.path.exists(os.path.join(folder, variant_name(key, size)))
+        for size in current_app.config["AVATAR_SIZES"]
+    )
+
+
+def save_upload(stream, folder: str, max_bytes: int) -> tuple[str, str]:
+    """
+    Copies an upload to a temporary file in chunks, hashing it on the way.
+
+    Returns:
+        tuple: The path of the temporary file, and the SHA-256 of its content.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(dir=folder, suffix=".upload")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while chunk := stream.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ValueError(
+                        f"Avatar must be smaller than {max_bytes // 2**20} MB."
+                    )
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, digest.hexdigest()
+
+
+def render_variants(path: str, key: str, folder: str):
+    """Writes a square WebP of the image for each of AVATAR_SIZES."""
+    config = current_app.config
+    sizes = config["AVATAR_SIZES"]
+    try:
+        with Image.open(path) as image:
+            # Checked before decoding, as the header is all that was read so far
+            if image.width * image.height > config["AVATAR_MAX_PIXELS"]:
+                raise ValueError("Avatar image has too many pixels.")
+            # Lets JPEG decode straight to a smaller scale, much faster
+            image.draft("RGB", (max(sizes), max(sizes)))
+            image = ImageOps.exif_transpose(image)
+            has_alpha = "A" in image.getbands() or "transparency" in image.info
+            image = image.convert("RGBA" if has_alpha else "RGB")
+            for size in sizes:
+                variant = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+                target = os.path.join(folder, variant_name(key, size))
+                # Written aside first, so a variant is never served half written
+                variant.save(
+                    target + ".tmp", "WEBP", quality=config["AVATAR_QUALITY"], method=4
+                )
+                os.replace(target + ".tmp", target)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise ValueError("The file is not a supported image.") from e
+
+
+def store_avatar(stream) -> str:
+    """
+    Processes an uploaded avatar into its variants.
+
+    They are named after the hash of the upload, so an image uploaded again,
+    by anyone, is neither processed nor stored twice.
+
+    Returns:
+        str: The key of the avatar, stored in `User.avatar`.
+    """
+    folder = avatar_folder()
+    os.makedirs(folder, exist_ok=True)
+    path, digest = save_upload(stream, folder, current_app.config["AVATAR_MAX_BYTES"])
+    key = digest[:32]
+    try:
+        if not is_stored(key):
+            render_variants(path, key, folder)
+    finally:
+        os.remove(path)
+    return key
+
+
+def delete_avatar(key: str):
+    folder = avatar_folder()
+    for size in current_app.config["AVATAR_SIZES"]:
+        try:
+            os.remove(os.path.join(folder, variant_name(key, size)))
+        except FileNotFoundError:
+            pass
+
+
+def is_legacy_avatar(avatar: str) -> bool:
+    # Avatars uploaded before the variants were stored as is, under static/avatars
+    return "/" in avatar
+
+
+def avatar_url(avatar: str | None, size: int = 96) -> str | None:
+    """URL of the smallest variant of an avatar at least `size` pixels wide."""
+    if not avatar:
+        return None
+    if is_legacy_avatar(avatar):
+        return url_for("static", filename=avatar)
+    sizes = sorted(current_app.config["AVATAR_SIZES"])
+    size = next((s for s in sizes if s >= size), sizes[-1])
+    return url_for("user.avatar", filename=variant_name(avatar, size))
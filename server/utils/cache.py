@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import OrderedDict
+
+from server.utils.metrics import registry
+
+CACHE_HITS = registry.counter("cache_hits_total", "Cache lookups served, per cache.")
+CACHE_MISSES = registry.counter(
+    "cache_misses_total", "Cache lookups not served, per cache."
+)
+CACHE_EVICTIONS = registry.counter(
+    "cache_evictions_total", "Entries evicted to make room, per cache."
+)
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Thread-safe in-process cache, evicting the least recently used entry.
+
+    Entries also expire `ttl` seconds after being set, if given. A cache with
+    a `maxsize` of 0 keeps nothing. Hits, misses and evictions are counted per
+    instance and, labelled with the cache name, on /metrics.
+    """
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = time.monotonic
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, maxsize: int, ttl: float = None):
+        with self._lock:
+            self.maxsize = maxsize
+            self.ttl = ttl
+            self._entries.clear()
+
+    def get(self, key, default=None):
+        with self._lock:
+            value, expires_at = self._entries.get(key, (_MISSING, None))
+            if value is not _MISSING and expires_at is not None:
+                if self.clock() >= expires_at:
+                    del self._entries[key]
+                    value = _MISSING
+            if value is _MISSING:
+                self.misses += 1
+                CACHE_MISSES.inc(cache=self.name)
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            CACHE_HITS.inc(cache=self.name)
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = None if ttl is None else self.clock() + ttl
+        with self._lock:
+            if self.maxsize <= 0:
+                return
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+                CACHE_EVICTIONS.inc(cache=self.name)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,93 @@
+import gzip
+import time
+
+import brotli
+from flask import current_app, request
+
+from server.utils.metrics import registry
+
+COMPRESSION_SECONDS = registry.histogram(
+    "response_compression_seconds",
+    "Time spent compressing responses, by encoding.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+COMPRESSION_BYTES = registry.counter(
+    "response_compression_bytes_total",
+    "Size of the compressed responses, before and after compression.",
+)
+
+# Encodings in order of preference, when the client accepts them equally
+ENCODERS = {
+    "br": lambda data, config: brotli.compress(
+        data, quality=config["COMPRESS_BROTLI_QUALITY"]
+    ),
+    "gzip": lambda data, config: gzip.compress(
+        data, compresslevel=config["COMPRESS_GZIP_LEVEL"], mtime=0
+    ),
+}
+
+
+def is_compressible(response) -> bool:
+    # Files and streams are left alone, static files come precompressed
+    return (
+        200 <= response.status_code < 300
+        and response.status_code not in (204, 206)
+        and not response.direct_passthrough
+        and not response.is_streamed
+        and "Content-Encoding" not in response.headers
+        and response.mimetype in current_app.config["COMPRESS_MIMETYPES"]
+        and not response.cache_control.no_transform
+    )
+
+
+def choose_encoding(accept_encodings) -> str | None:
+    """The supported encoding the client prefers, if it accepts any."""
+    best, best_quality = None, 0
+    for encoding in ENCODERS:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress_response(response):
+    """
+    Compresses responses above COMPRESS_MIN_SIZE with brotli or gzip.
+
+    The time it took is reported in a Server-Timing header, along with the
+    sizes before and after, and recorded on /metrics.
+    """
+    config = current_app.config
+    if not config["COMPRESS_ENABLED"] or not is_compressible(response):
+        return response
+    data = response.get_data()
+    if len(data) < config["COMPRESS_MIN_SIZE"]:
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    started = time.perf_counter()
+    compressed = ENCODERS[encoding](data, config)
+    seconds = time.perf_counter() - started
+    COMPRESSION_SECONDS.observe(seconds, encoding=encoding)
+    COMPRESSION_BYTES.inc(len(data), encoding=encoding, stage="in")
+    COMPRESSION_BYTES.inc(len(compressed), encoding=encoding, stage="out")
+
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    # The representation changed, a strong validator must change with it
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f"{etag}-{encoding}")
+    response.headers.add(
+        "Server-Timing",
+        f'compress;dur={seconds * 1000:.2f};desc="{encoding} '
+        f'{len(data)}>{len(compressed)}"',
+    )
+    return response
+
+
+def init_compression(app):
+    app.after_request(compress_response)
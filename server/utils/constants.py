@@ -33,6 +33,14 @@ EXERCISE_METRICS = {
     ExerciseType.WEIGHTLIFTING: ["weight", "sets", "reps"],  # in kg
     ExerciseType.YOGA: ["duration"],
 }
+# Metabolic equivalents used to estimate burned calories
+EXERCISE_MET_VALUES = {
+    ExerciseType.CYCLING: 7.5,
+    ExerciseType.RUNNING: 9.8,
+    ExerciseType.SWIMMING: 8.0,
+    ExerciseType.WEIGHTLIFTING: 6.0,
+    ExerciseType.YOGA: 3.0,
+}
 GOAL_METRICS = [
     "distance",
     "duration",
@@ -1,5 +1,11 @@
 import pytz
 
+from server.utils.avatars import avatar_url
+
 
 def inject_pytz():
-    return {'pytz': pytz}
+    return {"pytz": pytz}
+
+
+def inject_avatar_url():
+    return {"avatar_url": avatar_url}
@@ -0,0 +1,68 @@
+from contextvars import ContextVar
+
+from flask_sqlalchemy.session import Session
+from sqlalchemy import JSON, Float
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.expression import ColumnElement
+
+REPLICA_BIND = "replica"
+
+# Set by server.utils.replica.use_replica around read-only code paths
+read_from_replica = ContextVar("read_from_replica", default=False)
+
+# JSON column type, stored as JSONB on PostgreSQL so it can be indexed and compared
+JSON_DOCUMENT = JSON().with_variant(postgresql.JSONB(), "postgresql")
+
+
+def resolve_database_url(url: str) -> str:
+    """Maps `postgres://` and `postgresql://` URLs to the psycopg 3 driver."""
+    for scheme in ("postgres://", "postgresql://"):
+        if url.startswith(scheme):
+            return "postgresql+psycopg://" + url[len(scheme) :]
+    return url
+
+
+def dialect_insert(connection, table):
+    """Returns an INSERT for `table` that supports ON CONFLICT on this backend."""
+    if connection.dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
+class json_number(ColumnElement):
+    """Numeric value of a top-level key of a JSON column, for generated columns."""
+
+    type = Float()
+    inherit_cache = False
+
+    def __init__(self, column_name: str, key: str):
+        self.column_name = column_name
+        self.key = key
+
+
+@compiles(json_number)
+def compile_json_number(element, _compiler, **_kw):
+    return f"json_extract({element.column_name}, '$.{element.key}')"
+
+
+@compiles(json_number, "postgresql")
+def compile_json_number_postgresql(element, _compiler, **_kw):
+    return f"(({element.column_name} ->> '{element.key}')::double precision)"
+
+
+class RoutingSession(Session):
+    """Session sending reads to the replica bind while `read_from_replica` is set."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and read_from_replica.get()
+            and not self._flushing
+            and not isinstance(clause, UpdateBase)
+        ):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
@@ -1,5 +1,10 @@
+import hashlib
+import time
 from functools import wraps
-from flask import jsonify
+
+from flask import current_app, jsonify, make_response, request, session
+from flask.globals import request_ctx
+from flask_login import current_user
 
 
 def api_response(func):
@@ -20,3 +25,56 @@ def api_response(func):
         return jsonify(response)
 
     return wrapper
+
+
+def shows_flashes() -> bool:
+    # Flashed messages are popped from the session once a template renders them
+    return "_flashes" in session or bool(request_ctx.flashes)
+
+
+def render_key(*parts) -> str:
+    """
+    Identifies what the current user is rendered for `parts`, e.g. a version.
+
+    Rendered HTML embeds CSRF tokens, which change with the session and expire,
+    so the key also changes with those and every ETAG_WINDOW.
+    """
+    window = int(time.time() // current_app.config["ETAG_WINDOW"])
+    key = repr((current_user.get_id(), parts, window, session.get("csrf_token")))
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def conditional(get_version):
+    """
+    Answers GET requests with 304 while the data of the view is unchanged.
+
+    `get_version` is called with the view arguments and returns the version of
+    the data, or None to always run the view. Responses get a weak ETag of it,
+    so revisits only cost that lookup. Pages showing flashed messages are never
+    reused.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if request.method not in ("GET", "HEAD") or shows_flashes():
+                return func(*args, **kwargs)
+            version = get_version(**kwargs)
+            if version is None:
+                return func(*args, **kwargs)
+            etag = render_key(version)
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(func(*args, **kwargs))
+                if response.status_code != 200 or shows_flashes():
+                    return response
+            response.set_etag(etag, weak=True)
+            # Browsers must revalidate, shared caches must not store the pages
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+
+        return wrapper
+
+    return decorator
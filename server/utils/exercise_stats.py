@@ -0,0 +1,108 @@
+from datetime import date
+
+import numpy as np
+
+from server.utils.constants import ExerciseType
+
+EXERCISE_TYPES = list(ExerciseType)
+TYPE_CODES = {exercise_type: code for code, exercise_type in enumerate(EXERCISE_TYPES)}
+# Metric columns of the rows, after the type and creation time
+METRICS = ("distance", "duration", "weight", "sets", "reps")
+# Converting datetimes one by one is slow in NumPy, day ordinals are not
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def exercise_columns(rows) -> dict[str, np.ndarray]:
+    """
+    Turns (type, created_at, *METRICS) rows into one array per column.
+
+    Types become their code in EXERCISE_TYPES, creation times their UTC day,
+    and missing metrics count as 0.
+    """
+    rows = list(rows)
+    types, created_at, *metrics = zip(*rows) if rows else [()] * (2 + len(METRICS))
+    columns = {
+        "type": np.fromiter(
+            (TYPE_CODES[t] for t in types), dtype=np.intp, count=len(types)
+        ),
+        "date": (
+            np.fromiter(
+                (d.toordinal() for d in created_at), dtype=np.int64, count=len(rows)
+            )
+            - EPOCH_ORDINAL
+        ).astype("datetime64[D]"),
+    }
+    for name, values in zip(METRICS, metrics):
+        columns[name] = np.nan_to_num(np.array(values, dtype=float))
+    return columns
+
+
+def type_distribution(columns: dict[str, np.ndarray]) -> list[dict]:
+    """
+    Count and metric totals of each exercise type done, distances in km, in the
+    order the types first appear in the rows.
+    """
+    codes = columns["type"]
+    present, first_seen = np.unique(codes, return_index=True)
+    counts = np.bincount(codes, minlength=len(EXERCISE_TYPES))
+    totals = {
+        name: np.bincount(codes, weights=columns[name], minlength=len(EXERCISE_TYPES))
+        for name in METRICS
+    }
+    return [
+        {
+            "type": EXERCISE_TYPES[code].name,
+            "count": int(counts[code]),
+            "distance": float(totals["distance"][code]) / 1000,  # Convert to km
+            "duration": float(totals["duration"][code]),
+            "total_weight": float(totals["weight"][code]),
+            "sets": float(totals["sets"][code]),
+            "reps": float(totals["reps"][code]),
+        }
+        for code in present[np.argsort(first_seen)]
+    ]
+
+
+def daily_stats(columns: dict[str, np.ndarray]) -> list[dict]:
+    """Exercise count and total duration of each day, oldest first."""
+    days, day_index = np.unique(columns["date"], return_inverse=True)
+    counts = np.bincount(day_index, minlength=len(days))
+    durations = np.bincount(day_index, weights=columns["duration"], minlength=len(days))
+    return [
+        {"date": str(day), "count": int(count), "duration": float(duration)}
+        for day, count, duration in zip(days, counts, durations)
+    ]
+
+
+def strength_volume(columns: dict[str, np.ndarray]) -> list[dict]:
+    """Volume, weight, sets and reps of each weightlifting session, in row order."""
+    lifts = columns["type"] == TYPE_CODES[ExerciseType.WEIGHTLIFTING]
+    weight, sets, reps = (columns[name][lifts] for name in ("weight", "sets", "reps"))
+    return [
+        {
+            "date": str(day),
+            "volume": float(volume),
+            "weight": float(session_weight),
+            "sets": float(session_sets),
+            "reps": float(session_reps),
+        }
+        for day, volume, session_weight, session_sets, session_reps in zip(
+            columns["date"][lifts], sets * reps * weight, weight, sets, reps
+        )
+    ]
+
+
+def summarise_exercises(rows) -> dict:
+    """
+    Computes the statistics of the exercise charts from (type, created_at,
+    *METRICS) rows, given newest first as the charts list them.
+
+    The result only holds plain lists, dicts and numbers, and depends on
+    nothing but the rows, so it can be cached and served as JSON as is.
+    """
+    columns = exercise_columns(rows)
+    return {
+        "type_distribution": type_distribution(columns),
+        "daily_stats": daily_stats(columns),
+        "strength_volume": strength_volume(columns),
+    }
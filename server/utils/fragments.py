@@ -0,0 +1,81 @@
+import threading
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+from server.utils.cache import LRUCache
+from server.utils.decorators import render_key
+
+
+class FragmentCacheExtension(Extension):
+    """
+    `{% cache "name", version %}...{% endcache %}` renders the block once per
+    user and version of what it shows, later renders reuse the HTML.
+
+    The version is anything the block changes with, e.g. a data version or a
+    count, and has to be cheaper to get than rendering the block. Data only the
+    block needs should be loaded inside it, e.g. by calling a function passed to
+    the template, so that hits skip it too.
+    """
+
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        call = self.call_method("_render", [nodes.List(args)])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render(self, args, caller):
+        name, *version = args
+        return fragment_cache.render(name, version, caller)
+
+
+class FragmentCache:
+    """
+    In-process LRU caches of rendered template fragments, one per fragment name.
+
+    Each fragment gets FRAGMENT_CACHE_SIZE entries, so a busy one does not
+    evict the others, and its hits, misses and evictions on /metrics under
+    `cache="fragment_<name>"`.
+    """
+
+    def __init__(self):
+        self.maxsize = 0
+        self.ttl = None
+        self.caches = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.configure(
+            app.config["FRAGMENT_CACHE_SIZE"], app.config["FRAGMENT_CACHE_TTL"]
+        )
+        app.jinja_env.add_extension(FragmentCacheExtension)
+
+    def configure(self, maxsize: int, ttl: float = None):
+        with self._lock:
+            self.maxsize = maxsize
+            self.ttl = ttl
+            for cache in self.caches.values():
+                cache.configure(maxsize, ttl)
+
+    def cache(self, name: str) -> LRUCache:
+        with self._lock:
+            if name not in self.caches:
+                self.caches[name] = LRUCache(f"fragment_{name}", self.maxsize, self.ttl)
+            return self.caches[name]
+
+    def render(self, name: str, version, render):
+        cache = self.cache(name)
+        key = render_key(*version)
+        html = cache.get(key)
+        if html is None:
+            html = render()
+            cache.set(key, html)
+        return html
+
+
+fragment_cache = FragmentCache()
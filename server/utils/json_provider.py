@@ -8,7 +8,11 @@ from server.utils.constants import ExerciseType, BodyMeasurementType
 class JSONProvider(DefaultJSONProvider):
     def default(self, obj):
         if isinstance(obj, db.Model):
-            return {c.name: getattr(obj, c.name) for c in obj.__table__.columns}
+            return {
+                c.name: getattr(obj, c.name)
+                for c in obj.__table__.columns
+                if c.computed is None
+            }
         elif hasattr(obj, "all") and callable(obj.all):
             return obj.all()
         elif isinstance(obj, time):
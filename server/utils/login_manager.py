@@ -1,3 +1,56 @@
-from flask_login import LoginManager
+from flask_login import LoginManager, UserMixin
+
+from server.models import db, User
+from server.utils.cache import LRUCache
 
 login_manager = LoginManager()
+
+# Identity fields of recently seen users, by user id
+user_cache = LRUCache("users")
+
+
+class CachedUser(UserMixin):
+    """
+    Stands in for the logged-in User, built from its cached identity fields.
+
+    Reading one of FIELDS needs no query. Anything else, e.g. relationships
+    or writes, loads the User row once and is delegated to it.
+    """
+
+    FIELDS = ("id", "username", "nickname", "email", "avatar", "city")
+
+    def __init__(self, fields: dict):
+        object.__setattr__(self, "_fields", fields)
+        object.__setattr__(self, "_user", None)
+
+    @classmethod
+    def fields_of(cls, user: User) -> dict:
+        return {name: getattr(user, name) for name in cls.FIELDS}
+
+    def get_user(self) -> User:
+        """The User row, loaded on first use."""
+        if self._user is None:
+            object.__setattr__(self, "_user", db.session.get(User, self._fields["id"]))
+        return self._user
+
+    def get_id(self):
+        return str(self._fields["id"])
+
+    def __getattr__(self, name):
+        # Once loaded the row is the source of truth, as it may have been changed
+        if self._user is None and name in self._fields:
+            return self._fields[name]
+        return getattr(self.get_user(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self.get_user(), name, value)
+
+
+def invalidate_user(user_id: int):
+    """Drops the cached identity of a user, after it was changed."""
+    user_cache.delete(int(user_id))
+
+
+def init_login_manager(app):
+    login_manager.init_app(app)
+    user_cache.configure(app.config["USER_CACHE_SIZE"], app.config["USER_CACHE_TTL"])
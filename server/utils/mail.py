@@ -1,3 +1,166 @@
-from flask_mail import Mail
+import datetime
+import smtplib
+import time
+
+from flask import current_app
+from flask_mail import BadHeaderError, Mail, Message
+
+from server.models import db, MailOutbox, utcnow
+from server.utils.metrics import registry
 
 mail = Mail()
+
+MAIL_DELIVERIES = registry.counter(
+    "mail_deliveries_total", "Outbox delivery attempts, by result."
+)
+
+# Errors about one message, after which the connection is still usable
+MESSAGE_ERRORS = (
+    smtplib.SMTPRecipientsRefused,
+    smtplib.SMTPSenderRefused,
+    smtplib.SMTPDataError,
+    BadHeaderError,
+)
+
+
+def queue_mail(subject: str, recipients: list[str], body: str, sender: str = None):
+    """
+    Adds an email to the outbox, to be sent by the mail worker.
+
+    It is only added to the session, so it is queued when the caller commits,
+    together with the changes it is about. Without a sender, MAIL_DEFAULT_SENDER
+    is used, and it is refused if that is not set either, as it could not be sent.
+    """
+    sender = sender or current_app.config.get("MAIL_DEFAULT_SENDER")
+    if not sender:
+        raise ValueError("No sender is configured for emails.")
+    message = MailOutbox(
+        sender=sender, recipients=list(recipients), subject=subject, body=body
+    )
+    db.session.add(message)
+    return message
+
+
+def retry_delay(attempts: int, base: float, maximum: float) -> float:
+    """Seconds to wait after the given number of failed attempts, doubling each time."""
+    return min(base * 2 ** (attempts - 1), maximum)
+
+
+def record_failure(message: MailOutbox, error: Exception, now: datetime.datetime):
+    config = current_app.config
+    message.attempts += 1
+    message.last_error = f"{type(error).__name__}: {error}"
+    if message.attempts >= config["MAIL_OUTBOX_MAX_ATTEMPTS"]:
+        message.status = MailOutbox.FAILED
+        MAIL_DELIVERIES.inc(result="failed")
+        current_app.logger.error(
+            "Gave up sending mail %s: %s", message.id, message.last_error
+        )
+        return
+    delay = retry_delay(
+        message.attempts,
+        config["MAIL_OUTBOX_RETRY_DELAY"],
+        config["MAIL_OUTBOX_MAX_RETRY_DELAY"],
+    )
+    message.next_attempt_at = now + datetime.timedelta(seconds=delay)
+    MAIL_DELIVERIES.inc(result="retry")
+
+
+def claim_batch(now: datetime.datetime) -> list[MailOutbox]:
+    """
+    Takes the next due messages, leasing them to this worker.
+
+    Claimed messages are not due again before MAIL_OUTBOX_LEASE seconds, so
+    if the worker dies while sending they are retried later, and other
+    workers skip them meanwhile.
+    """
+    config = current_app.config
+    batch = (
+        db.session.query(MailOutbox)
+        .filter(
+            MailOutbox.status == MailOutbox.PENDING,
+            MailOutbox.next_attempt_at <= now,
+        )
+        .order_by(MailOutbox.next_attempt_at, MailOutbox.id)
+        .limit(config["MAIL_OUTBOX_BATCH_SIZE"])
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    lease_until = now + datetime.timedelta(seconds=config["MAIL_OUTBOX_LEASE"])
+    for message in batch:
+        message.next_attempt_at = lease_until
+    db.session.commit()
+    return batch
+
+
+def deliver_outbox(now: datetime.datetime = None) -> dict:
+    """
+    Sends one batch of due messages over a single SMTP connection.
+
+    A message refused by the server, or that fails to be built, is retried on
+    its own later. If the
+    connection fails, the messages of the batch not sent yet are retried.
+
+    Returns:
+        dict: The number of messages `sent` and `failed` to send.
+    """
+    now = now or utcnow()
+    batch = claim_batch(now)
+    sent = failed = 0
+    if not batch:
+        return {"sent": sent, "failed": failed}
+
+    pending = list(batch)
+    try:
+        with mail.connect() as connection:
+            while pending:
+                message = pending[0]
+                try:
+                    connection.send(
+                        Message(
+                            subject=message.subject,
+                            sender=message.sender,
+                            recipients=message.recipients,
+                            body=message.body,
+                        )
+                    )
+                except MESSAGE_ERRORS as e:
+                    record_failure(message, e, now)
+                    failed += 1
+                except (smtplib.SMTPException, OSError):
+                    raise
+                except Exception as e:
+                    # A bad message must not stop the worker, or it would be
+                    # claimed again after its lease and stop it each time
+                    current_app.logger.exception("Could not send mail %s", message.id)
+                    record_failure(message, e, now)
+                    failed += 1
+                else:
+                    message.status = MailOutbox.SENT
+                    message.sent_at = utcnow()
+                    MAIL_DELIVERIES.inc(result="sent")
+                    sent += 1
+                # Committed one by one, so a crash does not send them twice
+                db.session.commit()
+                pending.pop(0)
+    except (smtplib.SMTPException, OSError) as e:
+        current_app.logger.warning("Mail connection failed: %s", e)
+        for message in pending:
+            record_failure(message, e, now)
+            failed += 1
+        db.session.commit()
+    return {"sent": sent, "failed": failed}
+
+
+def run_mail_worker(interval: float, once: bool = False):
+    """Delivers the outbox in batches, polling it every `interval` seconds when empty."""
+    while True:
+        counts = deliver_outbox()
+        if counts["sent"] or counts["failed"]:
+            current_app.logger.info(
+                "Sent %d emails, %d failed.", counts["sent"], counts["failed"]
+            )
+            continue
+        if once:
+            break
+        time.sleep(interval)
@@ -0,0 +1,136 @@
+import threading
+
+from flask import Response, abort, current_app, request
+
+
+def label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def format_labels(key: tuple) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in key) + "}"
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def value(self, **labels):
+        """The current value for the labels, or None if nothing was recorded."""
+        return self._values.get(label_key(labels))
+
+    def samples(self) -> list[tuple]:
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        for name, key, value in self.samples():
+            lines.append(f"{name}{format_labels(key)} {value:g}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[label_key(labels)] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, name: str, description: str, buckets=BUCKETS):
+        super().__init__(name, description)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = label_key(labels)
+        with self._lock:
+            counts, count, total = self._values.get(
+                key, ((0,) * len(self.buckets), 0, 0.0)
+            )
+            counts = tuple(c + (value <= b) for c, b in zip(counts, self.buckets))
+            self._values[key] = (counts, count + 1, total + value)
+
+    def count(self, **labels) -> int:
+        value = self.value(**labels)
+        return value[1] if value else 0
+
+    def samples(self) -> list[tuple]:
+        samples = []
+        for _, key, (counts, count, total) in super().samples():
+            for bound, bucket_count in zip(self.buckets, counts):
+                le = (("le", f"{bound:g}"),)
+                samples.append((f"{self.name}_bucket", key + le, bucket_count))
+            samples.append((f"{self.name}_bucket", key + (("le", "+Inf"),), count))
+            samples.append((f"{self.name}_sum", key, total))
+            samples.append((f"{self.name}_count", key, count))
+        return samples
+
+
+class Registry:
+    """Metrics of this process, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, description, **kwargs):
+        with self._lock:
+            if name not in self.metrics:
+                self.metrics[name] = cls(name, description, **kwargs)
+            return self.metrics[name]
+
+    def counter(self, name: str, description: str) -> Counter:
+        return self._get(Counter, name, description)
+
+    def gauge(self, name: str, description: str) -> Gauge:
+        return self._get(Gauge, name, description)
+
+    def histogram(self, name: str, description: str, **kwargs) -> Histogram:
+        return self._get(Histogram, name, description, **kwargs)
+
+    def render(self) -> str:
+        return "".join(metric.render() + "\n" for metric in self.metrics.values())
+
+
+registry = Registry()
+
+
+def metrics_view():
+    # Proxied requests may come from the loopback too, so they are refused
+    if (
+        request.remote_addr not in current_app.config["METRICS_ALLOWED_ADDRS"]
+        or "X-Forwarded-For" in request.headers
+    ):
+        abort(404)
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+def init_metrics(app):
+    app.add_url_rule("/metrics", "metrics", metrics_view)
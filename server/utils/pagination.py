@@ -0,0 +1,60 @@
+import base64
+import binascii
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import tuple_
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encodes the position after a row as an opaque, URL safe cursor."""
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Decodes a cursor made by encode_cursor, raises ValueError if it is invalid."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid page cursor.")
+
+
+def filter_date_range(query, column, start_date: date = None, end_date: date = None):
+    """Limits a query to rows whose `column` falls within the days, both inclusive."""
+    if start_date is not None:
+        query = query.filter(column >= datetime.combine(start_date, time.min))
+    if end_date is not None:
+        end = datetime.combine(end_date + timedelta(days=1), time.min)
+        query = query.filter(column < end)
+    return query
+
+
+def keyset_page(query, model, cursor: str = None, limit: int = 100) -> dict:
+    """
+    Returns one page of a query, newest first, using (created_at, id) as the key.
+
+    Unlike OFFSET, the database seeks straight to the cursor through the
+    (user_id, created_at) indexes, so every page costs the same.
+
+    Args:
+        query: The query to paginate, its ordering is replaced.
+        model: The model queried, which must have `created_at` and `id` columns.
+        cursor (str): The `next_cursor` of the previous page, or None for the first.
+        limit (int): The maximum number of rows in the page.
+
+    Returns:
+        dict: The `items` of the page, and the `next_cursor` or None on the last page.
+    """
+    key = tuple_(model.created_at, model.id)
+    query = query.order_by(None).order_by(model.created_at.desc(), model.id.desc())
+    if cursor:
+        query = query.filter(key < tuple_(*decode_cursor(cursor)))
+
+    items = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(items[-1].created_at, items[-1].id)
+    return {"items": items, "next_cursor": next_cursor}
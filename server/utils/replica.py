@@ -0,0 +1,79 @@
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, session
+from sqlalchemy import event
+
+from server.models import db
+from server.utils.database import REPLICA_BIND, RoutingSession, read_from_replica
+
+# Flask session key holding the time of the client's last write
+LAST_WRITE_KEY = "_last_write"
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def track_write(_session, _flush_context):
+    # Reads following a write in the same request must see it
+    read_from_replica.set(False)
+    if has_request_context():
+        g.db_wrote = True
+
+
+def replica_is_fresh() -> bool:
+    """Whether the replica is expected to have caught up with the client's writes."""
+    if not has_request_context():
+        return True
+    if g.get("db_wrote"):
+        return False
+    last_write = session.get(LAST_WRITE_KEY)
+    return (
+        last_write is None
+        or time.time() - last_write > current_app.config["REPLICA_MAX_LAG"]
+    )
+
+
+@contextmanager
+def use_replica():
+    """
+    Reads from the replica inside the block, also usable as a decorator.
+
+    Reads stay on the primary when no replica is configured, or when the client
+    wrote less than REPLICA_MAX_LAG seconds ago. Writes always go to the primary.
+    """
+    token = read_from_replica.set(replica_is_fresh())
+    try:
+        yield
+    finally:
+        read_from_replica.reset(token)
+
+
+def remember_write(response):
+    if g.get("db_wrote"):
+        session[LAST_WRITE_KEY] = time.time()
+    return response
+
+
+def sync_replica():
+    """Copies the primary SQLite database into the replica with the backup API."""
+    primary = db.engine
+    replica = db.engines[REPLICA_BIND]
+    if primary.dialect.name != "sqlite" or replica.dialect.name != "sqlite":
+        raise RuntimeError("Only SQLite replicas can be synced, use replication.")
+    source = primary.raw_connection()
+    target = replica.raw_connection()
+    try:
+        source.driver_connection.backup(target.driver_connection)
+    finally:
+        target.close()
+        source.close()
+
+
+def init_replica(app):
+    """Adds the replica bind, must run before the database is initialized."""
+    uri = app.config.get("REPLICA_DATABASE_URI")
+    if not uri:
+        return
+    binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+    binds[REPLICA_BIND] = uri
+    app.config["SQLALCHEMY_BINDS"] = binds
+    app.after_request(remember_write)
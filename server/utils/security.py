@@ -1,8 +1,21 @@
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
 import bcrypt
+from werkzeug.exceptions import ServiceUnavailable
+
+from server.utils.metrics import registry
+
 
+# Default cost of bcrypt.gensalt()
+DEFAULT_ROUNDS = 12
 
-def hash_password(plain_password: str):
-    salt = bcrypt.gensalt()
+
+def hash_password(plain_password: str, rounds: int = DEFAULT_ROUNDS):
+    salt = bcrypt.gensalt(rounds)
     hashed_password = bcrypt.hashpw(plain_password.encode("utf-8"), salt)
     return hashed_password.decode("utf-8")
 
@@ -13,3 +26,169 @@ def check_password(plain_password: str, hashed_password: str):
     if not isinstance(hashed_password, bytes):
         raise TypeError("Password must be of type bytes")
     return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password)
+
+
+def password_rounds(hashed_password: str) -> int | None:
+    """The bcrypt cost of a hash, e.g. 12 for "$2b$12$...", or None if unknown."""
+    try:
+        return int(hashed_password.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def calibrate_rounds(
+    target_seconds: float, min_rounds: int = 4, max_rounds: int = 16
+) -> tuple[int, dict]:
+    """
+    Finds the highest bcrypt cost whose hash time stays within the target.
+
+    Every extra round doubles the time, so the benchmark stops at the first
+    cost over the target. Returns the cost, at least `min_rounds`, and the
+    seconds measured for each cost tried.
+    """
+    timings = {}
+    best = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        _, timings[rounds] = timed(hash_password, "calibration", rounds)
+        if timings[rounds] > target_seconds:
+            break
+        best = rounds
+    return best, timings
+
+
+HASH_SECONDS = registry.histogram(
+    "password_hash_seconds", "Time spent in bcrypt, per operation."
+)
+QUEUE_WAIT = registry.histogram(
+    "password_hash_queue_wait_seconds", "Time password work waited for a worker."
+)
+IN_FLIGHT = registry.gauge(
+    "password_hash_in_flight", "Password operations running or queued."
+)
+REJECTED = registry.counter(
+    "password_hash_rejected_total", "Password operations refused as the pool is full."
+)
+
+
+def timed(func, *args):
+    """Returns the result of func and the seconds it took, in the worker."""
+    started = time.perf_counter()
+    return func(*args), time.perf_counter() - started
+
+
+class PasswordHasherBusy(ServiceUnavailable):
+    description = "Too many sign-ins at the moment, please try again shortly."
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a bounded process pool, off the request threads.
+
+    At most `workers + max_queue` calls are admitted at once, the next ones
+    fail fast with a 503 and a Retry-After header rather than piling up.
+    With no workers, bcrypt runs inline.
+    """
+
+    def __init__(self):
+        self.workers = 0
+        self.max_queue = 0
+        self.timeout = None
+        self.retry_after = 1
+        self.rounds = DEFAULT_ROUNDS
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.shutdown()
+        self.workers = app.config["PASSWORD_HASH_WORKERS"]
+        self.max_queue = app.config["PASSWORD_HASH_QUEUE"]
+        self.timeout = app.config["PASSWORD_HASH_TIMEOUT"]
+        self.retry_after = app.config["PASSWORD_HASH_RETRY_AFTER"]
+        self.rounds = app.config["BCRYPT_ROUNDS"]
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+
+    def hash(self, plain_password: str) -> str:
+        return self.run(hash_password, plain_password, self.rounds, operation="hash")
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """Whether a hash was made with another cost than the configured one."""
+        return password_rounds(hashed_password) != self.rounds
+
+    def check(self, plain_password: str, hashed_password: str) -> bool:
+        return self.run(
+            check_password, plain_password, hashed_password, operation="check"
+        )
+
+    def run(self, func, *args, operation: str):
+        if not self.workers:
+            result, seconds = timed(func, *args)
+            HASH_SECONDS.observe(seconds, operation=operation)
+            return result
+
+        if not self._slots.acquire(blocking=False):
+            REJECTED.inc(operation=operation)
+            raise PasswordHasherBusy(retry_after=self.retry_after)
+        IN_FLIGHT.inc()
+        release = self._slot_release()
+        started = time.perf_counter()
+        future = None
+        try:
+            executor = self._get_executor()
+            future = executor.submit(timed, func, *args)
+            future.add_done_callback(release)
+            result, seconds = future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            REJECTED.inc(operation=operation)
+            raise PasswordHasherBusy(retry_after=self.retry_after)
+        except BrokenProcessPool:
+            self._reset_executor(executor)
+            REJECTED.inc(operation=operation)
+            raise PasswordHasherBusy(retry_after=self.retry_after)
+        finally:
+            # A call that timed out keeps its slot until its worker is done with
+            # it, so abandoned work still counts against the limit
+            if future is None or future.done():
+                release()
+        QUEUE_WAIT.observe(time.perf_counter() - started - seconds)
+        HASH_SECONDS.observe(seconds, operation=operation)
+        return result
+
+    def _slot_release(self):
+        """Returns a function giving back the slot of a call, only the first time."""
+        slots = self._slots
+        released = threading.Lock()
+
+        def release(*args):
+            if released.acquire(blocking=False):
+                IN_FLIGHT.dec()
+                slots.release()
+
+        return release
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created on first use, so every forked web worker gets its own pool
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _reset_executor(self, executor: ProcessPoolExecutor):
+        # A worker that died, e.g. killed for memory, breaks the whole pool, the
+        # next call starts a new one
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,69 @@
+import re
+import time
+
+from sqlalchemy import event
+
+PRAGMA_NAME = re.compile(r"^[a-z_]+$")
+
+
+def register_pragmas(engine, pragmas: dict, optimize_interval: float | None = None):
+    """
+    Applies the pragmas to every new connection of a SQLite engine.
+
+    Args:
+        engine: The SQLAlchemy engine.
+        pragmas (dict): Pragma names and values, applied in order.
+        optimize_interval (float | None): Seconds between two `PRAGMA optimize`
+            runs on checked out connections, or None to never run it.
+    """
+    for name in pragmas:
+        if not PRAGMA_NAME.match(name):
+            raise ValueError(f"Invalid pragma name '{name}'")
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, _connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    if optimize_interval:
+        last_optimize = [time.monotonic()]
+
+        @event.listens_for(engine, "checkout")
+        def optimize(dbapi_connection, _connection_record, _connection_proxy):
+            now = time.monotonic()
+            if now - last_optimize[0] < optimize_interval:
+                return
+            last_optimize[0] = now
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA optimize")
+            cursor.close()
+
+
+def read_pragmas(engine, names) -> dict:
+    """Returns the values of the pragmas currently in effect."""
+    with engine.connect() as connection:
+        return {
+            name: connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+            for name in names
+            if PRAGMA_NAME.match(name)
+        }
+
+
+def init_sqlite(app, db):
+    """Applies the configured pragma profile to the app's SQLite engines."""
+    pragmas = app.config.get("SQLITE_PRAGMAS") or {}
+    optimize_interval = app.config.get("SQLITE_OPTIMIZE_INTERVAL")
+    if not pragmas and not optimize_interval:
+        return
+    with app.app_context():
+        for bind_key, engine in db.engines.items():
+            if engine.dialect.name != "sqlite":
+                continue
+            register_pragmas(engine, pragmas, optimize_interval)
+            app.logger.info(
+                "SQLite pragmas in effect for %s: %s",
+                bind_key or "default",
+                read_pragmas(engine, pragmas),
+            )
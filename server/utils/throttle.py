@@ -0,0 +1,151 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from werkzeug.exceptions import TooManyRequests
+
+from server.utils.metrics import registry
+
+LOGIN_ATTEMPTS = registry.counter(
+    "login_attempts_total", "Login attempts, processed or rejected by the throttle."
+)
+
+
+def refill(tokens: float, updated: float, now: float, capacity: int, rate: float):
+    """Tokens of a bucket at `now`, refilled at `rate` per second up to capacity."""
+    return min(capacity, tokens + max(now - updated, 0) * rate)
+
+
+class MemoryBucketStore:
+    """Token buckets of this process only."""
+
+    # Buckets which are full again are dropped past this many keys
+    MAX_KEYS = 10000
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: int, rate: float, now: float) -> float:
+        """Takes a token, returns 0 or the seconds until one is available."""
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (capacity, now, now))
+            tokens = refill(tokens, updated, now, capacity, rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / rate
+            if not wait:
+                tokens -= 1
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+            if len(self._buckets) > self.MAX_KEYS:
+                self._buckets = {
+                    key: bucket
+                    for key, bucket in self._buckets.items()
+                    if bucket[2] > now
+                }
+            return wait
+
+
+class SQLiteBucketStore:
+    """Token buckets in a SQLite file, shared by every worker process on the host."""
+
+    # Takes between two deletions of the buckets which are full again
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._takes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS token_bucket (key TEXT PRIMARY KEY, "
+                "tokens REAL NOT NULL, updated REAL NOT NULL, full_at REAL NOT NULL)"
+            )
+            self._local.connection = connection
+        return connection
+
+    def take(self, key: str, capacity: int, rate: float, now: float) -> float:
+        """Takes a token, returns 0 or the seconds until one is available."""
+        connection = self._connection()
+        # Lock the database first, so two workers cannot spend the same token
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT tokens, updated FROM token_bucket WHERE key = ?", (key,)
+            ).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = refill(tokens, updated, now, capacity, rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / rate
+            if not wait:
+                tokens -= 1
+            connection.execute(
+                "INSERT OR REPLACE INTO token_bucket VALUES (?, ?, ?, ?)",
+                (key, tokens, now, now + (capacity - tokens) / rate),
+            )
+            self._takes += 1
+            if self._takes % self.PRUNE_EVERY == 0:
+                connection.execute(
+                    "DELETE FROM token_bucket WHERE full_at <= ?", (now,)
+                )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return wait
+
+
+class LoginThrottled(TooManyRequests):
+    description = "Too many login attempts, please try again later."
+
+
+class LoginThrottle:
+    """
+    Token bucket limits on login attempts, per email and per client IP.
+
+    A bucket holds up to `attempts` tokens and refills fully over `period`
+    seconds. An attempt takes a token from both buckets of its IP and email,
+    and is rejected if either is empty, before any user lookup or bcrypt work.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.store = MemoryBucketStore()
+        self.period = 60
+        self.email_attempts = 5
+        self.ip_attempts = 20
+        self.clock = time.time
+
+    def init_app(self, app):
+        self.enabled = app.config["LOGIN_THROTTLE_ENABLED"]
+        self.period = app.config["LOGIN_THROTTLE_PERIOD"]
+        self.email_attempts = app.config["LOGIN_THROTTLE_EMAIL_ATTEMPTS"]
+        self.ip_attempts = app.config["LOGIN_THROTTLE_IP_ATTEMPTS"]
+        database = app.config["LOGIN_THROTTLE_DATABASE"]
+        if database:
+            self.store = SQLiteBucketStore(os.path.join(app.instance_path, database))
+        else:
+            self.store = MemoryBucketStore()
+
+    def check(self, email: str, ip: str):
+        """Counts a login attempt, raises LoginThrottled if it is over a limit."""
+        if not self.enabled:
+            return
+        now = self.clock()
+        limits = [
+            (f"ip:{ip}", self.ip_attempts, "ip"),
+            (f"email:{(email or '').strip().lower()}", self.email_attempts, "email"),
+        ]
+        for key, attempts, reason in limits:
+            wait = self.store.take(key, attempts, attempts / self.period, now)
+            if wait:
+                LOGIN_ATTEMPTS.inc(result="rejected", reason=reason)
+                raise LoginThrottled(retry_after=math.ceil(wait))
+        LOGIN_ATTEMPTS.inc(result="processed")
+
+
+login_throttle = LoginThrottle()
@@ -0,0 +1,88 @@
+import random
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from flask import current_app, g, has_app_context, has_request_context
+from sqlalchemy.exc import OperationalError
+
+from server.models import db
+
+# Set while a retrying call is running, nested calls then leave retries to it
+_retrying = ContextVar("retrying", default=False)
+
+
+def is_lock_error(e: BaseException | None) -> bool:
+    """Whether the exception, or one it was raised from, is a SQLite lock error."""
+    while e is not None:
+        if isinstance(e, OperationalError) and "locked" in str(e.orig):
+            return True
+        e = e.__cause__ or e.__context__
+    return False
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Exponential backoff with full jitter for the given retry attempt."""
+    return random.uniform(0, min(max_delay, base_delay * 2**attempt))
+
+
+def record_retry(delay: float):
+    """Adds a retry and its wait time to the stats of the current request."""
+    if has_request_context():
+        g.db_retries = g.get("db_retries", 0) + 1
+        g.db_retry_wait = g.get("db_retry_wait", 0.0) + delay
+
+
+def retry_on_lock(func):
+    """
+    Retries a write path when SQLite reports the database as locked.
+
+    The wrapped function must run a whole unit of work, from the first query to
+    the commit, as it is called again from scratch after a rollback. The lock
+    error may be wrapped, e.g. in a RuntimeError raised from it.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if _retrying.get():
+            return func(*args, **kwargs)
+
+        config = current_app.config if has_app_context() else {}
+        attempts = config.get("DB_RETRY_ATTEMPTS", 5)
+        base_delay = config.get("DB_RETRY_BASE_DELAY", 0.05)
+        max_delay = config.get("DB_RETRY_MAX_DELAY", 1.0)
+
+        token = _retrying.set(True)
+        try:
+            for attempt in range(attempts):
+                try:
+                    return func(*args, **kwargs)
+                except Exception as e:
+                    if attempt == attempts - 1 or not is_lock_error(e):
+                        raise
+                    db.session.rollback()
+                    delay = backoff_delay(attempt, base_delay, max_delay)
+                    record_retry(delay)
+                    time.sleep(delay)
+        finally:
+            _retrying.reset(token)
+
+    return wrapper
+
+
+def report_retries(response):
+    """Logs the retries of the request and exposes them as Server-Timing."""
+    retries = g.get("db_retries", 0)
+    if retries:
+        wait = g.get("db_retry_wait", 0.0)
+        current_app.logger.info(
+            "%d database lock retries, %.1f ms waited", retries, wait * 1000
+        )
+        response.headers.add(
+            "Server-Timing", f'db-retry;dur={wait * 1000:.1f};desc="{retries}"'
+        )
+    return response
+
+
+def init_transaction(app):
+    app.after_request(report_retries)
@@ -0,0 +1,318 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Protocol
+
+import requests
+from flask import current_app
+from requests.adapters import HTTPAdapter
+
+from server.utils.cache import LRUCache
+
+
+class WeatherProvider(Protocol):
+    def forecast(self, city: str, days: int) -> list[dict]:
+        """
+        Returns one forecast per day, starting today, with the `date`,
+        `icon_url`, `temp` and `description` of the day. Raises on failure.
+        """
+
+
+def parse_forecast(data: dict, days: int) -> list[dict]:
+    """Keeps the first OpenWeatherMap forecast of each of the next `days` days."""
+    weather_forecast = []
+    seen_dates = set()
+    for item in data.get("list", []):
+        date_str = datetime.fromtimestamp(item["dt"], tz=timezone.utc).strftime("%a %d")
+        if date_str not in seen_dates and len(weather_forecast) < days:
+            weather_forecast.append(
+                {
+                    "date": date_str,
+                    "icon_url": f"https://openweathermap.org/img/wn/{item['weather'][0]['icon']}@2x.png",
+                    "temp": round(item["main"]["temp"]),
+                    "description": item["weather"][0]["main"],
+                }
+            )
+            seen_dates.add(date_str)
+    return weather_forecast
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing upstream for a cool-down window.
+
+    After `threshold` failures in a row the circuit opens and calls are
+    refused. Once `cooldown` seconds have passed, a single trial call is let
+    through: its success closes the circuit, its failure opens it again.
+    """
+
+    def __init__(self, threshold: int = 3, cooldown: float = 30, clock=time.monotonic):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self._trial or self.clock() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self._trial or self.clock() - self.opened_at < self.cooldown:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.threshold:
+                self.opened_at = self.clock()
+            self._trial = False
+
+
+class WeatherClient:
+    """
+    OpenWeatherMap provider over a pooled keep-alive session.
+
+    Concurrent fetches of the same forecast share a single request, and a
+    circuit breaker stops calling OpenWeatherMap while it fails. Client errors,
+    e.g. an unknown city, do not count as failures of the upstream.
+    """
+
+    URL = "https://api.openweathermap.org/data/2.5/forecast"
+
+    def __init__(
+        self,
+        api_key: str,
+        url: str = URL,
+        timeout: float = 5,
+        pool_size: int = 4,
+        breaker: CircuitBreaker = None,
+    ):
+        self.api_key = api_key
+        self.url = url
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._lock = threading.Lock()
+        self._in_flight = {}
+
+    def forecast(self, city: str, days: int) -> list[dict]:
+        key = (city, days)
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            forecast = self._fetch(city, days)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(forecast)
+            return forecast
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def _fetch(self, city: str, days: int) -> list[dict]:
+        if not self.breaker.allow():
+            raise CircuitOpenError("Weather provider is unavailable.")
+        params = {"q": city, "units": "metric", "appid": self.api_key}
+        try:
+            resp = self.session.get(self.url, params=params, timeout=self.timeout)
+            resp.raise_for_status()
+            data = resp.json()
+        except requests.HTTPError as e:
+            if e.response.status_code < 500:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+            raise
+        except (requests.RequestException, ValueError):
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return parse_forecast(data, days)
+
+    def close(self):
+        self.session.close()
+
+
+class FakeWeatherProvider:
+    """Offline provider for tests and development, always sunny unless told to fail."""
+
+    def __init__(self, temp: int = 22, delay: float = 0, error: Exception = None):
+        self.temp = temp
+        self.delay = delay
+        self.error = error
+        self.cities = []  # Requested cities, in order
+
+    def forecast(self, city: str, days: int) -> list[dict]:
+        self.cities.append(city)
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        today = datetime.now(timezone.utc)
+        return [
+            {
+                "date": (today + timedelta(days=n)).strftime("%a %d"),
+                "icon_url": "https://openweathermap.org/img/wn/01d@2x.png",
+                "temp": self.temp,
+                "description": "Clear",
+            }
+            for n in range(days)
+        ]
+
+
+PROVIDERS = {
+    "openweathermap": lambda config: WeatherClient(
+        config["OPENWEATHER_API_KEY"],
+        timeout=config["WEATHER_TIMEOUT"],
+        pool_size=config["WEATHER_POOL_SIZE"],
+        breaker=CircuitBreaker(
+            config["WEATHER_BREAKER_THRESHOLD"], config["WEATHER_BREAKER_COOLDOWN"]
+        ),
+    ),
+    "fake": lambda config: FakeWeatherProvider(),
+}
+
+
+class WeatherCache:
+    """
+    Per city forecast cache which keeps the provider off the request path.
+
+    A forecast is served as is for `ttl` seconds, then served stale for up to
+    `stale_ttl` more seconds while it is refreshed in the background. Only a
+    city without a usable forecast waits for the provider, and for at most
+    `wait` seconds, getting an empty forecast past that. A failed fetch is
+    not retried for `error_ttl` seconds, meanwhile the last forecast, if any,
+    is served. Cities are whatever users typed, so at most `maxsize` of them
+    are kept, the least recently used are dropped first.
+    """
+
+    def __init__(
+        self,
+        provider: WeatherProvider,
+        ttl: float = 600,
+        stale_ttl: float = 3600,
+        error_ttl: float = 60,
+        wait: float = 0.5,
+        maxsize: int = 1024,
+        executor=None,
+        logger=None,
+        clock=time.monotonic,
+    ):
+        self.provider = provider
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.error_ttl = error_ttl
+        self.wait = wait
+        self.logger = logger
+        self.clock = clock
+        self._executor = executor
+        self._lock = threading.Lock()
+        # (city, days) -> (forecast, fetched at), while it can be served
+        self._forecasts = LRUCache("weather", maxsize, ttl + stale_ttl)
+        # (city, days) -> failed at, while it is not retried
+        self._failures = LRUCache("weather_failures", maxsize, error_ttl)
+        self._forecasts.clock = self._failures.clock = clock
+        self._pending = {}
+
+    def get(self, city: str, days: int = 5) -> list[dict]:
+        key = (city, days)
+        now = self.clock()
+        forecast, fetched_at = self._forecasts.get(key, (None, None))
+        if forecast is not None and now - fetched_at < self.ttl:
+            return forecast
+
+        usable = forecast is not None and now - fetched_at < self.ttl + self.stale_ttl
+        failed_at = self._failures.get(key)
+        if failed_at is not None and now - failed_at < self.error_ttl:
+            return forecast if usable else []
+
+        future = self.refresh(city, days)
+        if usable:
+            return forecast
+        try:
+            future.result(timeout=self.wait)
+        except Exception:
+            pass  # Timed out, or the failure was recorded by the refresh
+        forecast, fetched_at = self._forecasts.get(key, (None, None))
+        return forecast if forecast is not None else []
+
+    def refresh(self, city: str, days: int = 5) -> Future:
+        """Fetches the forecast in the background, unless it is already fetched."""
+        key = (city, days)
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=2, thread_name_prefix="weather"
+                    )
+                future = self._executor.submit(self._fetch, key)
+                self._pending[key] = future
+                future.add_done_callback(lambda _: self._pending.pop(key, None))
+        return future
+
+    def _fetch(self, key):
+        city, days = key
+        try:
+            forecast = self.provider.forecast(city, days)
+        except Exception as e:
+            self._failures.set(key, self.clock())
+            if self.logger is not None:
+                self.logger.warning("Weather forecast for %s failed: %s", city, e)
+            raise
+        self._forecasts.set(key, (forecast, self.clock()))
+        self._failures.delete(key)
+        return forecast
+
+
+def get_forecast(city: str, days: int = 5) -> list[dict]:
+    """Returns the cached forecast of a city, or an empty one if it is unknown."""
+    return current_app.extensions["weather"].get(city, days)
+
+
+def init_weather(app):
+    provider = app.config["WEATHER_PROVIDER"]
+    if isinstance(provider, str):
+        provider = PROVIDERS[provider](app.config)
+    app.extensions["weather"] = WeatherCache(
+        provider,
+        ttl=app.config["WEATHER_TTL"],
+        stale_ttl=app.config["WEATHER_STALE_TTL"],
+        error_ttl=app.config["WEATHER_ERROR_TTL"],
+        wait=app.config["WEATHER_WAIT"],
+        maxsize=app.config["WEATHER_CACHE_SIZE"],
+        logger=app.logger,
+    )
@@ -3,7 +3,7 @@ from http.cookies import SimpleCookie
 from pathlib import Path
 
 import pytest
-from flask import url_for
+from flask import g, url_for
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 
@@ -72,6 +72,47 @@ def test_receiver(app, db_session):
     yield receiver
 
 
+@pytest.fixture
+def logged_in(app, test_user, monkeypatch):
+    """The test user, logged in for a request context without a session cookie."""
+    monkeypatch.setitem(app.config, "SECRET_KEY", "test")
+    with app.test_request_context():
+        # Where Flask-Login keeps the user of the request
+        g._login_user = test_user
+        yield test_user
+        # g belongs to the app context, which outlives the request in the tests
+        g.pop("_login_user", None)
+
+
+@pytest.fixture
+def login_client(app, test_user, monkeypatch):
+    """A test client logged in as the test user."""
+    monkeypatch.setitem(app.config, "SECRET_KEY", "test")
+    client = app.test_client()
+    client.post(
+        "/user/login",
+        data={"email": test_user.email, "password": test_user.plain_password},
+    )
+    yield client
+    # The requests share the app context of the tests, and with it g
+    g.pop("_login_user", None)
+
+
+class FakeClock:
+    """Stands in for time.monotonic, the time only moves when a test sets `now`."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
 @pytest.fixture(scope="session")
 def chrome_driver():
     options = Options()
@@ -19,11 +19,11 @@ class TestBodyMeasurementModel:
         ],
     )
     def test_valid_body_measurement_creation(
-        self, db_session, measurement_type, valid_metrics
+        self, db_session, test_user, measurement_type, valid_metrics
     ):
         """Test valid body measurement creation with correct metrics"""
         body_measurement = BodyMeasurement(
-            user_id=1, type=measurement_type, value=valid_metrics
+            user_id=test_user.id, type=measurement_type, value=valid_metrics
         )
         db_session.add(body_measurement)
         db_session.commit()
@@ -0,0 +1,84 @@
+from datetime import date, datetime
+
+from server.models import DailySummary, Exercise, CalorieIntake, WaterIntake
+from server.utils.aggregates import rebuild_daily_summaries
+from server.utils.constants import ExerciseType
+
+
+class TestDailySummaryModel:
+    def test_writes_update_summary(self, db_session, test_user):
+        """Test exercise, calorie and water inserts roll up into the same day"""
+        created_at = datetime(2025, 5, 1, 8, 30)
+        db_session.add_all(
+            [
+                Exercise(
+                    user_id=test_user.id,
+                    type=ExerciseType.YOGA,
+                    metrics={"duration": 30},
+                    created_at=created_at,
+                ),
+                Exercise(
+                    user_id=test_user.id,
+                    type=ExerciseType.WEIGHTLIFTING,
+                    metrics={"weight": 40, "sets": 3, "reps": 10},
+                    created_at=created_at,
+                ),
+                CalorieIntake(
+                    user_id=test_user.id, calories=500, created_at=created_at
+                ),
+                WaterIntake(user_id=test_user.id, amount=0.25, created_at=created_at),
+                WaterIntake(user_id=test_user.id, amount=0.5, created_at=created_at),
+            ]
+        )
+        db_session.commit()
+
+        summary = DailySummary.get_by_user(test_user.id, date=date(2025, 5, 1)).one()
+        assert summary.exercise_count == 2
+        assert summary.met_minutes == 3.0 * 30 + 6.0 * 2
+        assert summary.calorie_intake == 500
+        assert summary.water_intake == 0.75
+
+    def test_delete_updates_summary(self, db_session, test_user):
+        """Test deleting a water intake removes it from the summary"""
+        intake = WaterIntake(
+            user_id=test_user.id, amount=0.25, created_at=datetime(2025, 5, 2)
+        )
+        db_session.add(intake)
+        db_session.commit()
+        db_session.delete(intake)
+        db_session.commit()
+
+        summary = DailySummary.get_by_user(test_user.id, date=date(2025, 5, 2)).one()
+        assert summary.water_intake == 0
+
+    def test_get_range_and_rebuild(self, db_session, test_user):
+        """Test range reads and rebuilding the summaries from source rows"""
+        for day in range(1, 6):
+            db_session.add(
+                CalorieIntake(
+                    user_id=test_user.id,
+                    calories=100 * day,
+                    created_at=datetime(2025, 5, day, 12),
+                )
+            )
+        db_session.add(
+            Exercise(
+                user_id=test_user.id,
+                type=ExerciseType.WEIGHTLIFTING,
+                metrics={"weight": 40, "sets": 3, "reps": 10},
+                created_at=datetime(2025, 5, 3, 18),
+            )
+        )
+        db_session.commit()
+        expected = DailySummary.get_by_user(test_user.id).all()
+        expected = [(s.date, s.exercise_count, s.met_minutes) for s in expected]
+        db_session.query(DailySummary).delete()
+        db_session.commit()
+
+        assert rebuild_daily_summaries() == 5
+        rebuilt = DailySummary.get_by_user(test_user.id).all()
+        assert [(s.date, s.exercise_count, s.met_minutes) for s in rebuilt] == expected
+        summaries = DailySummary.get_range(
+            test_user.id, date(2025, 5, 2), date(2025, 5, 4)
+        ).all()
+        assert [s.calorie_intake for s in summaries] == [400, 300, 200]
@@ -13,9 +13,13 @@ class TestExerciseModel:
             (ExerciseType.YOGA, {"duration": 45}),
         ],
     )
-    def test_valid_exercise_creation(self, db_session, exercise_type, valid_metrics):
+    def test_valid_exercise_creation(
+        self, db_session, test_user, exercise_type, valid_metrics
+    ):
         """Test valid exercise creation with correct metrics"""
-        exercise = Exercise(user_id=1, type=exercise_type, metrics=valid_metrics)
+        exercise = Exercise(
+            user_id=test_user.id, type=exercise_type, metrics=valid_metrics
+        )
         db_session.add(exercise)
         db_session.commit()
 
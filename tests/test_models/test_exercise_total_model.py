@@ -0,0 +1,68 @@
+from server.models import Exercise, ExerciseTotal
+from server.utils.aggregates import rebuild_exercise_totals
+from server.utils.constants import ExerciseType
+
+
+class TestExerciseTotalModel:
+    def test_insert_updates_totals(self, db_session, test_user):
+        """Test inserting exercises adds their metrics to the running totals"""
+        db_session.add_all(
+            [
+                Exercise(
+                    user_id=test_user.id,
+                    type=ExerciseType.RUNNING,
+                    metrics={"distance": 3000, "duration": 20},
+                ),
+                Exercise(
+                    user_id=test_user.id,
+                    type=ExerciseType.RUNNING,
+                    metrics={"distance": 2000, "duration": 15},
+                ),
+            ]
+        )
+        db_session.commit()
+
+        get_total = ExerciseTotal.get_total
+        assert get_total(test_user.id, ExerciseType.RUNNING, "distance") == 5000
+        assert get_total(test_user.id, ExerciseType.RUNNING, "duration") == 35
+        assert get_total(test_user.id, ExerciseType.CYCLING, "distance") == 0.0
+
+    def test_delete_updates_totals(self, db_session, test_user):
+        """Test deleting an exercise removes its metrics from the running totals"""
+        exercise = Exercise(
+            user_id=test_user.id,
+            type=ExerciseType.YOGA,
+            metrics={"duration": 45},
+        )
+        db_session.add(exercise)
+        db_session.commit()
+        assert (
+            ExerciseTotal.get_total(test_user.id, ExerciseType.YOGA, "duration") == 45
+        )
+
+        db_session.delete(exercise)
+        db_session.commit()
+        assert ExerciseTotal.get_total(test_user.id, ExerciseType.YOGA, "duration") == 0
+
+    def test_rebuild(self, db_session, test_user):
+        """Test rebuild recomputes the totals from the exercise table"""
+        db_session.add(
+            Exercise(
+                user_id=test_user.id,
+                type=ExerciseType.WEIGHTLIFTING,
+                metrics={"weight": 40, "sets": 3, "reps": 10},
+            )
+        )
+        db_session.commit()
+        db_session.query(ExerciseTotal).delete()
+        db_session.commit()
+
+        assert rebuild_exercise_totals() == 3
+        assert (
+            ExerciseTotal.get_total(test_user.id, ExerciseType.WEIGHTLIFTING, "weight")
+            == 40
+        )
+        assert (
+            ExerciseTotal.get_total(test_user.id, ExerciseType.WEIGHTLIFTING, "reps")
+            == 10
+        )
@@ -0,0 +1,142 @@
+from datetime import datetime, time, timedelta
+
+import pytest
+
+from server.models import (
+    db,
+    Achievement,
+    BodyMeasurement,
+    CalorieIntake,
+    DailySummary,
+    Exercise,
+    ExerciseTotal,
+    Goal,
+    ScheduledExercise,
+    User,
+    WaterIntake,
+)
+from server.utils.constants import ExerciseType, BodyMeasurementType
+
+
+@pytest.fixture
+def seeded_user(db_session):
+    """A few users with enough history for the planner to have a choice."""
+    if db.engine.dialect.name != "sqlite":
+        pytest.skip("EXPLAIN QUERY PLAN is SQLite specific")
+    start = datetime(2025, 1, 1)
+    users = []
+    for n in range(3):
+        user = User(
+            username=f"user{n}",
+            nickname=f"User {n}",
+            email=f"user{n}@example.com",
+            password="x",
+        )
+        db_session.add(user)
+        db_session.flush()
+        for day in range(60):
+            created_at = start + timedelta(days=day)
+            db_session.add_all(
+                [
+                    Exercise(
+                        user_id=user.id,
+                        type=ExerciseType.RUNNING,
+                        metrics={"distance": 5000, "duration": 30},
+                        created_at=created_at,
+                    ),
+                    Exercise(
+                        user_id=user.id,
+                        type=ExerciseType.YOGA,
+                        metrics={"duration": 30},
+                        created_at=created_at,
+                    ),
+                    BodyMeasurement(
+                        user_id=user.id,
+                        type=BodyMeasurementType.WEIGHT,
+                        value=70,
+                        created_at=created_at,
+                    ),
+                    CalorieIntake(user_id=user.id, calories=500, created_at=created_at),
+                    WaterIntake(user_id=user.id, amount=0.25, created_at=created_at),
+                ]
+            )
+        db_session.add_all(
+            [
+                Achievement(
+                    user_id=user.id, exercise_type=ExerciseType.RUNNING, milestone=10000
+                ),
+                Goal(
+                    user_id=user.id,
+                    description="Run",
+                    exercise_type=ExerciseType.RUNNING,
+                    metric="distance",
+                    target_value=100000,
+                ),
+                ScheduledExercise(
+                    user_id=user.id,
+                    exercise_type=ExerciseType.YOGA,
+                    scheduled_time=time(7, 0),
+                    day_of_week="Monday",
+                ),
+            ]
+        )
+        users.append(user)
+    db_session.commit()
+    db_session.execute(db.text("ANALYZE"))
+    return users[1]
+
+
+def query_plan(query) -> list[str]:
+    statement = query.statement.compile(
+        dialect=db.engine.dialect, compile_kwargs={"literal_binds": True}
+    )
+    rows = db.session.execute(db.text(f"EXPLAIN QUERY PLAN {statement}"))
+    return [row.detail for row in rows]
+
+
+HOT_QUERIES = {
+    "exercise_by_user": lambda u: Exercise.get_by_user(u.id),
+    "exercise_by_user_and_type": lambda u: Exercise.get_by_user(
+        u.id, type=ExerciseType.RUNNING
+    ),
+    "exercise_shared_range": lambda u: Exercise.get_by_user(
+        u.id, type=ExerciseType.RUNNING
+    ).filter(
+        Exercise.created_at >= datetime(2025, 1, 10),
+        Exercise.created_at <= datetime(2025, 1, 20),
+    ),
+    "exercise_page": lambda u: Exercise.get_by_user(u.id)
+    .order_by(None)
+    .order_by(Exercise.created_at.desc(), Exercise.id.desc())
+    .filter(db.tuple_(Exercise.created_at, Exercise.id) < (datetime(2025, 2, 1), 100)),
+    "body_measurement_by_user": lambda u: BodyMeasurement.get_by_user(u.id),
+    "latest_weight": lambda u: u.body_measurements.filter_by(
+        type=BodyMeasurementType.WEIGHT
+    ).limit(1),
+    "achievement_by_user": lambda u: Achievement.get_by_user(u.id),
+    "exercise_total": lambda u: db.session.query(ExerciseTotal.total).filter_by(
+        user_id=u.id, exercise_type=ExerciseType.RUNNING, metric="distance"
+    ),
+    "daily_summary_range": lambda u: DailySummary.get_range(
+        u.id, datetime(2025, 1, 10).date(), datetime(2025, 1, 20).date()
+    ),
+    "user_exercises": lambda u: u.exercises,
+    "user_body_measurements": lambda u: u.body_measurements,
+    "user_calorie_intakes": lambda u: u.calorie_intakes,
+    "user_water_intakes": lambda u: u.water_intakes,
+    "user_achievements": lambda u: u.achievements,
+    "user_scheduled_exercises": lambda u: u.scheduled_exercises,
+    "user_goals": lambda u: u.goals,
+    "user_daily_summaries": lambda u: u.daily_summaries,
+    "user_shares_sent": lambda u: u.shares_sent,
+    "user_shares_received": lambda u: u.shares_received,
+}
+
+
+class TestQueryPlans:
+    @pytest.mark.parametrize("name", HOT_QUERIES.keys())
+    def test_hot_query_uses_index(self, seeded_user, name):
+        """Test the hot per-user queries search an index instead of scanning"""
+        plan = query_plan(HOT_QUERIES[name](seeded_user))
+        assert not [step for step in plan if step.startswith("SCAN")], plan
+        assert not [step for step in plan if "TEMP B-TREE" in step], plan
@@ -0,0 +1,68 @@
+import pytest
+
+from server.models import Achievement, Exercise
+from server.utils.achievements import (
+    crossed_milestones,
+    award_milestones,
+    check_achievements,
+)
+from server.utils.constants import ExerciseType
+
+
+class TestAchievements:
+    @pytest.mark.parametrize(
+        "old_total,new_total,expected",
+        [
+            (0, 9999, []),
+            (0, 10000, [10000]),
+            (9000, 60000, [10000, 50000]),
+            (10000, 20000, []),
+            (0, 500000, [10000, 50000, 100000]),
+        ],
+        ids=[
+            "below_first",
+            "exactly_first",
+            "two_crossed",
+            "already_past_first",
+            "all_crossed",
+        ],
+    )
+    def test_crossed_milestones(self, old_total, new_total, expected):
+        """Test milestones between the old and new total are found"""
+        assert crossed_milestones(ExerciseType.RUNNING, old_total, new_total) == (
+            expected
+        )
+
+    def test_award_milestones_is_idempotent(self, db_session, test_user):
+        """Test awarding the same milestone twice only inserts it once"""
+        first = award_milestones(test_user.id, ExerciseType.YOGA, [100, 500])
+        db_session.commit()
+        second = award_milestones(test_user.id, ExerciseType.YOGA, [100, 500, 1000])
+        db_session.commit()
+
+        assert [a.milestone for a in first] == [100, 500]
+        assert [a.milestone for a in second] == [1000]
+        assert Achievement.get_by_user(test_user.id).count() == 3
+
+    def test_award_milestones_sorted(self, db_session, test_user):
+        """Test the inserted achievements come back by milestone"""
+        awarded = award_milestones(test_user.id, ExerciseType.YOGA, [1000, 100, 500])
+        db_session.commit()
+
+        assert [a.milestone for a in awarded] == [100, 500, 1000]
+
+    def test_check_achievements(self, db_session, test_user):
+        """Test a flushed exercise awards the milestones it crosses"""
+        for distance, expected in [(6000, []), (6000, [10000]), (1000, [])]:
+            metrics = {"distance": distance, "duration": 30}
+            db_session.add(
+                Exercise(
+                    user_id=test_user.id, type=ExerciseType.RUNNING, metrics=metrics
+                )
+            )
+            db_session.flush()
+            achievements = check_achievements(
+                test_user.id, ExerciseType.RUNNING, metrics
+            )
+            db_session.commit()
+            assert [a.milestone for a in achievements] == expected
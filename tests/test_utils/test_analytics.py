@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from server.blueprints.analytics import logic
+from server.blueprints.browse.logic import get_exercise_page
+from server.models import BodyMeasurement, Exercise
+from server.utils.constants import BodyMeasurementType, ExerciseType
+
+
+@pytest.fixture
+def exercises(db_session, test_user):
+    rows = [
+        Exercise(
+            user_id=test_user.id,
+            type=ExerciseType.RUNNING,
+            metrics={"distance": 5000, "duration": 30},
+            created_at=datetime(2025, 1, 1, 8, 0),
+        ),
+        Exercise(
+            user_id=test_user.id,
+            type=ExerciseType.RUNNING,
+            metrics={"distance": 2500, "duration": 15},
+            created_at=datetime(2025, 1, 2, 8, 0),
+        ),
+        Exercise(
+            user_id=test_user.id,
+            type=ExerciseType.WEIGHTLIFTING,
+            metrics={"weight": 50, "sets": 3, "reps": 10},
+            created_at=datetime(2025, 1, 2, 9, 0),
+        ),
+    ]
+    db_session.add_all(rows)
+    db_session.commit()
+    return rows
+
+
+class TestAnalytics:
+    def test_type_distribution(self, exercises, logged_in):
+        """Test exercises are totalled per type, with distances in km"""
+        summary = logic.get_exercise_summary()
+        by_type = {row["type"]: row for row in summary["type_distribution"]}
+        assert by_type["RUNNING"]["count"] == 2
+        assert by_type["RUNNING"]["distance"] == 7.5
+        assert by_type["RUNNING"]["duration"] == 45
+        assert by_type["WEIGHTLIFTING"]["total_weight"] == 50
+        assert by_type["WEIGHTLIFTING"]["sets"] == 3
+        # Newest first, as the charts listed them
+        assert list(by_type) == ["WEIGHTLIFTING", "RUNNING"]
+
+    def test_daily_stats_date_range(self, exercises, logged_in):
+        """Test the daily stats only cover the requested days"""
+        day = datetime(2025, 1, 2).date()
+        summary = logic.get_exercise_summary(start_date=day, end_date=day)
+        assert summary["daily_stats"] == [
+            {"date": "2025-01-02", "count": 2, "duration": 15}
+        ]
+
+    def test_strength_volume(self, exercises, db_session, logged_in):
+        """Test the strength volume has each weightlifting session, newest first"""
+        db_session.add(
+            Exercise(
+                user_id=logged_in.id,
+                type=ExerciseType.WEIGHTLIFTING,
+                metrics={"weight": 60, "sets": 2, "reps": 5},
+                created_at=datetime(2025, 1, 2, 18, 0),
+            )
+        )
+        db_session.commit()
+        volume = logic.get_exercise_summary()["strength_volume"]
+        assert [(row["date"], row["volume"], row["weight"]) for row in volume] == [
+            ("2025-01-02", 2 * 5 * 60, 60),
+            ("2025-01-02", 3 * 10 * 50, 50),
+        ]
+
+    def test_exercise_daily(self, db_session, logged_in):
+        """Test the metrics of a type are totalled per day, with the heaviest weight"""
+        today = datetime.now(timezone.utc).replace(tzinfo=None)
+        db_session.add_all(
+            Exercise(
+                user_id=logged_in.id,
+                type=exercise_type,
+                metrics=metrics,
+                created_at=today - timedelta(days=days, minutes=1),
+            )
+            for exercise_type, metrics, days in [
+                (ExerciseType.WEIGHTLIFTING, {"weight": 50, "sets": 3, "reps": 10}, 0),
+                (ExerciseType.WEIGHTLIFTING, {"weight": 60, "sets": 2, "reps": 5}, 0),
+                (ExerciseType.WEIGHTLIFTING, {"weight": 40, "sets": 1, "reps": 5}, 1),
+                (ExerciseType.RUNNING, {"distance": 5000, "duration": 30}, 0),
+                (ExerciseType.WEIGHTLIFTING, {"weight": 99, "sets": 1, "reps": 1}, 9),
+            ]
+        )
+        db_session.commit()
+
+        daily = logic.get_exercise_daily("WEIGHTLIFTING", 7)
+        assert list(daily.values()) == [
+            {"weight": 40, "sets": 1, "reps": 5},
+            {"weight": 60, "sets": 5, "reps": 15},
+        ]
+        with pytest.raises(ValueError):
+            logic.get_exercise_daily("DANCING", 7)
+
+    def test_body_measurement_trend(self, db_session, logged_in):
+        """Test the trend of another measurement type than weight"""
+        today = datetime.now(timezone.utc).replace(tzinfo=None)
+        db_session.add_all(
+            BodyMeasurement(
+                user_id=logged_in.id,
+                type=measurement_type,
+                value=value,
+                created_at=today - timedelta(minutes=1),
+            )
+            for measurement_type, value in [
+                (BodyMeasurementType.HEIGHT, 180),
+                (BodyMeasurementType.WEIGHT, 70),
+            ]
+        )
+        db_session.commit()
+
+        trend = logic.get_body_measurement_trend("HEIGHT", 3)
+        assert list(trend.values()) == [None, None, 180]
+        with pytest.raises(ValueError):
+            logic.get_body_measurement_trend(None, 3)
+
+    def test_weight_trend(self, db_session, logged_in):
+        """Test the weight trend has every day, with the latest value of each"""
+        today = datetime.now(timezone.utc).replace(tzinfo=None)
+        db_session.add_all(
+            BodyMeasurement(
+                user_id=logged_in.id,
+                type=BodyMeasurementType.WEIGHT,
+                value=value,
+                created_at=today - timedelta(minutes=minutes),
+            )
+            for value, minutes in [(70, 2), (71, 1)]
+        )
+        db_session.commit()
+
+        trend = logic.get_weight_trend(7)
+        assert len(trend) == 7
+        assert trend[str(today.date())] == 71
+        assert list(trend.values())[:-1] == [None] * 6
+
+    def test_page_type_filter(self, exercises, logged_in):
+        """Test record pages filter by type and reject unknown types"""
+        page = get_exercise_page(type="RUNNING")
+        assert {e.type for e in page["items"]} == {ExerciseType.RUNNING}
+        with pytest.raises(ValueError):
+            get_exercise_page(type="JUGGLING")
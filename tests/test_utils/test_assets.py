@@ -0,0 +1,71 @@
+import gzip
+
+import brotli
+import pytest
+from flask import Flask, url_for
+
+from server.utils.assets import Assets, build_assets
+
+SCRIPT = b"function hello() { return 'hello'; }\n" * 50
+
+
+@pytest.fixture
+def static_app(tmp_path):
+    (tmp_path / "js").mkdir()
+    (tmp_path / "js" / "app.js").write_bytes(SCRIPT)
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG not really")
+    app = Flask(__name__, static_folder=str(tmp_path), static_url_path="/static")
+    app.config.update(ASSET_FINGERPRINTS=True, ASSET_MAX_AGE=3600)
+    Assets().init_app(app)
+    return app
+
+
+class TestAssets:
+    def test_hashed_urls(self, app):
+        """Test url_for returns content hashed names of the static files"""
+        with app.test_request_context():
+            url = url_for("static", filename="js/base.js")
+            assert url.startswith("/static/js/base.") and url != "/static/js/base.js"
+            assert url_for("static", filename="missing.js") == "/static/missing.js"
+
+    def test_immutable(self, static_app):
+        """Test hashed names are served immutable, plain names as before"""
+        with static_app.test_request_context():
+            url = url_for("static", filename="js/app.js")
+        client = static_app.test_client()
+        response = client.get(url, headers={"Accept-Encoding": "identity"})
+        assert response.data == SCRIPT
+        assert response.cache_control.immutable
+        assert response.cache_control.max_age == 3600
+        assert "Accept-Encoding" in response.vary
+
+        response = client.get("/static/js/app.js")
+        assert response.data == SCRIPT
+        assert not response.cache_control.immutable
+
+    def test_precompressed(self, static_app):
+        """Test built variants are served to clients accepting them"""
+        assert build_assets(static_app.static_folder) == 2
+        assert build_assets(static_app.static_folder) == 0  # Up to date
+        with static_app.test_request_context():
+            url = url_for("static", filename="js/app.js")
+        client = static_app.test_client()
+
+        response = client.get(url, headers={"Accept-Encoding": "gzip, br"})
+        assert response.headers["Content-Encoding"] == "br"
+        assert response.mimetype == "text/javascript"
+        assert brotli.decompress(response.data) == SCRIPT
+
+        response = client.get(url, headers={"Accept-Encoding": "gzip, br;q=0"})
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert gzip.decompress(response.data) == SCRIPT
+
+    def test_build_prunes_outdated(self, static_app, tmp_path):
+        """Test variants of changed files are replaced"""
+        build_assets(static_app.static_folder)
+        (tmp_path / "js" / "app.js").write_bytes(SCRIPT * 2)
+        assert build_assets(static_app.static_folder) == 2
+        variants = sorted(p.name for p in (tmp_path / "build" / "js").iterdir())
+        assert len(variants) == 2
+        # Not compressible
+        assert not list((tmp_path / "build").glob("*.png*"))
@@ -0,0 +1,104 @@
+import io
+import os
+
+import pytest
+from flask import g
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+
+from server.blueprints.user import logic
+from server.utils.avatars import avatar_url, variant_name
+
+
+def image_file(size=(1200, 800), color="red", format="JPEG") -> FileStorage:
+    data = io.BytesIO()
+    Image.new("RGB", size, color).save(data, format)
+    data.seek(0)
+    return FileStorage(data, filename=f"photo.{format.lower()}")
+
+
+@pytest.fixture
+def folder(app, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, "AVATAR_FOLDER", str(tmp_path))
+    return tmp_path
+
+
+class TestAvatars:
+    def test_variants(self, app, logged_in, folder):
+        """Test an upload is stored as square WebP variants, named by content"""
+        logic.update_avatar(image_file())
+        key = logged_in.avatar
+        assert len(key) == 32
+        for size in app.config["AVATAR_SIZES"]:
+            with Image.open(folder / variant_name(key, size)) as variant:
+                assert variant.format == "WEBP"
+                assert variant.size == (size, size)
+        # Nothing but the variants is left behind
+        assert len(os.listdir(folder)) == len(app.config["AVATAR_SIZES"])
+
+    def test_duplicate_upload(self, app, logged_in, test_receiver, folder):
+        """Test an image uploaded twice is stored once, and kept while in use"""
+        logic.update_avatar(image_file())
+        key = logged_in.avatar
+        test_receiver.avatar = key
+        logic.update_avatar(image_file(color="blue"))
+        assert logged_in.avatar != key
+        assert (folder / variant_name(key, 96)).exists()  # Still the receiver's
+
+        files = sorted(os.listdir(folder))
+        g._login_user = test_receiver
+        logic.update_avatar(image_file(color="blue"))
+        assert test_receiver.avatar == logged_in.avatar
+        # The blue variants were reused, the red ones are unused and deleted
+        assert not (folder / variant_name(key, 96)).exists()
+        assert len(os.listdir(folder)) < len(files)
+
+    def test_reused_variants_deleted(self, app, logged_in, folder, monkeypatch):
+        """Test variants deleted by another request meanwhile are rendered again"""
+        store_avatar = logic.store_avatar
+
+        def store_then_delete(stream):
+            key = store_avatar(stream)
+            # Another user switching away from the same image meanwhile
+            logic.remove_unused_avatar(key)
+            return key
+
+        monkeypatch.setattr(logic, "store_avatar", store_then_delete)
+        logic.update_avatar(image_file())
+        for size in app.config["AVATAR_SIZES"]:
+            assert (folder / variant_name(logged_in.avatar, size)).exists()
+
+    @pytest.mark.parametrize(
+        "config, upload",
+        [
+            ({}, FileStorage(io.BytesIO(b"not an image"), filename="a.png")),
+            ({"AVATAR_MAX_BYTES": 100}, None),
+            ({"AVATAR_MAX_PIXELS": 100}, None),
+        ],
+    )
+    def test_rejected(self, app, logged_in, folder, monkeypatch, config, upload):
+        """Test non images, large files and large images are refused"""
+        for name, value in config.items():
+            monkeypatch.setitem(app.config, name, value)
+        with pytest.raises(ValueError):
+            logic.update_avatar(upload or image_file())
+        assert logged_in.avatar is None
+        assert os.listdir(folder) == []
+
+    def test_served_immutable(self, app, logged_in, folder):
+        """Test the variants are served with far future cache headers"""
+        logic.update_avatar(image_file())
+        url = avatar_url(logged_in.avatar, 100)
+        assert url.endswith("-256.webp")
+        response = app.test_client().get(url)
+        assert response.status_code == 200
+        assert response.mimetype == "image/webp"
+        cache_control = response.cache_control
+        assert cache_control.immutable and cache_control.public
+        assert cache_control.max_age == app.config["AVATAR_MAX_AGE"]
+
+    def test_legacy_avatar_url(self, app):
+        """Test avatars uploaded before the variants are still served as is"""
+        with app.test_request_context():
+            assert avatar_url("avatars/old.png") == "/static/avatars/old.png"
+            assert avatar_url(None) is None
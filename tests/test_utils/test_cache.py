@@ -0,0 +1,93 @@
+import pytest
+
+from server.blueprints.user import logic
+from server.utils.cache import CACHE_HITS, LRUCache
+from server.utils.login_manager import CachedUser, user_cache
+
+
+@pytest.fixture
+def cache(clock):
+    cache = LRUCache("test", maxsize=2, ttl=10)
+    cache.clock = clock
+    return cache
+
+
+@pytest.fixture
+def enabled_user_cache(app):
+    user_cache.configure(16, 60)
+    yield user_cache
+    user_cache.configure(app.config["USER_CACHE_SIZE"], app.config["USER_CACHE_TTL"])
+
+
+class TestLRUCache:
+    def test_eviction(self, cache):
+        """Test the least recently used entry is evicted first"""
+        cache.set("a", 1)
+        cache.set("b", 2)
+        assert cache.get("a") == 1  # "b" is now the least recently used
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert len(cache) == 2
+
+    def test_ttl(self, cache):
+        """Test entries expire after their time to live"""
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=30)
+        cache.clock.now += 10
+        assert cache.get("a", "missing") == "missing"
+        assert cache.get("b") == 2
+        assert len(cache) == 1
+
+    def test_counters(self, cache):
+        """Test hits and misses are counted, also on /metrics"""
+        hits = CACHE_HITS.value(cache="test") or 0
+        cache.set("a", 1)
+        cache.get("a")
+        cache.get("b")
+        assert (cache.hits, cache.misses) == (1, 1)
+        assert CACHE_HITS.value(cache="test") == hits + 1
+
+    def test_disabled(self, cache):
+        """Test a cache of size 0 keeps nothing"""
+        cache.configure(0)
+        cache.set("a", 1)
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+
+class TestCachedUser:
+    def test_fields_without_row(self, app, test_user):
+        """Test the cached fields are read without loading the user"""
+        with app.app_context():
+            user = CachedUser(CachedUser.fields_of(test_user))
+            assert user.get_id() == str(test_user.id)
+            assert user.nickname == "Tester"
+            assert user.is_authenticated
+            assert user._user is None
+
+    def test_other_attributes_load_row(self, test_user, db_session):
+        """Test other attributes and writes go to the user row"""
+        user = CachedUser(CachedUser.fields_of(test_user))
+        assert user.password == test_user.password
+        assert user.get_user() is test_user
+
+        user.nickname = "Renamed"
+        assert user.nickname == "Renamed"
+        db_session.commit()
+        db_session.refresh(test_user)
+        assert test_user.nickname == "Renamed"
+
+    def test_loader_cache(self, app, test_user, enabled_user_cache):
+        """Test the user loader caches identities until the user is updated"""
+        with app.app_context(), app.test_request_context():
+            user = logic.get_user_by_id(str(test_user.id))
+            assert user.nickname == "Tester"
+            hits = enabled_user_cache.hits
+            assert logic.get_user_by_id(str(test_user.id)).nickname == "Tester"
+            assert enabled_user_cache.hits == hits + 1
+
+            logic.update_user(nickname="Renamed", user=user)
+            assert logic.get_user_by_id(str(test_user.id)).nickname == "Renamed"
+            assert logic.get_user_by_id("999") is None
@@ -0,0 +1,90 @@
+import gzip
+
+import brotli
+import pytest
+from flask import Response
+from werkzeug.datastructures import Accept
+from werkzeug.http import parse_accept_header
+
+from server.utils.compression import (
+    COMPRESSION_BYTES,
+    choose_encoding,
+    compress_response,
+)
+
+PAGE = "<p>" + "x" * 4000 + "</p>"
+
+
+def compress(app, response, accept_encoding="gzip, br"):
+    with app.test_request_context(headers={"Accept-Encoding": accept_encoding}):
+        return compress_response(response)
+
+
+class TestCompression:
+    def test_page(self, app):
+        """Test pages are compressed with the encoding the client prefers"""
+        client = app.test_client()
+        plain = client.get("/", headers={"Accept-Encoding": "identity"})
+        assert "Content-Encoding" not in plain.headers
+        assert "Accept-Encoding" in plain.vary
+
+        response = client.get("/", headers={"Accept-Encoding": "gzip, deflate, br"})
+        assert response.headers["Content-Encoding"] == "br"
+        assert brotli.decompress(response.data) == plain.data
+        assert response.headers["Server-Timing"].startswith("compress;dur=")
+
+        response = client.get("/", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert gzip.decompress(response.data) == plain.data
+
+    def test_metrics(self, app):
+        """Test the sizes before and after compression are recorded"""
+        before = COMPRESSION_BYTES.value(encoding="gzip", stage="in") or 0
+        response = compress(app, Response(PAGE, mimetype="text/html"), "gzip")
+        assert COMPRESSION_BYTES.value(encoding="gzip", stage="in") == before + len(
+            PAGE
+        )
+        assert f'desc="gzip {len(PAGE)}>{len(response.data)}"' in (
+            response.headers["Server-Timing"]
+        )
+
+    @pytest.mark.parametrize(
+        "response",
+        [
+            Response("<p>small</p>", mimetype="text/html"),
+            Response(PAGE, mimetype="image/png"),
+            Response(PAGE, mimetype="text/html", status=206),
+            Response(PAGE, mimetype="text/html", headers={"Content-Encoding": "br"}),
+            Response(
+                PAGE, mimetype="text/html", headers={"Cache-Control": "no-transform"}
+            ),
+        ],
+        ids=["small", "image", "partial", "encoded", "no-transform"],
+    )
+    def test_skipped(self, app, response):
+        """Test small, binary, partial and already encoded responses are left alone"""
+        data = response.get_data()
+        response = compress(app, response)
+        assert response.get_data() == data
+        assert "Server-Timing" not in response.headers
+
+    def test_strong_etag(self, app):
+        """Test a strong ETag changes with the encoding"""
+        response = Response(PAGE, mimetype="text/html")
+        response.set_etag("abc")
+        assert compress(app, response, "br").get_etag() == ("abc-br", False)
+
+    @pytest.mark.parametrize(
+        "header, encoding",
+        [
+            ("gzip, br", "br"),
+            ("gzip, br;q=0.5", "gzip"),
+            ("*", "br"),
+            ("identity", None),
+            ("br;q=0, gzip;q=0", None),
+        ],
+    )
+    def test_choose_encoding(self, header, encoding):
+        """Test the negotiation follows the client's preferences"""
+        accept = parse_accept_header(header, Accept)
+        assert choose_encoding(accept) == encoding
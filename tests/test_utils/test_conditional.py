@@ -0,0 +1,97 @@
+import datetime
+
+from server.blueprints.browse import logic as browse_logic
+from server.blueprints.dashboard import logic as dashboard_logic
+from server.blueprints.share import logic as share_logic
+from server.models import CalorieIntake, User, db
+from server.utils.constants import BodyMeasurementType
+
+SCOPE = {"body_measurement_types": ["WEIGHT"]}
+
+
+def data_version(user) -> int:
+    return db.session.query(User.data_version).filter_by(id=user.id).scalar()
+
+
+def add_weight(value=70):
+    browse_logic.add_body_measurement_data(
+        BodyMeasurementType.WEIGHT, value, datetime.datetime(2026, 10, 1)
+    )
+
+
+class TestDataVersion:
+    def test_writes_bump(self, logged_in):
+        """Test every write of a user's data bumps their version"""
+        version = data_version(logged_in)
+        add_weight()
+        assert data_version(logged_in) == version + 1
+        dashboard_logic.add_water_intake(0.5)
+        dashboard_logic.delete_latest_water_intake()
+        assert data_version(logged_in) == version + 3
+
+    def test_share_bumps_both(self, logged_in, test_receiver):
+        """Test a share bumps the version of its sender and receiver"""
+        receiver_version = data_version(test_receiver)
+        share = share_logic.create_share(
+            logged_in.id,
+            test_receiver.id,
+            SCOPE,
+            datetime.datetime(2026, 1, 1),
+            datetime.datetime(2026, 12, 31),
+        )
+        assert data_version(test_receiver) == receiver_version + 1
+        version = share_logic.get_share_version(share.id)
+        assert version == data_version(logged_in)
+
+        share_logic.delete_share(share.id)
+        assert share_logic.get_share_version(share.id) is None
+
+
+class TestConditionalGet:
+    def test_not_modified(self, login_client, monkeypatch):
+        """Test revisits are answered with 304 without running the view"""
+        login_client.get("/dashboard/")  # Shows the login message
+        response = login_client.get("/dashboard/")
+        etag, weak = response.get_etag()
+        assert response.status_code == 200 and weak
+        assert response.cache_control.no_cache and response.cache_control.private
+
+        def fail(*args, **kwargs):
+            raise AssertionError("The dashboard was rendered")
+
+        monkeypatch.setattr(dashboard_logic, "get_bmi", fail)
+        response = login_client.get(
+            "/dashboard/", headers={"If-None-Match": f'W/"{etag}"'}
+        )
+        assert response.status_code == 304
+        assert response.get_etag() == (etag, True)
+
+    def test_write_changes_etag(self, login_client, test_user):
+        """Test a write makes the next visit render the page again"""
+        login_client.get("/dashboard/")
+        etag, _ = login_client.get("/browse/exercise/data").get_etag()
+        db.session.add(CalorieIntake(user_id=test_user.id, calories=500))
+        db.session.commit()
+        response = login_client.get(
+            "/browse/exercise/data", headers={"If-None-Match": f'W/"{etag}"'}
+        )
+        assert response.status_code == 200
+        assert response.get_etag()[0] != etag
+
+    def test_flashes_not_reused(self, login_client):
+        """Test pages showing flashed messages get no ETag"""
+        response = login_client.get("/dashboard/")
+        assert b"Login successful!" in response.data
+        assert response.get_etag() == (None, None)
+        assert login_client.get("/dashboard/").get_etag()[1]
+
+    def test_window(self, app, login_client, monkeypatch):
+        """Test pages are not reused after ETAG_WINDOW, as their tokens expire"""
+        login_client.get("/dashboard/")
+        etag, _ = login_client.get("/browse/").get_etag()
+        assert etag
+        monkeypatch.setitem(app.config, "ETAG_WINDOW", 1e-6)
+        response = login_client.get(
+            "/browse/", headers={"If-None-Match": f'W/"{etag}"'}
+        )
+        assert response.status_code == 200
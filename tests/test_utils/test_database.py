@@ -0,0 +1,53 @@
+import pytest
+from sqlalchemy import create_mock_engine
+
+from server.models import db, Exercise, Share
+from server.utils.database import resolve_database_url
+
+
+def create_statements(url: str) -> list[str]:
+    """Returns the DDL create_all emits for the exercise and share tables."""
+    statements = []
+    engine = create_mock_engine(
+        url, lambda sql, *_, **__: statements.append(str(sql.compile(engine)))
+    )
+    db.metadata.create_all(
+        engine, tables=[Exercise.__table__, Share.__table__], checkfirst=False
+    )
+    return statements
+
+
+class TestDatabaseDialects:
+    def test_postgresql_schema(self):
+        """Test PostgreSQL stores JSONB, generated metric columns and GIN indexes"""
+        ddl = "\n".join(create_statements("postgresql+psycopg://"))
+
+        assert "metrics JSONB NOT NULL" in ddl
+        assert "scope JSONB NOT NULL" in ddl
+        assert (
+            "GENERATED ALWAYS AS (((metrics ->> 'distance')::double precision)) STORED"
+            in ddl
+        )
+        assert "USING gin (metrics jsonb_path_ops)" in ddl
+        assert "USING gin (scope)" in ddl
+
+    def test_sqlite_schema(self):
+        """Test SQLite keeps JSON columns and skips the GIN indexes"""
+        ddl = "\n".join(create_statements("sqlite://"))
+
+        assert "metrics JSON NOT NULL" in ddl
+        assert "GENERATED ALWAYS AS (json_extract(metrics, '$.distance'))" in ddl
+        assert "gin" not in ddl.lower()
+
+    @pytest.mark.parametrize(
+        "url,expected",
+        [
+            ("postgres://u:p@host/db", "postgresql+psycopg://u:p@host/db"),
+            ("postgresql://u:p@host/db", "postgresql+psycopg://u:p@host/db"),
+            ("postgresql+psycopg://host/db", "postgresql+psycopg://host/db"),
+            ("sqlite:///db.sqlite", "sqlite:///db.sqlite"),
+        ],
+    )
+    def test_resolve_database_url(self, url, expected):
+        """Test PostgreSQL URLs are mapped to the psycopg 3 driver"""
+        assert resolve_database_url(url) == expected
@@ -0,0 +1,176 @@
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from server.utils.constants import ExerciseType
+from server.utils.exercise_stats import METRICS, summarise_exercises
+
+# Seconds allowed to summarise BENCHMARK_SESSIONS sessions, only checked
+# with RUN_BENCHMARKS set as it depends on the machine
+BENCHMARK_SESSIONS = 100_000
+LATENCY_BUDGET = 1.0
+
+
+def make_rows(count: int, seed: int = 0) -> list[tuple]:
+    """Random exercise rows, newest first as the charts are given them."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    rows = []
+    for _ in range(count):
+        exercise_type = rng.choice(list(ExerciseType))
+        created_at = start + timedelta(minutes=rng.randrange(60 * 24 * 365))
+        if exercise_type == ExerciseType.WEIGHTLIFTING:
+            metrics = (None, None, rng.randint(5, 100), rng.randint(1, 5), 10)
+        else:
+            metrics = (rng.randint(0, 20000), rng.randint(5, 90), None, None, None)
+        rows.append((exercise_type, created_at, *metrics))
+    return sorted(rows, key=lambda row: row[1], reverse=True)
+
+
+def process_exercise_data(exercises: list[dict]) -> dict:
+    """Port of processExerciseData, which computed the statistics in the browser."""
+    type_stats = {}
+    daily_stats = {}
+    strength_data = []
+
+    for ex in exercises:
+        date = ex["created_at"].date().isoformat()
+        type = ex["type"]
+
+        # Statistics by exercise type
+        if type not in type_stats:
+            type_stats[type] = {
+                "distance": 0,
+                "duration": 0,
+                "totalWeight": 0,
+                "sets": 0,
+                "reps": 0,
+            }
+
+        # General metrics processing
+        if ex["metrics"].get("distance"):
+            type_stats[type]["distance"] += ex["metrics"]["distance"] / 1000
+        if ex["metrics"].get("duration"):
+            type_stats[type]["duration"] += ex["metrics"]["duration"]
+
+        # Strength training specific statistics
+        if type == "WEIGHTLIFTING":
+            volume = (
+                ex["metrics"]["sets"] * ex["metrics"]["reps"] * ex["metrics"]["weight"]
+            )
+            strength_data.append(
+                {
+                    "date": date,
+                    "volume": volume,
+                    "weight": ex["metrics"]["weight"],
+                    "sets": ex["metrics"]["sets"],
+                    "reps": ex["metrics"]["reps"],
+                }
+            )
+            type_stats[type]["totalWeight"] += ex["metrics"]["weight"]
+            type_stats[type]["sets"] += ex["metrics"]["sets"]
+            type_stats[type]["reps"] += ex["metrics"]["reps"]
+
+        # Daily activity statistics
+        if date not in daily_stats:
+            daily_stats[date] = {"count": 0, "duration": 0}
+        daily_stats[date]["count"] += 1
+        daily_stats[date]["duration"] += ex["metrics"].get("duration") or 0
+
+    return {
+        "typeStats": [{"type": t, **metrics} for t, metrics in type_stats.items()],
+        "dailyStats": [{"date": d, **stats} for d, stats in daily_stats.items()],
+        "strengthData": strength_data,
+    }
+
+
+def as_exercises(rows: list[tuple]) -> list[dict]:
+    """The rows as the JSON the charts were given before, without null metrics."""
+    return [
+        {
+            "type": exercise_type.name,
+            "created_at": created_at,
+            "metrics": {
+                name: value for name, value in zip(METRICS, values) if value is not None
+            },
+        }
+        for exercise_type, created_at, *values in rows
+    ]
+
+
+def as_chart_data(summary: dict) -> dict:
+    """The summary as analytic.exercise.js loads it for the charts."""
+    return {
+        "typeStats": [
+            {
+                "type": stats["type"],
+                "distance": stats["distance"],
+                "duration": stats["duration"],
+                "totalWeight": stats["total_weight"],
+                "sets": stats["sets"],
+                "reps": stats["reps"],
+            }
+            for stats in summary["type_distribution"]
+        ],
+        "dailyStats": summary["daily_stats"],
+        "strengthData": summary["strength_volume"],
+    }
+
+
+class TestExerciseStats:
+    def test_empty(self):
+        """Test no exercises give empty statistics"""
+        assert summarise_exercises([]) == {
+            "type_distribution": [],
+            "daily_stats": [],
+            "strength_volume": [],
+        }
+
+    def test_matches_reference(self):
+        """Test the statistics match those the charts computed in the browser"""
+        rows = make_rows(2000)
+        chart_data = as_chart_data(summarise_exercises(rows))
+        expected = process_exercise_data(as_exercises(rows))
+        # The daily trend chart sorts the days itself
+        expected["dailyStats"].sort(key=lambda day: day["date"])
+        for name, stats in expected.items():
+            assert len(chart_data[name]) == len(stats)
+            for row, expected_row in zip(chart_data[name], stats):
+                assert row == pytest.approx(expected_row)
+
+    def test_days_are_utc_dates(self):
+        """Test exercises are grouped by the date of their creation time"""
+        rows = [
+            (ExerciseType.YOGA, created_at, None, duration, None, None, None)
+            for created_at, duration in [
+                (datetime(2025, 1, 1, 0, 0), 20),
+                (datetime(2025, 1, 1, 23, 59), 30),
+                (datetime(2025, 1, 2, 0, 0), 40),
+            ]
+        ]
+        assert summarise_exercises(rows)["daily_stats"] == [
+            {"date": "2025-01-01", "count": 2, "duration": 50.0},
+            {"date": "2025-01-02", "count": 1, "duration": 40.0},
+        ]
+
+    def test_json_serialisable(self):
+        """Test the statistics only hold plain types, so they can be cached"""
+        summary = summarise_exercises(make_rows(100))
+        assert json.loads(json.dumps(summary)) == summary
+
+    @pytest.mark.skipif(
+        not os.getenv("RUN_BENCHMARKS"), reason="RUN_BENCHMARKS is not set"
+    )
+    def test_benchmark(self):
+        """Test 100k sessions are summarised within the latency budget"""
+        rows = make_rows(BENCHMARK_SESSIONS)
+        started = time.perf_counter()
+        summary = summarise_exercises(rows)
+        elapsed = time.perf_counter() - started
+
+        assert sum(t["count"] for t in summary["type_distribution"]) == len(rows)
+        assert elapsed < LATENCY_BUDGET, f"{elapsed:.3f}s for {len(rows)} sessions"
@@ -0,0 +1,87 @@
+import pytest
+from flask import g, render_template_string
+
+from server.blueprints.dashboard import logic
+from server.models import Achievement
+from server.utils.cache import CACHE_EVICTIONS, CACHE_HITS
+from server.utils.constants import ExerciseType
+from server.utils.fragments import fragment_cache
+
+TEMPLATE = '{% cache "panel", version %}<b>{{ render() }}</b>{% endcache %}'
+
+
+@pytest.fixture
+def enabled_fragment_cache(app):
+    fragment_cache.configure(2, 60)
+    yield fragment_cache
+    fragment_cache.configure(
+        app.config["FRAGMENT_CACHE_SIZE"], app.config["FRAGMENT_CACHE_TTL"]
+    )
+
+
+@pytest.fixture
+def render(logged_in, enabled_fragment_cache):
+    calls = []
+
+    def render(version, user=logged_in):
+        g._login_user = user
+        return render_template_string(
+            TEMPLATE, version=version, render=lambda: calls.append(1) or "x"
+        )
+
+    render.calls = calls
+    return render
+
+
+class TestFragmentCache:
+    def test_reused(self, render):
+        """Test a fragment is rendered once per version, without escaping"""
+        hits = CACHE_HITS.value(cache="fragment_panel") or 0
+        assert render(1) == "<b>x</b>"
+        assert render(1) == "<b>x</b>"
+        assert len(render.calls) == 1
+        assert CACHE_HITS.value(cache="fragment_panel") == hits + 1
+        render(2)
+        assert len(render.calls) == 2
+
+    def test_per_user(self, render, test_receiver):
+        """Test users never get each other's fragments"""
+        render(1)
+        render(1, user=test_receiver)
+        assert len(render.calls) == 2
+
+    def test_evictions(self, render):
+        """Test the least recently used versions are evicted, and counted"""
+        evictions = CACHE_EVICTIONS.value(cache="fragment_panel") or 0
+        for version in (1, 2, 3):
+            render(version)
+        assert CACHE_EVICTIONS.value(cache="fragment_panel") == evictions + 1
+        render(1)
+        assert len(render.calls) == 4
+
+    def test_dashboard(
+        self, login_client, enabled_fragment_cache, test_user, db_session, monkeypatch
+    ):
+        """Test the dashboard panels come from the cache until their data changes"""
+        loads = []
+        get_achievements_by_type = logic.get_achievements_by_type
+        monkeypatch.setattr(
+            logic,
+            "get_achievements_by_type",
+            lambda: loads.append(1) or get_achievements_by_type(),
+        )
+        login_client.get("/dashboard/")
+        page = login_client.get("/dashboard/").data
+        assert b"achievements-list" in page
+        assert len(loads) == 1
+
+        db_session.add(
+            Achievement(
+                user_id=test_user.id,
+                exercise_type=ExerciseType.RUNNING,
+                milestone=10000,
+            )
+        )
+        db_session.commit()
+        assert login_client.get("/dashboard/").data != page
+        assert len(loads) == 2
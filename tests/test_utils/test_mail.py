@@ -0,0 +1,143 @@
+import datetime
+import socket
+
+import pytest
+
+from server.blueprints.user import logic
+from server.models import db, MailOutbox, utcnow
+from server.utils.mail import deliver_outbox, mail, queue_mail, retry_delay
+
+controller = pytest.importorskip("aiosmtpd.controller")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Handler:
+    """Accepts every message, except for recipients starting with "refused"."""
+
+    def __init__(self):
+        self.messages = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("refused"):
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((session.peer, envelope.rcpt_tos, envelope.content))
+        return "250 OK"
+
+
+@pytest.fixture
+def smtp_config(app, monkeypatch):
+    state = app.extensions["mail"]
+    monkeypatch.setattr(state, "server", "127.0.0.1")
+    monkeypatch.setattr(state, "port", free_port())
+    monkeypatch.setattr(state, "use_tls", False)
+    monkeypatch.setattr(state, "username", None)
+    monkeypatch.setattr(state, "suppress", False)
+    return state
+
+
+@pytest.fixture
+def smtp_server(smtp_config):
+    handler = Handler()
+    server = controller.Controller(
+        handler, hostname=smtp_config.server, port=smtp_config.port
+    )
+    server.start()
+    yield handler
+    server.stop()
+
+
+def queue(*recipients):
+    for recipient in recipients:
+        queue_mail("Hello", [recipient], "Body", sender="app@example.com")
+    db.session.commit()
+
+
+class TestMailOutbox:
+    def test_reset_email_is_queued(self, app, test_user, db_session, monkeypatch):
+        """Test the reset email is queued instead of sent by the request"""
+        monkeypatch.setitem(app.config, "SECRET_KEY", "test")
+        monkeypatch.setitem(app.config, "EMAIL_VERIFY_SALT", "salt")
+        monkeypatch.setitem(app.config, "MAIL_USERNAME", "app@example.com")
+        with app.test_request_context(), mail.record_messages() as sent:
+            logic.send_reset_email(test_user.email)
+        assert sent == []
+        (message,) = db_session.query(MailOutbox).all()
+        assert message.recipients == [test_user.email]
+        assert message.status == MailOutbox.PENDING
+        assert "/user/password/reset/" in message.body
+
+    def test_missing_sender(self, app, db_session, monkeypatch):
+        """Test a message without any sender is not queued"""
+        monkeypatch.setitem(app.config, "MAIL_DEFAULT_SENDER", None)
+        with pytest.raises(ValueError):
+            queue_mail("Hello", ["a@example.com"], "Body")
+        assert db_session.query(MailOutbox).count() == 0
+
+    def test_batch(self, smtp_server, db_session):
+        """Test due messages are sent over a single connection"""
+        queue("a@example.com", "b@example.com", "c@example.com")
+        assert deliver_outbox() == {"sent": 3, "failed": 0}
+        assert len({peer for peer, _, _ in smtp_server.messages}) == 1
+        assert [rcpt for _, rcpt, _ in smtp_server.messages] == [
+            ["a@example.com"],
+            ["b@example.com"],
+            ["c@example.com"],
+        ]
+        statuses = {m.status for m in db_session.query(MailOutbox)}
+        assert statuses == {MailOutbox.SENT}
+        assert deliver_outbox() == {"sent": 0, "failed": 0}
+
+    def test_refused_message_is_retried(self, app, smtp_server, db_session):
+        """Test a refused message backs off without holding up the batch"""
+        queue("refused@example.com", "b@example.com")
+        now = utcnow()
+        assert deliver_outbox(now) == {"sent": 1, "failed": 1}
+
+        refused = db_session.query(MailOutbox).filter_by(status="pending").one()
+        assert refused.attempts == 1
+        assert "550" in refused.last_error
+        delay = app.config["MAIL_OUTBOX_RETRY_DELAY"]
+        assert refused.next_attempt_at == now + datetime.timedelta(seconds=delay)
+        # Not due before the backoff
+        assert deliver_outbox(now) == {"sent": 0, "failed": 0}
+
+    def test_unexpected_error(self, app, smtp_server, db_session):
+        """Test a message that cannot be sent is retried without stopping the batch"""
+        # Queued before senders were required, Flask-Mail asserts on it
+        db_session.add(
+            MailOutbox(recipients=["a@example.com"], subject="Hello", body="Body")
+        )
+        db_session.commit()
+        queue("b@example.com")
+        assert deliver_outbox() == {"sent": 1, "failed": 1}
+
+        broken = db_session.query(MailOutbox).filter_by(status="pending").one()
+        assert broken.recipients == ["a@example.com"]
+        assert broken.attempts == 1
+        assert broken.last_error.startswith("AssertionError")
+        assert [rcpt for _, rcpt, _ in smtp_server.messages] == [["b@example.com"]]
+
+    def test_connection_failure(self, app, smtp_config, db_session, monkeypatch):
+        """Test the whole batch is retried when the server is down, then given up"""
+        monkeypatch.setitem(app.config, "MAIL_OUTBOX_MAX_ATTEMPTS", 2)
+        queue("a@example.com", "b@example.com")
+        now = utcnow()
+        assert deliver_outbox(now) == {"sent": 0, "failed": 2}
+        assert deliver_outbox(now + datetime.timedelta(hours=1))["failed"] == 2
+        messages = db_session.query(MailOutbox).all()
+        assert {m.status for m in messages} == {MailOutbox.FAILED}
+        assert {m.attempts for m in messages} == {2}
+
+    def test_retry_delay(self):
+        """Test the delay doubles after each failure, up to the maximum"""
+        delays = [retry_delay(attempts, 30, 100) for attempts in range(1, 5)]
+        assert delays == [30, 60, 100, 100]
@@ -0,0 +1,34 @@
+from server.utils.metrics import Registry
+
+
+class TestRegistry:
+    def test_counter_labels(self):
+        """Test counters add up per label set"""
+        counter = Registry().counter("logins_total", "Logins.")
+        counter.inc(reason="ok")
+        counter.inc(2, reason="ok")
+        counter.inc(reason="throttled")
+        assert counter.value(reason="ok") == 3
+        assert counter.value(reason="throttled") == 1
+
+    def test_same_metric_is_shared(self):
+        """Test registering a name twice returns the same metric"""
+        registry = Registry()
+        assert registry.gauge("in_flight", "A.") is registry.gauge("in_flight", "B.")
+
+    def test_render(self):
+        """Test the registry renders the Prometheus text format"""
+        registry = Registry()
+        registry.counter("hits_total", "Cache hits.").inc(fragment="nav")
+        histogram = registry.histogram("wait_seconds", "Wait.", buckets=(0.1, 1))
+        histogram.observe(0.05)
+        histogram.observe(5)
+
+        lines = registry.render().splitlines()
+        assert "# TYPE hits_total counter" in lines
+        assert 'hits_total{fragment="nav"} 1' in lines
+        assert 'wait_seconds_bucket{le="0.1"} 1' in lines
+        assert 'wait_seconds_bucket{le="1"} 1' in lines
+        assert 'wait_seconds_bucket{le="+Inf"} 2' in lines
+        assert "wait_seconds_sum 5.05" in lines
+        assert "wait_seconds_count 2" in lines
@@ -0,0 +1,90 @@
+from datetime import date, datetime
+
+import pytest
+
+from server.models import CalorieIntake, Exercise
+from server.utils.constants import ExerciseType
+from server.utils.pagination import (
+    decode_cursor,
+    encode_cursor,
+    filter_date_range,
+    keyset_page,
+)
+
+
+@pytest.fixture
+def exercises(db_session, test_user):
+    # Two exercises share each timestamp, so the id has to break the ties
+    rows = [
+        Exercise(
+            user_id=test_user.id,
+            type=ExerciseType.YOGA,
+            metrics={"duration": 10 + n},
+            created_at=datetime(2025, 1, 1 + n // 2, 8, 0),
+        )
+        for n in range(7)
+    ]
+    db_session.add_all(rows)
+    db_session.commit()
+    return sorted(rows, key=lambda e: (e.created_at, e.id), reverse=True)
+
+
+def walk_pages(query, model, limit: int) -> list:
+    """Every row of the query, read page by page."""
+    seen, cursor = [], None
+    while True:
+        page = keyset_page(query, model, cursor, limit)
+        assert len(page["items"]) <= limit
+        seen += page["items"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return seen
+        assert len(seen) <= query.count(), "A page was returned twice"
+
+
+class TestKeysetPagination:
+    def test_cursor_round_trip(self):
+        """Test a cursor decodes back to the key it was made from"""
+        key = (datetime(2025, 1, 2, 8, 30, 15), 42)
+        assert decode_cursor(encode_cursor(*key)) == key
+
+    @pytest.mark.parametrize("cursor", ["not-a-cursor", "", "MjAyNQ"])
+    def test_invalid_cursor(self, cursor):
+        """Test malformed cursors raise ValueError"""
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+    def test_pages_cover_history_once(self, exercises, test_user):
+        """Test walking the pages returns every row once, newest first"""
+        seen = walk_pages(Exercise.get_by_user(test_user.id), Exercise, 3)
+        assert [e.id for e in seen] == [e.id for e in exercises]
+
+    def test_default_timestamps(self, db_session, test_user):
+        """Test rows timestamped by the column default, in one second, are paged"""
+        rows = [CalorieIntake(user_id=test_user.id, calories=100 + n) for n in range(3)]
+        db_session.add_all(rows)
+        db_session.flush()
+        # Another row at the start of the same second, without microseconds
+        second = rows[0].created_at.replace(microsecond=0)
+        rows.append(
+            CalorieIntake(user_id=test_user.id, calories=103, created_at=second)
+        )
+        db_session.add(rows[-1])
+        db_session.commit()
+
+        seen = walk_pages(CalorieIntake.get_by_user(test_user.id), CalorieIntake, 1)
+        expected = sorted(rows, key=lambda c: (c.created_at, c.id), reverse=True)
+        assert [c.id for c in seen] == [c.id for c in expected]
+
+    def test_date_range(self, exercises, test_user):
+        """Test the date range keeps both boundary days"""
+        query = filter_date_range(
+            Exercise.get_by_user(test_user.id),
+            Exercise.created_at,
+            date(2025, 1, 2),
+            date(2025, 1, 3),
+        )
+        page = keyset_page(query, Exercise, limit=10)
+        assert page["next_cursor"] is None
+        assert {e.created_at.day for e in page["items"]} == {2, 3}
+        assert len(page["items"]) == 4
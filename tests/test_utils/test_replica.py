@@ -0,0 +1,93 @@
+import time
+
+import pytest
+from flask import session
+
+from server.app import create_app
+from server.config import TestingConfig
+from server.models import db, User
+from server.utils.database import REPLICA_BIND
+from server.utils.replica import LAST_WRITE_KEY, sync_replica, use_replica
+
+
+@pytest.fixture
+def replica_app(tmp_path):
+    config = type(
+        "ReplicaConfig",
+        (TestingConfig,),
+        {
+            "SECRET_KEY": "test",
+            "DATABASE_URL": None,
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'primary.sqlite'}",
+            "REPLICA_DATABASE_URI": f"sqlite:///{tmp_path / 'replica.sqlite'}",
+        },
+    )
+    app = create_app(config_class=config)
+    with app.app_context():
+        db.create_all()
+        db.metadata.create_all(db.engines[REPLICA_BIND])
+        yield app
+        db.session.remove()
+    # The bind only exists on this app, keep it away from the shared fixtures
+    db.metadatas.pop(REPLICA_BIND)
+
+
+def add_user():
+    db.session.add(
+        User(username="writer", nickname="Writer", email="w@example.com", password="x")
+    )
+    db.session.commit()
+
+
+def count_users():
+    return db.session.query(User).count()
+
+
+class TestReplicaRouting:
+    def test_reads_use_replica(self, replica_app):
+        """Test reads inside use_replica go to the replica until it is synced"""
+        with replica_app.app_context(), replica_app.test_request_context():
+            add_user()
+        db.session.remove()
+
+        with replica_app.app_context(), replica_app.test_request_context():
+            assert count_users() == 1
+            with use_replica():
+                assert count_users() == 0
+            sync_replica()
+            with use_replica():
+                assert count_users() == 1
+
+    def test_read_your_writes_in_request(self, replica_app):
+        """Test a request reads the primary once it has written"""
+        with replica_app.app_context(), replica_app.test_request_context():
+            add_user()
+            with use_replica():
+                assert count_users() == 1
+
+    def test_read_your_writes_across_requests(self, replica_app):
+        """Test a client keeps reading the primary right after its last write"""
+        with replica_app.app_context(), replica_app.test_request_context():
+            session[LAST_WRITE_KEY] = time.time()
+            with use_replica():
+                assert db.session.get_bind(User) is not db.engines[REPLICA_BIND]
+            session[LAST_WRITE_KEY] = time.time() - 60
+            with use_replica():
+                assert db.session.get_bind(User) is db.engines[REPLICA_BIND]
+
+    def test_writes_use_primary(self, replica_app):
+        """Test a flush inside use_replica still writes to the primary"""
+        with replica_app.app_context(), replica_app.test_request_context():
+            with use_replica():
+                add_user()
+            assert count_users() == 1
+
+    def test_last_write_remembered(self, replica_app):
+        """Test a write stores its time in the client session"""
+        with replica_app.app_context(), replica_app.test_request_context():
+            replica_app.process_response(replica_app.response_class())
+            assert LAST_WRITE_KEY not in session
+
+            add_user()
+            replica_app.process_response(replica_app.response_class())
+            assert session[LAST_WRITE_KEY] <= time.time()
@@ -0,0 +1,153 @@
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from server.blueprints.user import logic
+from server.models import db
+from server.utils.security import (
+    HASH_SECONDS,
+    QUEUE_WAIT,
+    REJECTED,
+    PasswordHasher,
+    PasswordHasherBusy,
+    calibrate_rounds,
+    hash_password,
+    password_hasher,
+    password_rounds,
+)
+
+
+def make_hasher(app, **config):
+    options = {
+        "PASSWORD_HASH_WORKERS": 1,
+        "PASSWORD_HASH_QUEUE": 0,
+        "PASSWORD_HASH_TIMEOUT": 10,
+        "PASSWORD_HASH_RETRY_AFTER": 2,
+    }
+    options.update(config)
+    hasher = PasswordHasher()
+    hasher.init_app(SimpleNamespace(config={**app.config, **options}))
+    return hasher
+
+
+@pytest.fixture
+def hasher(app):
+    hasher = make_hasher(app)
+    yield hasher
+    hasher.shutdown()
+
+
+class TestPasswordHasher:
+    def test_inline(self, app):
+        """Test hashing runs inline without workers"""
+        hasher = make_hasher(app, PASSWORD_HASH_WORKERS=0)
+        hashed = hasher.hash("secret")
+        assert hasher.check("secret", hashed)
+        assert not hasher.check("wrong", hashed)
+        assert hasher._executor is None
+
+    def test_pool(self, hasher):
+        """Test hashing and checking through the process pool"""
+        checks = HASH_SECONDS.count(operation="check")
+        waits = QUEUE_WAIT.count()
+        hashed = hasher.hash("secret")
+        assert hasher.check("secret", hashed)
+        assert HASH_SECONDS.count(operation="check") == checks + 1
+        assert QUEUE_WAIT.count() == waits + 2
+
+    def test_saturated_pool_fails_fast(self, hasher):
+        """Test calls past the queue limit get a 503 with Retry-After"""
+        hasher.hash("warm up")  # Start the worker process
+        busy = threading.Thread(
+            target=hasher.run, args=(time.sleep, 0.5), kwargs={"operation": "sleep"}
+        )
+        busy.start()
+        time.sleep(0.1)
+        rejected = REJECTED.value(operation="hash") or 0
+
+        started = time.perf_counter()
+        with pytest.raises(PasswordHasherBusy) as e:
+            hasher.hash("secret")
+        assert time.perf_counter() - started < 0.1
+        busy.join()
+
+        response = e.value.get_response()
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "2"
+        assert REJECTED.value(operation="hash") == rejected + 1
+        # The slot is free again once the running call is done
+        assert hasher.check("secret", hasher.hash("secret"))
+
+    def test_timeout_keeps_slot(self, hasher):
+        """Test a timed out call holds its slot until the worker is done with it"""
+        hasher.hash("warm up")  # Start the worker process
+        hasher.timeout = 0.2
+        with pytest.raises(PasswordHasherBusy):
+            hasher.run(time.sleep, 0.6, operation="sleep")
+        with pytest.raises(PasswordHasherBusy):
+            hasher.hash("secret")
+        time.sleep(0.6)
+        assert hasher.check("secret", hasher.hash("secret"))
+
+    def test_broken_pool(self, hasher):
+        """Test a dead worker fails its call with a 503 and the pool is replaced"""
+        hasher.hash("warm up")  # Start the worker process
+        broken = hasher._executor
+        with pytest.raises(PasswordHasherBusy):
+            hasher.run(os._exit, 1, operation="crash")
+        assert hasher._executor is None
+        assert hasher.check("secret", hasher.hash("secret"))
+        assert hasher._executor is not broken
+
+
+class TestBcryptRounds:
+    def test_password_rounds(self):
+        """Test the cost is read back from a hash"""
+        assert password_rounds(hash_password("secret", 5)) == 5
+        assert password_rounds("not a hash") is None
+
+    def test_calibrate_rounds(self):
+        """Test calibration stops at the first cost over the target"""
+        rounds, timings = calibrate_rounds(0, min_rounds=4, max_rounds=6)
+        assert rounds == 4
+        assert list(timings) == [4]
+
+        rounds, timings = calibrate_rounds(60, min_rounds=4, max_rounds=6)
+        assert rounds == 6
+        assert list(timings) == [4, 5, 6]
+
+    def test_login_rehashes(self, app, monkeypatch, test_user):
+        """Test logging in rehashes a password made with another cost"""
+        monkeypatch.setitem(app.config, "SECRET_KEY", "test")
+        assert password_rounds(test_user.password) != password_hasher.rounds
+        with app.app_context(), app.test_request_context():
+            user = logic.login(test_user.email, test_user.plain_password, False)
+            assert password_rounds(user.password) == password_hasher.rounds
+            rehashed = user.password
+
+            # Up to date hashes are left alone
+            logic.login(test_user.email, test_user.plain_password, False)
+            db.session.refresh(user)
+            assert user.password == rehashed
+
+
+class TestMetricsEndpoint:
+    def test_local_client(self, app):
+        """Test the metrics are served to local clients"""
+        response = app.test_client().get("/metrics")
+        assert response.status_code == 200
+        assert "# TYPE password_hash_seconds histogram" in response.text
+
+    @pytest.mark.parametrize(
+        "options",
+        [
+            {"environ_base": {"REMOTE_ADDR": "10.0.0.1"}},
+            {"headers": {"X-Forwarded-For": "10.0.0.1"}},
+        ],
+    )
+    def test_remote_client(self, app, options):
+        """Test the metrics are hidden from remote and proxied clients"""
+        assert app.test_client().get("/metrics", **options).status_code == 404
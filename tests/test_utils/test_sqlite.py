@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy import create_engine, event
+
+from server.config import ProductionConfig
+from server.utils.sqlite import register_pragmas, read_pragmas
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pragmas.sqlite'}")
+    yield engine
+    engine.dispose()
+
+
+class TestSQLitePragmas:
+    def test_production_profile(self, engine):
+        """Test every new connection gets the production pragma profile"""
+        register_pragmas(engine, ProductionConfig.SQLITE_PRAGMAS)
+
+        assert read_pragmas(engine, ProductionConfig.SQLITE_PRAGMAS) == {
+            "journal_mode": "wal",
+            "synchronous": 1,
+            "busy_timeout": 5000,
+            "cache_size": -65536,
+            "mmap_size": 268435456,
+            "temp_store": 2,
+        }
+
+    def test_invalid_pragma_name(self, engine):
+        """Test pragma names are validated before being formatted into SQL"""
+        with pytest.raises(ValueError):
+            register_pragmas(engine, {"cache_size=1; DROP TABLE user; --": 1})
+
+    def test_periodic_optimize(self, engine, monkeypatch):
+        """Test PRAGMA optimize runs on checkout once the interval has passed"""
+        statements = []
+
+        @event.listens_for(engine, "connect")
+        def trace(dbapi_connection, _connection_record):
+            dbapi_connection.set_trace_callback(statements.append)
+
+        clock = iter([1000.0, 1030.0, 1061.0])
+        monkeypatch.setattr("server.utils.sqlite.time.monotonic", lambda: next(clock))
+        register_pragmas(engine, {}, optimize_interval=60)
+
+        with engine.connect():
+            assert "PRAGMA optimize" not in statements
+        with engine.connect():
+            assert "PRAGMA optimize" in statements
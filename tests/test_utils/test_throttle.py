@@ -0,0 +1,96 @@
+import pytest
+
+from server.blueprints.user import logic
+from server.utils.throttle import (
+    LOGIN_ATTEMPTS,
+    LoginThrottle,
+    LoginThrottled,
+    MemoryBucketStore,
+    SQLiteBucketStore,
+    login_throttle,
+)
+
+
+@pytest.fixture
+def make_throttle(clock):
+    def make_throttle(store=None):
+        throttle = LoginThrottle()
+        throttle.enabled = True
+        throttle.email_attempts, throttle.ip_attempts, throttle.period = 2, 3, 60
+        throttle.store = store or MemoryBucketStore()
+        throttle.clock = clock
+        return throttle
+
+    return make_throttle
+
+
+class TestLoginThrottle:
+    def test_email_limit(self, make_throttle):
+        """Test an email is limited, with the wait until its next token"""
+        throttle = make_throttle()
+        throttle.check("a@example.com", "10.0.0.1")
+        throttle.check("A@example.com ", "10.0.0.2")
+        with pytest.raises(LoginThrottled) as e:
+            throttle.check("a@example.com", "10.0.0.3")
+        assert e.value.get_response().status_code == 429
+        assert e.value.get_response().headers["Retry-After"] == "30"
+
+    def test_ip_limit(self, make_throttle):
+        """Test an IP is limited across emails"""
+        throttle = make_throttle()
+        for n in range(3):
+            throttle.check(f"{n}@example.com", "10.0.0.1")
+        with pytest.raises(LoginThrottled):
+            throttle.check("other@example.com", "10.0.0.1")
+
+    def test_refill(self, make_throttle, clock):
+        """Test tokens come back over the period"""
+        throttle = make_throttle()
+        throttle.check("a@example.com", "10.0.0.1")
+        throttle.check("a@example.com", "10.0.0.1")
+        clock.now += 30
+        throttle.check("a@example.com", "10.0.0.1")
+        with pytest.raises(LoginThrottled):
+            throttle.check("a@example.com", "10.0.0.1")
+
+    def test_counters(self, make_throttle):
+        """Test processed and rejected attempts are counted"""
+        processed = LOGIN_ATTEMPTS.value(result="processed") or 0
+        rejected = LOGIN_ATTEMPTS.value(result="rejected", reason="email") or 0
+        throttle = make_throttle()
+        for _ in range(3):
+            try:
+                throttle.check("a@example.com", "10.0.0.1")
+            except LoginThrottled:
+                pass
+        assert LOGIN_ATTEMPTS.value(result="processed") == processed + 2
+        assert LOGIN_ATTEMPTS.value(result="rejected", reason="email") == rejected + 1
+
+    def test_shared_sqlite_store(self, make_throttle, clock, tmp_path):
+        """Test the SQLite store shares the buckets between processes"""
+        path = str(tmp_path / "throttle.sqlite")
+        first = make_throttle(SQLiteBucketStore(path))
+        second = make_throttle(SQLiteBucketStore(path))
+        first.check("a@example.com", "10.0.0.1")
+        second.check("a@example.com", "10.0.0.1")
+        with pytest.raises(LoginThrottled):
+            first.check("a@example.com", "10.0.0.1")
+        clock.now += 30
+        second.check("a@example.com", "10.0.0.1")
+
+    def test_rejected_before_bcrypt(self, app, monkeypatch):
+        """Test the login route answers 429 without checking the password"""
+        monkeypatch.setitem(app.config, "SECRET_KEY", "test")
+        monkeypatch.setattr(login_throttle, "enabled", True)
+        monkeypatch.setattr(login_throttle, "store", MemoryBucketStore())
+        checks = []
+        monkeypatch.setattr(logic, "login", lambda *args: checks.append(args))
+
+        client = app.test_client()
+        form = {"email": "bot@example.com", "password": "hunter22"}
+        statuses = [
+            client.post("/user/login", data=form).status_code
+            for _ in range(login_throttle.email_attempts + 1)
+        ]
+        assert statuses[-1] == 429
+        assert len(checks) == login_throttle.email_attempts
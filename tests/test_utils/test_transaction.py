@@ -0,0 +1,102 @@
+import sqlite3
+
+import pytest
+from flask import g
+from sqlalchemy.exc import OperationalError
+
+from server.utils.transaction import retry_on_lock, report_retries
+
+
+def locked_error():
+    return OperationalError(
+        "INSERT", {}, sqlite3.OperationalError("database is locked")
+    )
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    delays = []
+    monkeypatch.setattr("server.utils.transaction.time.sleep", delays.append)
+    return delays
+
+
+class TestRetryOnLock:
+    def test_retries_until_success(self, app, no_sleep):
+        """Test a locked write is retried and the retries are recorded"""
+        calls = []
+
+        @retry_on_lock
+        def write():
+            calls.append(1)
+            if len(calls) < 3:
+                try:
+                    raise locked_error()
+                except OperationalError as e:
+                    raise RuntimeError(f"Error adding data: {e}")
+            return "done"
+
+        with app.app_context(), app.test_request_context():
+            assert write() == "done"
+            assert len(calls) == 3
+            assert g.db_retries == 2
+            assert g.db_retry_wait == pytest.approx(sum(no_sleep))
+
+            response = report_retries(app.response_class())
+            assert response.headers["Server-Timing"].startswith("db-retry;dur=")
+
+    def test_gives_up_after_max_attempts(self, app, no_sleep):
+        """Test the lock error is raised once every attempt failed"""
+        app.config["DB_RETRY_ATTEMPTS"] = 3
+        calls = []
+
+        @retry_on_lock
+        def write():
+            calls.append(1)
+            raise locked_error()
+
+        try:
+            with app.app_context(), app.test_request_context(), pytest.raises(
+                OperationalError
+            ):
+                write()
+        finally:
+            app.config["DB_RETRY_ATTEMPTS"] = 5
+        assert len(calls) == 3
+        assert len(no_sleep) == 2
+        assert all(0 <= d <= app.config["DB_RETRY_MAX_DELAY"] for d in no_sleep)
+
+    def test_other_errors_not_retried(self, app, no_sleep):
+        """Test errors other than lock contention are raised right away"""
+        calls = []
+
+        @retry_on_lock
+        def write():
+            calls.append(1)
+            raise RuntimeError("Error adding data: constraint failed")
+
+        with app.app_context(), app.test_request_context():
+            with pytest.raises(RuntimeError):
+                write()
+            assert "db_retries" not in g
+            response = report_retries(app.response_class())
+            assert "Server-Timing" not in response.headers
+        assert len(calls) == 1
+
+    def test_nested_calls_retry_once(self, app, no_sleep):
+        """Test only the outermost write path retries the unit of work"""
+        calls = []
+
+        @retry_on_lock
+        def inner():
+            calls.append("inner")
+            if calls.count("inner") == 1:
+                raise locked_error()
+
+        @retry_on_lock
+        def outer():
+            calls.append("outer")
+            inner()
+
+        with app.app_context(), app.test_request_context():
+            outer()
+        assert calls == ["outer", "inner", "outer", "inner"]
@@ -0,0 +1,103 @@
+import pytest
+from sqlalchemy import text
+
+from server.blueprints.user import logic
+from server.models import User
+from server.utils.security import hash_password
+
+USERS = [
+    ("runner", "Ann"),
+    ("runner_two", "Bob"),
+    ("trailrunner", "Cat"),
+    ("swimmer", "Runa"),
+    ("cyclist", "Dan"),
+]
+
+
+@pytest.fixture
+def users(test_user, db_session):
+    users = [
+        User(
+            username=username,
+            nickname=nickname,
+            email=f"{username}@example.com",
+            password=hash_password("secret", 4),
+        )
+        for username, nickname in USERS
+    ]
+    db_session.add_all(users)
+    db_session.commit()
+    return users
+
+
+@pytest.fixture
+def search(logged_in):
+    def search(query, page=1):
+        return [user["username"] for user in logic.search_user(query, page)]
+
+    return search
+
+
+class TestSearchUser:
+    def test_prefix_first(self, users, search):
+        """Test usernames starting with the query come before other matches"""
+        for query in ("runner", "Runner"):
+            results = search(query)
+            assert results[:2] == ["runner", "runner_two"]
+            assert set(results[2:]) == {"trailrunner"}
+
+    def test_nickname_and_case(self, users, search):
+        """Test matches in nicknames, whatever the case"""
+        assert set(search("RUN")) == {"runner", "runner_two", "trailrunner", "swimmer"}
+
+    def test_result_fields(self, users, search):
+        """Test the fields returned, without the searching user"""
+        (user,) = logic.search_user("cyclist")
+        assert user == {
+            "id": users[4].id,
+            "username": "cyclist",
+            "nickname": "Dan",
+            "avatar": None,
+        }
+        assert search("testuser") == []
+
+    def test_short_query(self, users, search):
+        """Test queries too short for the trigram index only match prefixes"""
+        assert search("sw") == ["swimmer"]
+        assert search("SW") == search("Sw") == ["swimmer"]
+        assert search("mm") in ([], ["swimmer"])  # ILIKE without the index
+
+    def test_index_follows_changes(self, users, search, db_session):
+        """Test the index is kept in sync with renamed and deleted users"""
+        users[4].username = "climber"
+        db_session.delete(users[3])
+        db_session.commit()
+        assert search("cyclist") == []
+        assert search("limb") == ["climber"]
+        assert search("Runa") == []
+
+    def test_pages(self, users, search, app, monkeypatch):
+        """Test results are paged, up to the maximum"""
+        monkeypatch.setitem(app.config, "USER_SEARCH_PAGE_SIZE", 2)
+        monkeypatch.setitem(app.config, "USER_SEARCH_MAX_RESULTS", 3)
+        first, second = search("run"), search("run", page=2)
+        assert len(first) == 2 and len(second) == 1
+        assert not set(first) & set(second)
+        assert search("run", page=3) == []
+
+    def test_prefix_uses_index(self, db_session):
+        """Test the case insensitive prefix is a seek on the lower username index"""
+        connection = db_session.connection()
+        if connection.dialect.name != "sqlite":
+            pytest.skip("The query plan is checked on SQLite")
+        query = db_session.query(User.id).filter(logic.username_prefix("Sw", "sqlite"))
+        sql = query.statement.compile(
+            connection, compile_kwargs={"literal_binds": True}
+        )
+        plan = db_session.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+        assert "SEARCH user USING INDEX ix_user_username_lower" in str(plan)
+
+    def test_empty_query(self, search):
+        """Test an empty query is rejected"""
+        with pytest.raises(ValueError):
+            search("  ")
@@ -0,0 +1,125 @@
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from server.utils.weather import FakeWeatherProvider, WeatherCache, get_forecast
+
+
+class ImmediateExecutor:
+    """Runs the refreshes in the calling thread, so the tests are deterministic."""
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+@pytest.fixture
+def make_cache(clock):
+    def make_cache(provider, **kwargs):
+        options = {"ttl": 10, "stale_ttl": 100, "error_ttl": 5}
+        options["executor"] = ImmediateExecutor()
+        options.update(kwargs)
+        return WeatherCache(provider, clock=clock, **options)
+
+    return make_cache
+
+
+class TestWeatherCache:
+    def test_fresh_forecast_is_cached(self, make_cache, clock):
+        """Test a fresh forecast is served without calling the provider"""
+        provider = FakeWeatherProvider()
+        cache = make_cache(provider)
+        assert len(cache.get("Perth", 5)) == 5
+        clock.now += 9
+        cache.get("Perth", 5)
+        assert len(provider.cities) == 1
+
+    def test_cities_are_cached_separately(self, make_cache):
+        """Test every city gets its own forecast"""
+        provider = FakeWeatherProvider()
+        cache = make_cache(provider)
+        cache.get("Perth")
+        cache.get("Sydney")
+        assert len(provider.cities) == 2
+
+    def test_stale_forecast_while_revalidating(self, make_cache, clock):
+        """Test a stale forecast is served while it is refreshed"""
+        provider = FakeWeatherProvider(temp=20)
+        cache = make_cache(provider, executor=None)
+        cache.get("Perth")
+        provider.temp, provider.delay = 25, 0.2
+        clock.now += 50
+
+        started = time.perf_counter()
+        assert cache.get("Perth")[0]["temp"] == 20
+        assert time.perf_counter() - started < 0.1
+        cache.refresh("Perth").result()
+        assert cache.get("Perth")[0]["temp"] == 25
+        assert len(provider.cities) == 2
+
+    def test_expired_forecast_is_refetched(self, make_cache, clock):
+        """Test a forecast past its stale time is not served"""
+        provider = FakeWeatherProvider(temp=20)
+        cache = make_cache(provider)
+        cache.get("Perth")
+        provider.temp = 25
+        clock.now += 200
+        assert cache.get("Perth")[0]["temp"] == 25
+
+    def test_failures_are_negatively_cached(self, make_cache, clock):
+        """Test a failed fetch is not retried before the error TTL"""
+        provider = FakeWeatherProvider(error=ConnectionError("down"))
+        cache = make_cache(provider)
+        assert cache.get("Perth") == []
+        assert cache.get("Perth") == []
+        assert len(provider.cities) == 1
+
+        provider.error = None
+        clock.now += 5
+        assert len(cache.get("Perth")) == 5
+        assert len(provider.cities) == 2
+
+    def test_failure_keeps_last_forecast(self, make_cache, clock):
+        """Test the last forecast is served while the provider fails"""
+        provider = FakeWeatherProvider(temp=20)
+        cache = make_cache(provider)
+        cache.get("Perth")
+        provider.error = ConnectionError("down")
+        clock.now += 50
+        assert cache.get("Perth")[0]["temp"] == 20
+        assert cache.get("Perth")[0]["temp"] == 20
+        assert len(provider.cities) == 2
+
+    def test_cold_miss_waits_bounded(self, make_cache):
+        """Test an uncached city only waits a bounded time for the provider"""
+        provider = FakeWeatherProvider(delay=0.3)
+        cache = make_cache(provider, executor=None, wait=0.05)
+        started = time.perf_counter()
+        assert cache.get("Perth") == []
+        assert time.perf_counter() - started < 0.2
+        cache.refresh("Perth").result()
+        assert len(cache.get("Perth")) == 5
+        assert len(provider.cities) == 1
+
+    def test_cities_are_bounded(self, make_cache, clock):
+        """Test only the most recent cities are kept, and only while usable"""
+        provider = FakeWeatherProvider()
+        cache = make_cache(provider, maxsize=2)
+        for city in ("Perth", "Sydney", "Darwin"):
+            cache.get(city)
+        assert len(cache._forecasts) == 2
+        cache.get("Perth")
+        assert len(provider.cities) == 4
+
+        clock.now += 110
+        assert cache._forecasts.get(("Darwin", 5)) is None
+
+    def test_app_uses_fake_provider(self, app):
+        """Test the testing config serves the offline provider"""
+        with app.app_context():
+            assert get_forecast("Perth", 3)[0]["description"] == "Clear"
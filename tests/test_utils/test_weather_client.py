@@ -0,0 +1,153 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from server.blueprints.dashboard import logic
+from server.utils.weather import CircuitBreaker, CircuitOpenError, WeatherClient
+
+# Two three-hourly forecasts a day, starting 2025-01-01 00:00 UTC
+FORECAST = {
+    "list": [
+        {
+            "dt": 1735689600 + n * 12 * 3600,
+            "main": {"temp": 20 + n},
+            "weather": [{"main": "Clear", "icon": "01d"}],
+        }
+        for n in range(10)
+    ]
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep connections alive
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        server = self.server
+        server.requests += 1
+        time.sleep(server.delay)
+        body = json.dumps(FORECAST).encode()
+        self.send_response(server.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    server.status, server.delay = 200, 0
+    server.requests = server.connections = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def make_client(stub):
+    def make_client(**kwargs):
+        url = f"http://127.0.0.1:{stub.server_port}/data/2.5/forecast"
+        return WeatherClient("key", url=url, timeout=2, **kwargs)
+
+    return make_client
+
+
+class TestWeatherClient:
+    def test_forecast(self, make_client):
+        """Test the forecast keeps the first entry of each day"""
+        forecast = make_client().forecast("Perth", 3)
+        assert [day["date"] for day in forecast] == ["Wed 01", "Thu 02", "Fri 03"]
+        assert [day["temp"] for day in forecast] == [20, 22, 24]
+
+    def test_connection_is_reused(self, make_client, stub):
+        """Test consecutive fetches share one keep-alive connection"""
+        client = make_client()
+        for _ in range(3):
+            client.forecast("Perth", 5)
+        assert stub.requests == 3
+        assert stub.connections == 1
+
+    def test_concurrent_fetches_share_request(self, make_client, stub):
+        """Test concurrent fetches of a city make a single request"""
+        stub.delay = 0.2
+        client = make_client()
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(client.forecast("Perth", 5)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert stub.requests == 1
+        assert len(results) == 5 and all(r == results[0] for r in results)
+
+    def test_circuit_opens_on_server_errors(self, make_client, stub, clock):
+        """Test a failing upstream is not called during the cool-down"""
+        stub.status = 503
+        client = make_client(breaker=CircuitBreaker(2, 30, clock=clock))
+        for _ in range(2):
+            with pytest.raises(requests.HTTPError):
+                client.forecast("Perth", 5)
+        assert client.breaker.state == "open"
+
+        with pytest.raises(CircuitOpenError):
+            client.forecast("Perth", 5)
+        assert stub.requests == 2
+
+        # A successful trial after the cool-down closes the circuit
+        stub.status = 200
+        clock.now += 30
+        assert len(client.forecast("Perth", 5)) == 5
+        assert client.breaker.state == "closed"
+
+    def test_failed_trial_reopens_circuit(self, make_client, stub, clock):
+        """Test a failed trial call opens the circuit for another cool-down"""
+        stub.status = 500
+        client = make_client(breaker=CircuitBreaker(1, 30, clock=clock))
+        with pytest.raises(requests.HTTPError):
+            client.forecast("Perth", 5)
+        clock.now += 30
+        with pytest.raises(requests.HTTPError):
+            client.forecast("Perth", 5)
+        with pytest.raises(CircuitOpenError):
+            client.forecast("Perth", 5)
+        assert stub.requests == 2
+
+    def test_client_errors_keep_circuit_closed(self, make_client, stub):
+        """Test unknown cities do not count as upstream failures"""
+        stub.status = 404
+        client = make_client(breaker=CircuitBreaker(1, 30))
+        for _ in range(3):
+            with pytest.raises(requests.HTTPError):
+                client.forecast("Nowhere", 5)
+        assert client.breaker.state == "closed"
+        assert stub.requests == 3
+
+
+class TestWeatherCity:
+    def test_default_city(self, app, logged_in):
+        """Test users without a city get the configured one"""
+        assert logic.get_weather_city() == app.config["WEATHER_CITY"]
+
+    def test_user_city(self, app, db_session, logged_in):
+        """Test the forecast is fetched for the city of the user"""
+        logged_in.city = "Sydney"
+        db_session.commit()
+        logic.get_weather_forecast(days=5)
+        assert app.extensions["weather"].provider.cities[-1] == "Sydney"